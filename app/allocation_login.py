@@ -0,0 +1,65 @@
+import threading
+import logging
+
+# Logger du module, rattaché à la configuration définie dans main.py (operations.log)
+logger = logging.getLogger(__name__)
+
+
+class AllocateurLogins:
+    """Attribution des logins uniques (login de base + suffixe numérique).
+
+       Le plus grand suffixe déjà utilisé pour un login de base est obtenu en une
+       seule requête sur l'index unique de 'login', puis mémorisé : les
+       attributions suivantes pour la même base se font en O(1), sans requête.
+       Un verrou rend l'attribution atomique entre threads ; entre processus,
+       la contrainte UNIQUE de la table reste la garantie finale (voir oublier())."""
+
+    def __init__(self, db):
+        self.db = db
+
+        # {login_de_base: prochain suffixe libre} (0 = login de base sans suffixe)
+        self._prochains = {}
+        self._verrou = threading.Lock()
+
+    def _prochain_suffixe_en_base(self, login_de_base):
+        """Retourne le prochain suffixe libre pour 'login_de_base' d'après la base."""
+        curseur = self.db.get_connexion().cursor()
+
+        # Parcours de la plage [base, base + ':'[ sur l'index de login : seuls la base
+        # elle-même et ses variantes suffixées par des chiffres ('0'-'9' < ':') y figurent
+        curseur.execute("""
+            SELECT MAX(CASE WHEN login = ?1 THEN 0
+                            ELSE CAST(substr(login, ?2) AS INTEGER) END)
+            FROM utilisateurs
+            WHERE login >= ?1 AND login < ?1 || ':'
+              AND (login = ?1 OR substr(login, ?2) NOT GLOB '*[^0-9]*')
+        """, (login_de_base, len(login_de_base) + 1))
+
+        plus_grand = curseur.fetchone()[0]
+        return 0 if plus_grand is None else plus_grand + 1
+
+    def allouer(self, login_de_base):
+        """Réserve et retourne un login libre construit à partir de 'login_de_base'."""
+        with self._verrou:
+            suffixe = self._prochains.get(login_de_base)
+            if suffixe is None:
+                suffixe = self._prochain_suffixe_en_base(login_de_base)
+
+            self._prochains[login_de_base] = suffixe + 1
+
+        return login_de_base if suffixe == 0 else f"{login_de_base}{suffixe}"
+
+    def allouer_pour(self, user):
+        """Génère le login de base de l'utilisateur (User.generer_login) puis lui
+           attribue un login libre. Retourne le login de base utilisé."""
+        user.generer_login()
+        login_de_base = user.Login
+        user.Login = self.allouer(login_de_base)
+        return login_de_base
+
+    def oublier(self, login_de_base):
+        """Invalide le suffixe mémorisé (ex : login créé par un autre processus).
+           La prochaine attribution relira la base."""
+        with self._verrou:
+            self._prochains.pop(login_de_base, None)
+        logger.info(f"ALLOCATION LOGIN : cache invalidé pour '{login_de_base}'")
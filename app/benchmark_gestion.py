@@ -0,0 +1,279 @@
+"""Banc de mesure des opérations courantes de gestion des utilisateurs.
+
+Crée une base temporaire peuplée de N comptes (1k, 100k, 1M par défaut), puis
+chronomètre les chemins critiques de database.py et fonctions_gestion.py :
+ajout, recherche par login, recherche générale, listing complet, vérification
+du mot de passe à la connexion et blocage de compte. Les résultats sont écrits
+en JSON et peuvent être comparés à une référence enregistrée précédemment.
+
+Chaque opération est d'abord exécutée à vide (échauffement : caches SQLite, pool
+de processus du hachage), puis mesurée. La comparaison porte sur le premier
+quartile (p25), peu sensible aux interruptions ponctuelles de la machine ; un
+écart n'est une régression que s'il dépasse à la fois la tolérance relative et
+un plancher absolu, et s'il se reproduit lors d'une nouvelle mesure.
+
+Utilisation :
+    python app/benchmark_gestion.py --sortie resultats.json
+    python app/benchmark_gestion.py --tailles 1000 100000 --reference app/benchmark_reference.json
+(code de sortie 1 si une mesure est plus lente que la référence au-delà de la tolérance)
+La référence fournie (benchmark_reference.json) a été mesurée sur 1000 et 100000
+comptes avec --passes 5 ; elle dépend de la machine : régénérez-la de la même
+façon (--sortie) sur la machine qui exécute la comparaison."""
+
+import os
+import io
+import sys
+import json
+import time
+import random
+import sqlite3
+import argparse
+import platform
+import tempfile
+import statistics
+import contextlib
+from datetime import datetime
+
+import hachage
+from classes import User
+from database import DatabaseManager
+from fonctions_gestion import VILLES_DISPONIBLES, recherche_generale
+
+TAILLES_DEFAUT = [1000, 100000, 1000000]
+
+# Écart toléré (en proportion) par rapport au p25 de référence
+TOLERANCE_DEFAUT = 0.25
+
+# Écart absolu en dessous duquel aucune régression n'est signalée (bruit de mesure, ms)
+PLANCHER_MS = 0.05
+
+# Nouvelles mesures d'une taille en régression : seules les régressions reproduites sont retenues
+CONFIRMATIONS = 1
+
+# Passes d'une mesure de confirmation (la passe médiane est retenue)
+PASSES_CONFIRMATION = 3
+
+# Graine fixe : même population et mêmes requêtes d'une exécution à l'autre
+GRAINE = 20240601
+
+MOT_DE_PASSE = "benchmark"
+
+_NOMS = ["Martin", "Bernard", "Dubois", "Thomas", "Robert", "Richard", "Petit", "Durand",
+         "Leroy", "Moreau", "Simon", "Laurent", "Lefebvre", "Michel", "Garcia", "Roux"]
+_PRENOMS = ["Jean", "Marie", "Pierre", "Sophie", "Luc", "Camille", "Louis", "Emma",
+            "Hugo", "Léa", "Paul", "Chloé", "Jules", "Inès", "Noé", "Élodie"]
+
+
+def _peupler(db, taille, hash_commun, aleatoire):
+    """Insère 'taille' comptes (par lots) et retourne la liste de leurs logins."""
+    logins = []
+    lot = []
+    for i in range(taille):
+        nom = f"{aleatoire.choice(_NOMS)}{i}"
+        prenom = aleatoire.choice(_PRENOMS)
+        user = User(nom, prenom, VILLES_DISPONIBLES[i % len(VILLES_DISPONIBLES)], "User",
+                    login=f"{prenom[0].lower()}{nom.lower()}", password_hash=hash_commun)
+        lot.append(user)
+        logins.append(user.Login)
+        if len(lot) == 10000:
+            db.ajouter_utilisateurs_en_masse(lot)
+            lot = []
+    if lot:
+        db.ajouter_utilisateurs_en_masse(lot)
+    return logins
+
+
+def _mesurer(operation, repetitions, echauffement=None):
+    """Exécute 'operation(i)' à vide 'echauffement' fois (par défaut un dixième des répétitions),
+       puis 'repetitions' fois en la chronométrant ; i est différent à chaque appel.
+       Retourne les statistiques (ms)."""
+    if echauffement is None:
+        echauffement = max(1, repetitions // 10)
+    for i in range(echauffement):
+        operation(i)
+
+    durees = []
+    for i in range(echauffement, echauffement + repetitions):
+        debut = time.perf_counter()
+        operation(i)
+        durees.append((time.perf_counter() - debut) * 1000)
+
+    durees.sort()
+    return {
+        "repetitions": repetitions,
+        "mediane_ms": round(statistics.median(durees), 4),
+        "p25_ms": round(durees[int(len(durees) * 0.25)], 4),
+        "p95_ms": round(durees[min(len(durees) - 1, int(len(durees) * 0.95))], 4),
+        "min_ms": round(durees[0], 4),
+        "max_ms": round(durees[-1], 4),
+    }
+
+
+def executer_scenarios(taille, dossier):
+    """Peuple une base de 'taille' comptes et mesure chaque opération.
+       Retourne un dict {nom_operation: statistiques}."""
+    aleatoire = random.Random(GRAINE)
+    hash_commun = hachage.hacher(MOT_DE_PASSE)
+
+    # Les messages d'initialisation (création du Super Admin) sont masqués
+    with contextlib.redirect_stdout(io.StringIO()):
+        db = DatabaseManager(os.path.join(dossier, f"benchmark_{taille}.db"))
+
+    try:
+        debut = time.perf_counter()
+        logins = _peupler(db, taille, hash_commun, aleatoire)
+        resultats = {"peuplement_s": round(time.perf_counter() - debut, 3)}
+
+        super_admin = db.rechercher_par_login("superadmin")
+        admin = User("Admin", "Rennes", "Rennes", "Admin", login="arennes")
+        cibles = [aleatoire.choice(logins) for _ in range(1000)]
+        termes = [aleatoire.choice(_NOMS).lower()[:5] for _ in range(200)]
+
+        def ajouter(i):
+            user = User(f"Ajout{i}", "Bench", "Paris", "User", login=f"bajout{taille}x{i}",
+                        password_hash=hash_commun)
+            db.ajouter_utilisateur(user)
+
+        def rechercher_sans_cache(i):
+            db.cache_utilisateurs.vider()
+            db.rechercher_par_login(cibles[i % len(cibles)])
+
+        def rechercher_avec_cache(i):
+            db.rechercher_par_login(cibles[i % 10])
+
+        def recherche_superadmin(i):
+            recherche_generale(db, termes[i % len(termes)], super_admin)
+
+        def recherche_admin(i):
+            recherche_generale(db, termes[i % len(termes)], admin)
+
+        def verifier_connexion(i):
+            # Même chemin que la connexion (fonctions_gestion) : vérification dans le pool de processus
+            user = db.rechercher_par_login(cibles[i % len(cibles)])
+            hachage.soumettre_verification(user.Password_Hash, MOT_DE_PASSE).result()
+
+        def bloquer(i):
+            db.bloquer_utilisateur(cibles[i % len(cibles)])
+            db.verifier_bloquage_utilisateur(cibles[i % len(cibles)])
+
+        # Le listing complet est coûteux sur les grandes tailles : moins de répétitions
+        repetitions_listing = 100 if taille <= 10000 else 5 if taille <= 100000 else 1
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            resultats["ajouter_utilisateur"] = _mesurer(ajouter, 1000)
+            resultats["rechercher_par_login"] = _mesurer(rechercher_sans_cache, 2000)
+            resultats["rechercher_par_login_cache"] = _mesurer(rechercher_avec_cache, 5000)
+            resultats["recherche_generale_superadmin"] = _mesurer(recherche_superadmin, 400)
+            resultats["recherche_generale_admin"] = _mesurer(recherche_admin, 400)
+            resultats["lister_tous_utilisateurs"] = _mesurer(
+                lambda i: db.lister_tous_utilisateurs(), repetitions_listing)
+            resultats["verification_connexion"] = _mesurer(verifier_connexion, 8, echauffement=2)
+            resultats["bloquer_utilisateur"] = _mesurer(bloquer, 1000)
+
+        return resultats
+
+    finally:
+        db.fermer()
+
+
+def comparer(resultats, reference, tolerance=TOLERANCE_DEFAUT, plancher_ms=PLANCHER_MS):
+    """Compare le p25 de chaque opération à celui de la référence (médiane pour une référence
+       plus ancienne, sans p25). Une régression dépasse la référence de plus de 'tolerance'
+       ET de plus de 'plancher_ms'. Retourne la liste des régressions
+       (taille, opération, référence_ms, mesure_ms)."""
+    regressions = []
+    for taille, operations in resultats["mesures"].items():
+        operations_reference = reference.get("mesures", {}).get(taille, {})
+        for nom, stats in operations.items():
+            stats_reference = operations_reference.get(nom)
+            if not isinstance(stats, dict) or not isinstance(stats_reference, dict):
+                continue
+            avant = stats_reference.get("p25_ms", stats_reference["mediane_ms"])
+            apres = stats.get("p25_ms", stats["mediane_ms"])
+            if apres > avant * (1 + tolerance) and apres - avant > plancher_ms:
+                regressions.append((taille, nom, avant, apres))
+    return regressions
+
+
+def _mesurer_tailles(tailles, passes=1):
+    """Mesure chaque taille 'passes' fois, chacune dans une base temporaire neuve, et retient
+       pour chaque opération la passe de p25 médian (une référence prise pendant un instant
+       calme ou chargé de la machine fausserait toutes les comparaisons suivantes).
+       Retourne {taille (texte): statistiques}."""
+    mesures = {}
+    for taille in tailles:
+        series = []
+        for passe in range(1, passes + 1):
+            print(f"Mesures sur {taille} utilisateurs (passe {passe}/{passes})...", file=sys.stderr)
+            with tempfile.TemporaryDirectory() as dossier:
+                series.append(executer_scenarios(taille, dossier))
+        mesures[str(taille)] = {
+            nom: sorted((serie[nom] for serie in series),
+                        key=lambda stats: stats["p25_ms"] if isinstance(stats, dict) else stats)[len(series) // 2]
+            for nom in series[0]
+        }
+    return mesures
+
+
+def main(arguments=None):
+    """Point d'entrée en ligne de commande : mesure, écrit le JSON, compare à la référence."""
+    parseur = argparse.ArgumentParser(description="Banc de mesure de la gestion des utilisateurs")
+    parseur.add_argument("--tailles", type=int, nargs="+", default=TAILLES_DEFAUT,
+                         help="nombres de comptes à tester (défaut : 1000 100000 1000000)")
+    parseur.add_argument("--sortie", help="fichier JSON où écrire les résultats")
+    parseur.add_argument("--reference", help="fichier JSON de référence à comparer")
+    parseur.add_argument("--tolerance", type=float, default=TOLERANCE_DEFAUT,
+                         help="ralentissement toléré par rapport à la référence (0.25 = 25 %%)")
+    parseur.add_argument("--plancher", type=float, default=PLANCHER_MS,
+                         help="écart absolu ignoré, en ms (défaut : 0.05)")
+    parseur.add_argument("--confirmations", type=int, default=CONFIRMATIONS,
+                         help="nouvelles mesures exigées pour confirmer une régression (défaut : 1)")
+    parseur.add_argument("--passes", type=int, default=1,
+                         help="mesures par taille, la passe médiane est retenue (5 pour une référence)")
+    options = parseur.parse_args(arguments)
+
+    resultats = {
+        "date": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "machine": platform.platform(),
+        "iterations_pbkdf2": hachage.ITERATIONS_PBKDF2,
+        "mesures": {},
+    }
+
+    resultats["mesures"] = _mesurer_tailles(options.tailles, options.passes)
+
+    texte = json.dumps(resultats, indent=2, ensure_ascii=False)
+    if options.sortie:
+        with open(options.sortie, "w", encoding="utf-8") as fichier:
+            fichier.write(texte + "\n")
+    else:
+        print(texte)
+
+    if not options.reference:
+        return 0
+
+    with open(options.reference, encoding="utf-8") as fichier:
+        reference = json.load(fichier)
+
+    regressions = comparer(resultats, reference, options.tolerance, options.plancher)
+
+    # Une régression n'est retenue que si elle se reproduit (les tailles concernées sont remesurées)
+    for _ in range(options.confirmations):
+        if not regressions:
+            break
+        tailles = sorted({int(taille) for taille, *_ in regressions})
+        print(f"{len(regressions)} régression(s) à confirmer, nouvelle mesure...", file=sys.stderr)
+        confirmees = {(taille, nom) for taille, nom, *_ in
+                      comparer({"mesures": _mesurer_tailles(tailles, PASSES_CONFIRMATION)}, reference,
+                               options.tolerance, options.plancher)}
+        regressions = [r for r in regressions if (r[0], r[1]) in confirmees]
+    for taille, nom, avant, apres in regressions:
+        print(f"[RÉGRESSION] {nom} ({taille} utilisateurs) : {avant:.3f} ms -> {apres:.3f} ms",
+              file=sys.stderr)
+    print(f"{len(regressions)} régression(s) par rapport à {options.reference}.", file=sys.stderr)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,142 @@
+import time
+import threading
+import logging
+from collections import OrderedDict
+
+# Logger du module, rattaché à la configuration définie dans main.py (operations.log)
+logger = logging.getLogger(__name__)
+
+# Nombre maximal de comptes conservés en mémoire
+TAILLE_CACHE_UTILISATEURS = 1024
+
+# Durée de vie (secondes) d'une entrée : borne le délai de prise en compte d'une
+# écriture faite par un autre processus sur le même fichier de base
+DUREE_VIE_CACHE = 30.0
+
+
+class CacheUtilisateurs:
+    """Cache LRU à durée de vie limitée des comptes lus par login.
+
+       Les valeurs stockées sont les lignes SQL (tuples immuables) : chaque
+       lecture reconstruit un objet User neuf, si bien qu'un appelant qui modifie
+       l'objet retourné n'altère pas le cache. Les écritures de DatabaseManager
+       invalident l'entrée du login concerné (écriture directe en base puis
+       invalidation) ; la durée de vie couvre les écritures externes.
+
+       Chaque invalidation porte un numéro de génération croissant. Un lecteur
+       prend un jeton (jeton()) avant son SELECT et le passe à memoriser() : si
+       le login a été invalidé entre-temps, la ligne lue est peut-être antérieure
+       à l'écriture et n'est pas mise en cache."""
+
+    def __init__(self, taille_max=TAILLE_CACHE_UTILISATEURS, duree_vie=DUREE_VIE_CACHE):
+        self.taille_max = taille_max
+        self.duree_vie = duree_vie
+
+        # {login: (instant d'expiration, ligne SQL)}, du moins au plus récemment utilisé
+        self._entrees = OrderedDict()
+        self._verrou = threading.Lock()
+
+        # Génération courante et {login: génération de sa dernière invalidation},
+        # de la plus ancienne à la plus récente ; au-delà de la taille maximale, les
+        # plus anciennes sont oubliées et résumées par le plancher (comparaison prudente)
+        self._generation = 0
+        self._invalide_a = OrderedDict()
+        self._plancher = 0
+
+        self.succes = 0
+        self.echecs = 0
+        self.expirations = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self.rejets = 0
+
+    def jeton(self):
+        """Retourne la génération courante, à prendre avant de lire la ligne en base."""
+        with self._verrou:
+            return self._generation
+
+    def lire(self, login):
+        """Retourne la ligne mémorisée pour 'login', ou None (absente ou expirée)."""
+        with self._verrou:
+            entree = self._entrees.get(login)
+            if entree is None:
+                self.echecs += 1
+                return None
+
+            expiration, ligne = entree
+            if expiration <= time.monotonic():
+                del self._entrees[login]
+                self.expirations += 1
+                self.echecs += 1
+                return None
+
+            self._entrees.move_to_end(login)
+            self.succes += 1
+            return ligne
+
+    def memoriser(self, login, ligne, jeton=None):
+        """Enregistre la ligne d'un compte, en évinçant le moins récemment utilisé si plein.
+           Si 'jeton' est fourni (voir jeton()) et que le login a été invalidé depuis,
+           la ligne n'est pas enregistrée et False est retourné."""
+        if self.taille_max <= 0:
+            return False
+        with self._verrou:
+            if jeton is not None and self._invalide_a.get(login, self._plancher) > jeton:
+                self.rejets += 1
+                return False
+
+            self._entrees[login] = (time.monotonic() + self.duree_vie, ligne)
+            self._entrees.move_to_end(login)
+            while len(self._entrees) > self.taille_max:
+                self._entrees.popitem(last=False)
+                self.evictions += 1
+            return True
+
+    def invalider(self, login):
+        """Retire un compte du cache (appelé après chaque écriture le concernant)."""
+        with self._verrou:
+            self._generation += 1
+            self._invalide_a[login] = self._generation
+            self._invalide_a.move_to_end(login)
+            while len(self._invalide_a) > max(self.taille_max, 1):
+                _, generation = self._invalide_a.popitem(last=False)
+                self._plancher = generation
+
+            if self._entrees.pop(login, None) is not None:
+                self.invalidations += 1
+
+    def vider(self):
+        """Retire toutes les entrées (ex : écriture touchant un nombre inconnu de comptes)."""
+        with self._verrou:
+            # Toute lecture en cours est considérée comme périmée
+            self._generation += 1
+            self._plancher = self._generation
+            self._invalide_a.clear()
+
+            self.invalidations += len(self._entrees)
+            self._entrees.clear()
+
+    def statistiques(self):
+        """Retourne un dict avec les compteurs du cache et le taux de succès."""
+        with self._verrou:
+            lectures = self.succes + self.echecs
+            return {
+                "taille": len(self._entrees),
+                "taille_max": self.taille_max,
+                "succes": self.succes,
+                "echecs": self.echecs,
+                "taux_succes": self.succes / lectures if lectures else 0.0,
+                "expirations": self.expirations,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "rejets": self.rejets,
+            }
+
+    def journaliser_statistiques(self):
+        """Écrit les statistiques du cache dans le journal des opérations."""
+        stats = self.statistiques()
+        logger.info(
+            f"CACHE UTILISATEURS : {stats['succes']} succès, {stats['echecs']} échecs "
+            f"({stats['taux_succes']:.0%}), {stats['evictions']} évictions, "
+            f"{stats['invalidations']} invalidations, {stats['rejets']} rejets, "
+            f"{stats['taille']}/{stats['taille_max']} entrées")
@@ -1,9 +1,14 @@
 import secrets
-import hashlib
+
+import hachage
 
 class Salarie(object):
     """Classe représentant un salarié de l'hôpital.
-       Sert de base pour la classe User (héritage)."""
+       Sert de base pour la classe User (héritage).
+       Les attributs sont déclarés dans __slots__ (pas de __dict__ par instance) :
+       un annuaire chargé en mémoire occupe ainsi nettement moins de place."""
+
+    __slots__ = ("Nom", "Prenom", "Ville")
 
     def __init__(self, nom, prenom, ville):
         """Initialise les informations principales d’un salarié."""
@@ -57,6 +62,8 @@ class User(Salarie):
     """Classe représentant un utilisateur du système.
        Hérite des informations de base d’un salarié."""
 
+    __slots__ = ("Role", "Login", "Password_Hash")
+
     def __init__(self, nom, prenom, ville, role, login=None, password_hash=None, password_expiry=None, account_locked_until=None):
         """Initialise un utilisateur en appelant d'abord la classe parent."""
         
@@ -68,6 +75,16 @@ class User(Salarie):
         self.Login = login
         self.Password_Hash = password_hash
 
+    @classmethod
+    def depuis_ligne(cls, curseur, ligne):
+        """Construit un User directement depuis une ligne SQL, sans passer par __init__.
+           Colonnes attendues : login, nom, prenom, ville, role[, password_hash, ...].
+           La signature (curseur, ligne) permet de l'utiliser comme row_factory SQLite."""
+        user = cls.__new__(cls)
+        user.Login, user.Nom, user.Prenom, user.Ville, user.Role = ligne[:5]
+        user.Password_Hash = ligne[5] if len(ligne) > 5 else None
+        return user
+
     def generer_login(self):
         """Crée le login à partir de la première lettre du prénom + le nom complet."""
         
@@ -85,17 +102,10 @@ class User(Salarie):
         return secrets.token_urlsafe(12)
     
     def hacher_mot_de_passe(self, mot_de_passe_clair):
-        """Transforme un mot de passe en hash SHA-256 pour stockage sécurisé."""
+        """Transforme un mot de passe en hash salé (PBKDF2 par défaut) pour stockage sécurisé."""
         
-        # Création d'un objet SHA-256
-        sha256 = hashlib.sha256()
-
-        # Ajout du mot de passe dans le calcul du hash
-        sha256.update(mot_de_passe_clair.encode('utf-8'))
-
-        # Stockage du résultat final (hexadécimal)
-        hash_pwd = sha256.hexdigest()
-        self.Password_Hash = hash_pwd
+        # Le format stocké contient l'algorithme, ses paramètres et le sel (cf. module hachage)
+        self.Password_Hash = hachage.hacher(mot_de_passe_clair)
     
     def verifier_mot_de_passe(self, mot_de_passe_clair):
         """Compare un mot de passe saisi avec le hash enregistré."""
@@ -104,12 +114,12 @@ class User(Salarie):
         if not self.Password_Hash:
             return False
         
-        # Hachage du mot de passe saisi
-        sha256 = hashlib.sha256()
-        sha256.update(mot_de_passe_clair.encode('utf-8'))
+        # Vérification selon l'algorithme du hash (y compris l'ancien SHA-256 non salé)
+        return hachage.verifier(self.Password_Hash, mot_de_passe_clair)
 
-        # Comparaison entre le hash calculé et celui enregistré
-        return sha256.hexdigest() == self.Password_Hash
+    def mot_de_passe_a_rehacher(self):
+        """Indique si le hash enregistré utilise un algorithme ou un coût obsolète."""
+        return hachage.necessite_rehash(self.Password_Hash)
     
     def changer_mot_de_passe(self, ancien_mot_de_passe, nouveau_mot_de_passe):
         """Effectue la modification du mot de passe après vérification."""
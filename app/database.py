@@ -1,7 +1,101 @@
 import sqlite3
+import threading
+import unicodedata
 from classes import User
+from allocation_login import AllocateurLogins
+from cache_utilisateurs import CacheUtilisateurs
+from migrations import appliquer_migrations
 from datetime import datetime, timezone
 
+# Réglages appliqués à chaque connexion ouverte par le pool
+PRAGMAS_CONNEXION = (
+    "PRAGMA journal_mode=WAL",        # lecteurs et écrivain ne se bloquent plus mutuellement
+    "PRAGMA synchronous=NORMAL",      # fsync au checkpoint uniquement (sûr en mode WAL)
+    "PRAGMA cache_size=-16000",       # ~16 Mo de cache de pages par connexion
+    "PRAGMA mmap_size=268435456",     # lecture du fichier via mmap (256 Mo max)
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA busy_timeout=5000",       # attente (ms) si un autre thread écrit
+)
+
+# Nombre de requêtes préparées conservées par connexion (réutilisées entre appels)
+TAILLE_CACHE_REQUETES = 128
+
+# Longueur minimale d'un terme pour être cherché dans l'index trigramme (3 caractères)
+LONGUEUR_MIN_TRIGRAMME = 3
+
+
+def normaliser_recherche(texte):
+    """Normalise un texte pour la recherche : minuscules et sans accents ('Élodie' -> 'elodie').
+       Pour un texte ASCII, le résultat est identique au lower() de SQLite."""
+    if texte is None:
+        return None
+    texte = str(texte)
+
+    # Cas le plus fréquent : texte sans accent
+    if texte.isascii():
+        return texte.lower()
+    decompose = unicodedata.normalize("NFKD", texte)
+    return "".join(c for c in decompose if not unicodedata.combining(c)).casefold()
+
+
+def _est_ascii(*valeurs):
+    """True si aucune des valeurs ne contient de caractère non ASCII (accents...)."""
+    return all(valeur is None or str(valeur).isascii() for valeur in valeurs)
+
+
+class PoolConnexions:
+    """Pool de connexions SQLite : une connexion persistante par thread.
+
+       Chaque thread réutilise sa propre connexion au lieu d'ouvrir/fermer le
+       fichier à chaque requête, ce qui évite de relire le schéma et de
+       re-préparer les requêtes. Toutes les connexions sont fermées par fermer()."""
+
+    def __init__(self, nom_base):
+        self.nom_base = nom_base
+        self._local = threading.local()
+
+        # Liste de toutes les connexions ouvertes (tous threads confondus) pour la fermeture
+        self._connexions = []
+        self._verrou = threading.Lock()
+
+    def _ouvrir(self):
+        """Ouvre une nouvelle connexion configurée et l'enregistre dans le pool."""
+        # check_same_thread=False : seule fermer() manipule une connexion depuis un autre thread
+        connexion = sqlite3.connect(
+            self.nom_base,
+            check_same_thread=False,
+            cached_statements=TAILLE_CACHE_REQUETES
+        )
+        for pragma in PRAGMAS_CONNEXION:
+            connexion.execute(pragma)
+
+        with self._verrou:
+            self._connexions.append(connexion)
+        return connexion
+
+    def obtenir(self):
+        """Retourne la connexion du thread courant (ouverte au premier appel)."""
+        connexion = getattr(self._local, "connexion", None)
+        if connexion is None:
+            connexion = self._ouvrir()
+            self._local.connexion = connexion
+        return connexion
+
+    def fermer(self):
+        """Ferme toutes les connexions du pool (arrêt propre de l'application)."""
+        with self._verrou:
+            connexions, self._connexions = self._connexions, []
+
+            # Nouveau stockage local : les threads rouvriront une connexion si besoin
+            self._local = threading.local()
+
+        for connexion in connexions:
+            try:
+                connexion.close()
+            except sqlite3.Error:
+                pass
+
+
 class DatabaseManager:
     """Classe responsable de la gestion de la base SQLite.
        Contient toutes les opérations CRUD (Create, Read, Update, Delete)."""
@@ -9,6 +103,15 @@ class DatabaseManager:
     def __init__(self, nom_base="utilisateurs.db"):
         """Initialise la base de données en créant le fichier et la table si nécessaire."""
         self.nom_base = nom_base
+
+        # Pool de connexions persistantes (une par thread)
+        self.pool = PoolConnexions(nom_base)
+
+        # Attribution des logins uniques (suffixes mémorisés par login de base)
+        self.allocateur_logins = AllocateurLogins(self)
+
+        # Cache des comptes lus par login (invalidé à chaque écriture)
+        self.cache_utilisateurs = CacheUtilisateurs()
         
         # Création de la table si elle n'existe pas déjà
         self.creer_table()
@@ -17,39 +120,129 @@ class DatabaseManager:
         self.initialiser_super_admin()
     
     def get_connexion(self):
-        """Retourne une nouvelle connexion à la base SQLite."""
-        return sqlite3.connect(self.nom_base)
+        """Retourne la connexion SQLite du thread courant, issue du pool.
+           La connexion est partagée : elle ne doit pas être fermée par l'appelant."""
+        return self.pool.obtenir()
+
+    def fermer(self):
+        """Ferme proprement toutes les connexions ouvertes sur la base."""
+        self.cache_utilisateurs.journaliser_statistiques()
+        self.cache_utilisateurs.vider()
+        self.pool.fermer()
     
     def creer_table(self):
-        """Crée la table principale 'utilisateurs' si elle n'existe pas."""
+        """Crée ou met à niveau le schéma (table 'utilisateurs' et ses index)
+           en appliquant les migrations versionnées du module migrations."""
         
+        appliquer_migrations(self.get_connexion())
+
+        # Index plein texte utilisé par rechercher_utilisateurs()
+        self.creer_index_recherche()
+
+    def creer_index_recherche(self):
+        """Crée l'index plein texte FTS5 (trigrammes) sur login/nom/prénom/ville/rôle.
+
+           L'index est maintenu par des triggers sur la table 'utilisateurs' qui
+           n'utilisent que des fonctions intégrées à SQLite (lower()) : toute autre
+           application ouvrant la base (sqlite3, outil d'administration...) peut
+           donc écrire dans la table. Les valeurs accentuées sont ensuite
+           normalisées en Python (voir _affiner_index_recherche), au fil des
+           écritures de l'application et, pour les écritures externes, au démarrage.
+           Si FTS5 n'est pas disponible, la recherche se rabat sur des LIKE."""
+
         connexion = self.get_connexion()
         curseur = connexion.cursor()
-        
-        # Création de la table avec les colonnes essentielles du système
-        curseur.execute("""
-            CREATE TABLE IF NOT EXISTS utilisateurs (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                login TEXT UNIQUE NOT NULL,
-                nom TEXT NOT NULL,
-                prenom TEXT NOT NULL,
-                ville TEXT NOT NULL,
-                role TEXT NOT NULL,
-                password_hash TEXT NOT NULL,
-                password_expiry DATE NOT NULL,
-                account_locked_until DATE
-            )
-        """)
-        
-        # Garantit qu'il ne peut y avoir qu'un Admin ou Super Admin par ville
+
         curseur.execute("""
-            CREATE UNIQUE INDEX IF NOT EXISTS unique_admin_superadmin_ville
-            ON utilisateurs(ville)
-            WHERE role IN ('Admin', 'Super Admin')
+            SELECT 1 FROM sqlite_master
+            WHERE type = 'table' AND name = 'utilisateurs_recherche'
         """)
-        
-        connexion.commit()
-        connexion.close()
+        deja_present = curseur.fetchone() is not None
+
+        try:
+            with connexion:
+                curseur.execute("""
+                    CREATE VIRTUAL TABLE IF NOT EXISTS utilisateurs_recherche
+                    USING fts5(login, nom, prenom, ville, role, tokenize = 'trigram')
+                """)
+
+                # Recréés à chaque démarrage : les anciennes versions appelaient une
+                # fonction Python absente des connexions des autres clients SQLite
+                curseur.execute("DROP TRIGGER IF EXISTS utilisateurs_recherche_insertion")
+                curseur.execute("DROP TRIGGER IF EXISTS utilisateurs_recherche_modification")
+
+                # Synchronisation automatique de l'index à chaque écriture dans la table
+                curseur.execute("""
+                    CREATE TRIGGER utilisateurs_recherche_insertion
+                    AFTER INSERT ON utilisateurs BEGIN
+                        INSERT INTO utilisateurs_recherche (rowid, login, nom, prenom, ville, role)
+                        VALUES (new.id, lower(new.login), lower(new.nom), lower(new.prenom),
+                                lower(new.ville), lower(new.role));
+                    END
+                """)
+                curseur.execute("""
+                    CREATE TRIGGER utilisateurs_recherche_modification
+                    AFTER UPDATE OF login, nom, prenom, ville, role ON utilisateurs BEGIN
+                        UPDATE utilisateurs_recherche
+                        SET login = lower(new.login), nom = lower(new.nom), prenom = lower(new.prenom),
+                            ville = lower(new.ville), role = lower(new.role)
+                        WHERE rowid = old.id;
+                    END
+                """)
+                curseur.execute("""
+                    CREATE TRIGGER IF NOT EXISTS utilisateurs_recherche_suppression
+                    AFTER DELETE ON utilisateurs BEGIN
+                        DELETE FROM utilisateurs_recherche WHERE rowid = old.id;
+                    END
+                """)
+
+                # Base existante : indexation initiale des comptes déjà présents
+                if not deja_present:
+                    curseur.execute("""
+                        INSERT INTO utilisateurs_recherche (rowid, login, nom, prenom, ville, role)
+                        SELECT id, lower(login), lower(nom), lower(prenom), lower(ville), lower(role)
+                        FROM utilisateurs
+                    """)
+
+                # Comptes accentués indexés par les triggers seuls (écritures externes)
+                self.recherche_fts = True
+                self._affiner_index_recherche(curseur)
+
+        except sqlite3.OperationalError as erreur:
+            # SQLite compilé sans FTS5 / sans tokenizer trigram (version < 3.34)
+            print(f"Avertissement : index de recherche indisponible ({erreur}).")
+            self.recherche_fts = False
+
+    def _affiner_index_recherche(self, curseur, filtre="1", params=()):
+        """Remplace, dans l'index de recherche, les valeurs posées par les triggers
+           (lower() de SQLite, qui garde les accents) par celles de normaliser_recherche()
+           pour les comptes sélectionnés par 'filtre' (condition sur 'u').
+           Seuls les comptes contenant des caractères non ASCII sont relus et seules
+           les lignes réellement différentes sont réécrites. À appeler dans la
+           transaction de l'écriture, avant sa validation."""
+        if not self.recherche_fts:
+            return
+
+        curseur.execute(f"""
+            SELECT u.id, u.login, u.nom, u.prenom, u.ville, u.role,
+                   f.login, f.nom, f.prenom, f.ville, f.role
+            FROM utilisateurs u
+            JOIN utilisateurs_recherche f ON f.rowid = u.id
+            WHERE ({filtre}) AND u.login || u.nom || u.prenom || u.ville || u.role GLOB '*[^ -~]*'
+        """, params)
+
+        corrections = []
+        for ligne in curseur.fetchall():
+            attendu = tuple(normaliser_recherche(valeur) for valeur in ligne[1:6])
+            if attendu != ligne[6:]:
+                corrections.append(attendu + (ligne[0],))
+
+        if corrections:
+            curseur.executemany("""
+                UPDATE utilisateurs_recherche
+                SET login = ?, nom = ?, prenom = ?, ville = ?, role = ?
+                WHERE rowid = ?
+            """, corrections)
     
     def initialiser_super_admin(self):
         """Crée un compte Super Admin par défaut si la base est vide."""
@@ -60,9 +253,7 @@ class DatabaseManager:
         # On vérifie combien d'utilisateurs existent actuellement dans la base
         curseur.execute("SELECT COUNT(*) FROM utilisateurs")
         nombre_users = curseur.fetchone()[0]
-        
-        connexion.close()
-        
+
         # Si aucun utilisateur, on crée le Super Admin automatiquement
         if nombre_users == 0:
             print("\n" + "=" * 60)
@@ -96,6 +287,7 @@ class DatabaseManager:
     def ajouter_utilisateur(self, user):
         """Ajoute un nouvel utilisateur dans la base de données."""
 
+        connexion = None
         try:
             connexion = self.get_connexion()
             curseur = connexion.cursor()
@@ -110,12 +302,19 @@ class DatabaseManager:
             """,
             (user.Login, user.Nom, user.Prenom, user.Ville, user.Role, user.Password_Hash))
 
+            # Normalisation des accents dans l'index de recherche (même transaction)
+            if not _est_ascii(user.Login, user.Nom, user.Prenom, user.Ville, user.Role):
+                self._affiner_index_recherche(curseur, "u.login = ?", (user.Login,))
+
             connexion.commit()
-            connexion.close()
+            self.cache_utilisateurs.invalider(user.Login)
             return True
         
         except sqlite3.IntegrityError as erreur:
             """Gestion spécifique des erreurs d'intégrité."""
+            # La connexion est persistante : on annule la transaction ouverte par l'INSERT
+            connexion.rollback()
+
             # Erreur si deux Admin/Super Admin sur la même ville ou login déjà existant
             message = str(erreur)
             if "unique_admin_superadmin_ville" in message:
@@ -131,55 +330,84 @@ class DatabaseManager:
         except Exception as erreur:
             """Gestion générique des autres erreurs lors de l'insertion."""
             # Capture d'éventuelles erreurs SQLite ou autres exceptions
+            if connexion is not None:
+                connexion.rollback()
             print(f"Erreur lors de l'ajout : {erreur}")
             return False
-    
+
+    def ajouter_utilisateurs_en_masse(self, users):
+        """Insère une liste d'utilisateurs en une seule transaction (executemany).
+           Retourne le nombre de lignes insérées. En cas de violation d'intégrité,
+           la transaction entière est annulée et l'exception sqlite3 est propagée
+           pour que l'appelant puisse identifier la ligne fautive."""
+
+        connexion = self.get_connexion()
+        curseur = connexion.cursor()
+
+        # Un seul COMMIT (et donc un seul fsync) pour tout le lot
+        with connexion:
+            curseur.executemany("""
+                INSERT INTO utilisateurs (
+                    login, nom, prenom, ville, role, password_hash,
+                    password_expiry, account_locked_until
+                )
+                VALUES (?, ?, ?, ?, ?, ?, datetime('now', '+90 day'), datetime('now'))
+            """,
+            [(user.Login, user.Nom, user.Prenom, user.Ville, user.Role, user.Password_Hash)
+             for user in users])
+
+            # Normalisation des accents dans l'index, pour les seuls comptes concernés
+            for user in users:
+                if not _est_ascii(user.Login, user.Nom, user.Prenom, user.Ville, user.Role):
+                    self._affiner_index_recherche(curseur, "u.login = ?", (user.Login,))
+
+        for user in users:
+            self.cache_utilisateurs.invalider(user.Login)
+        return len(users)
+
+    def lister_noms_prenoms(self):
+        """Retourne l'ensemble des couples (nom, prénom) déjà présents dans la base."""
+
+        curseur = self.get_connexion().cursor()
+        curseur.execute("SELECT nom, prenom FROM utilisateurs")
+        return {(row[0], row[1]) for row in curseur}
+
     def rechercher_par_login(self, login, ville_visible=None):
         """Recherche un utilisateur dans la base grâce à son login.
            Si 'ville_visible' est renseigné, la recherche est limitée à cette ville
-           (utilisé pour restreindre la visibilité d'un admin à sa propre ville)."""
+           (utilisé pour restreindre la visibilité d'un admin à sa propre ville).
+           Les comptes lus sont conservés dans le cache (voir cache_utilisateurs)."""
 
-        connexion = self.get_connexion()
-        curseur = connexion.cursor()
-        
-        # Sélection de toutes les informations importantes du compte
-        if ville_visible is None:
-            # Recherche globale par login (Super Admin)
+        resultat = self.cache_utilisateurs.lire(login)
+
+        if resultat is None:
+            connexion = self.get_connexion()
+            curseur = connexion.cursor()
+
+            # Jeton pris avant la lecture : une écriture concurrente du compte (validée
+            # puis invalidée pendant le SELECT) empêchera de mettre en cache une ligne périmée
+            jeton = self.cache_utilisateurs.jeton()
+
+            # Sélection de toutes les informations importantes du compte
             curseur.execute("""
                 SELECT login, nom, prenom, ville, role,
                     password_hash, password_expiry, account_locked_until
                 FROM utilisateurs
                 WHERE login = ?
-            """, (login,))          
-        
-        else:
-            # L'admin ne voit que les utilisateurs de sa ville
-            curseur.execute("""
-                SELECT login, nom, prenom, ville, role,
-                    password_hash, password_expiry, account_locked_until
-                FROM utilisateurs
-                WHERE login = ? AND ville = ?
-            """, (login, ville_visible))
-        
-        resultat = curseur.fetchone()
-        connexion.close()
-        
-        if resultat:
-            # Reconstruction d'un objet User à partir des données SQL
-            user = User(
-                nom=resultat[1],
-                prenom=resultat[2],
-                ville=resultat[3],
-                role=resultat[4],
-                login=resultat[0],
-                password_hash=resultat[5],
-                password_expiry=resultat[6],
-                account_locked_until=resultat[7]
-            )
-            return user
-        
-        # Aucun utilisateur trouvé
-        return None
+            """, (login,))
+            resultat = curseur.fetchone()
+
+            # Aucun utilisateur trouvé
+            if resultat is None:
+                return None
+            self.cache_utilisateurs.memoriser(login, resultat, jeton)
+
+        # L'admin ne voit que les utilisateurs de sa ville
+        if ville_visible is not None and resultat[3] != ville_visible:
+            return None
+
+        # Reconstruction d'un objet User à partir de la ligne SQL
+        return User.depuis_ligne(None, resultat)
     
     def rechercher_par_nom_prenom(self, nom, prenom, ville_visible=None):
         """Recherche un utilisateur à partir d'un nom et d'un prénom.
@@ -187,6 +415,9 @@ class DatabaseManager:
 
         connexion = self.get_connexion()
         curseur = connexion.cursor()
+
+        # Les lignes sont directement converties en objets User
+        curseur.row_factory = User.depuis_ligne
         
         if ville_visible is None:
             # Recherche globale sur nom + prénom
@@ -206,67 +437,174 @@ class DatabaseManager:
                 WHERE nom = ? AND prenom = ? AND ville = ?
             """, (nom, prenom, ville_visible))
         
-        resultat = curseur.fetchone()
-        connexion.close()
-        
-        if resultat:
-            # Construction d'un User avec les données trouvées
-            user = User(
-                nom=resultat[1],
-                prenom=resultat[2],
-                ville=resultat[3],
-                role=resultat[4],
-                login=resultat[0],
-                password_hash=resultat[5],
-                password_expiry=resultat[6],
-                account_locked_until=resultat[7]
-            )
-            return user
-        
-        return None
+        # User trouvé, ou None
+        return curseur.fetchone()
         
     def lister_tous_utilisateurs(self, ville_visible=None):
         """Retourne la liste des utilisateurs présents dans la base.
-           Si 'ville_visible' est renseigné, ne retourne que les utilisateurs de cette ville."""
+           Si 'ville_visible' est renseigné, ne retourne que les utilisateurs de cette ville.
+           Charge toute la table en mémoire : préférer iterer_utilisateurs() ou
+           lister_page_utilisateurs() sur un annuaire volumineux."""
+        return list(self.iterer_utilisateurs(ville_visible))
 
-        connexion = self.get_connexion()
-        curseur = connexion.cursor()
-        
-        # Sélection basique des champs nécessaires à l'affichage
-        # Super Admin : pas de filtre sur la ville
+    def compter_utilisateurs(self, ville_visible=None):
+        """Retourne le nombre d'utilisateurs (de la ville 'ville_visible' si renseignée)."""
+
+        curseur = self.get_connexion().cursor()
         if ville_visible is None:
-            curseur.execute("""
-                SELECT login, nom, prenom, ville, role
-                FROM utilisateurs
-                ORDER BY login
-            """)
+            curseur.execute("SELECT COUNT(*) FROM utilisateurs")
+        else:
+            curseur.execute("SELECT COUNT(*) FROM utilisateurs WHERE ville = ?", (ville_visible,))
+        return curseur.fetchone()[0]
+
+    def lister_page_utilisateurs(self, ville_visible=None, apres=None, avant=None, taille_page=50):
+        """Retourne une page d'utilisateurs triés par login (pagination par clé).
+
+           'apres'  : login du dernier élément de la page précédente -> page suivante.
+           'avant'  : login du premier élément de la page courante -> page précédente.
+           Sans curseur, retourne la première page. Chaque page est lue directement
+           sur l'index de 'login' (WHERE login > ? LIMIT n), quel que soit son rang.
+           Retourne un tuple (liste d'objets User, curseur_precedent, curseur_suivant) ;
+           un curseur vaut None lorsqu'il n'y a pas de page dans cette direction."""
+
+        conditions = []
+        valeurs = []
+
         # Admin ou filtre manuel : limitation à la ville spécifiée
+        if ville_visible is not None:
+            conditions.append("ville = ?")
+            valeurs.append(ville_visible)
+
+        # Lecture à reculons pour la page précédente, puis remise dans l'ordre
+        en_arriere = avant is not None
+        if en_arriere:
+            conditions.append("login < ?")
+            valeurs.append(avant)
+        elif apres is not None:
+            conditions.append("login > ?")
+            valeurs.append(apres)
+
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        ordre = "DESC" if en_arriere else "ASC"
+
+        curseur = self.get_connexion().cursor()
+        curseur.row_factory = User.depuis_ligne
+
+        # Une ligne de plus que la page pour savoir s'il reste des éléments au-delà
+        curseur.execute(f"""
+            SELECT login, nom, prenom, ville, role
+            FROM utilisateurs
+            {where}
+            ORDER BY login {ordre}
+            LIMIT ?
+        """, valeurs + [taille_page + 1])
+        users = curseur.fetchall()
+
+        encore = len(users) > taille_page
+        del users[taille_page:]
+        if en_arriere:
+            users.reverse()
+
+        if not users:
+            return [], None, None
+
+        if en_arriere:
+            curseur_precedent = users[0].Login if encore else None
+            curseur_suivant = users[-1].Login
         else:
-            curseur.execute("""
-                SELECT login, nom, prenom, ville, role
-                FROM utilisateurs
-                WHERE ville = ?
-                ORDER BY login
-            """, (ville_visible,))
-        
-        resultats = curseur.fetchall()
-        connexion.close()
-        
-        liste_users = []
-
-        # On crée une liste d'objets User pour faciliter la gestion
-        for row in resultats:
-            user = User(
-                nom=row[1],
-                prenom=row[2],
-                ville=row[3],
-                role=row[4],
-                login=row[0]
-            )
-            liste_users.append(user)
-        
-        return liste_users
-    
+            curseur_precedent = users[0].Login if apres is not None else None
+            curseur_suivant = users[-1].Login if encore else None
+
+        return users, curseur_precedent, curseur_suivant
+
+    def iterer_utilisateurs(self, ville_visible=None, taille_page=500):
+        """Générateur parcourant tous les utilisateurs triés par login, page par page.
+           La mémoire utilisée est bornée par 'taille_page', quelle que soit la taille de la table."""
+
+        apres = None
+        while True:
+            users, _, apres = self.lister_page_utilisateurs(ville_visible, apres=apres,
+                                                           taille_page=taille_page)
+            yield from users
+            if apres is None:
+                break
+
+    def rechercher_utilisateurs(self, recherche, ville_visible=None, limite=20, decalage=0):
+        """Recherche plein texte sur login, nom, prénom, ville et rôle.
+           Chaque mot saisi doit apparaître (n'importe où, sans tenir compte de la
+           casse ni des accents) dans au moins une colonne. Les résultats sont
+           classés par pertinence (bm25, le login pesant le plus) puis paginés.
+           Si 'ville_visible' est renseigné, limite la recherche à cette ville.
+           Retourne un tuple (liste d'objets User de la page, nombre total de résultats)."""
+
+        termes = normaliser_recherche(recherche).split()
+        if not termes:
+            return [], 0
+
+        connexion = self.get_connexion()
+        curseur = connexion.cursor()
+
+        filtre_ville = ""
+        params_ville = []
+        if ville_visible is not None:
+            filtre_ville = "AND u.ville = ?"
+            params_ville = [ville_visible]
+
+        # Cas nominal : tous les termes sont assez longs pour l'index trigramme
+        if self.recherche_fts and all(len(t) >= LONGUEUR_MIN_TRIGRAMME for t in termes):
+            # Chaque terme est une phrase FTS5 (guillemets doublés), combinés par AND
+            expression = " AND ".join('"' + t.replace('"', '""') + '"' for t in termes)
+
+            # CROSS JOIN impose de partir de l'index plein texte : sinon, avec le filtre
+            # de ville, SQLite parcourt la ville et réévalue le MATCH pour chaque compte
+            curseur.execute(f"""
+                SELECT COUNT(*)
+                FROM utilisateurs_recherche f
+                CROSS JOIN utilisateurs u ON u.id = f.rowid
+                WHERE utilisateurs_recherche MATCH ? {filtre_ville}
+            """, [expression] + params_ville)
+            total = curseur.fetchone()[0]
+
+            curseur.execute(f"""
+                SELECT u.login, u.nom, u.prenom, u.ville, u.role
+                FROM utilisateurs_recherche f
+                CROSS JOIN utilisateurs u ON u.id = f.rowid
+                WHERE utilisateurs_recherche MATCH ? {filtre_ville}
+                ORDER BY bm25(utilisateurs_recherche, 10.0, 5.0, 5.0, 1.0, 1.0), u.login
+                LIMIT ? OFFSET ?
+            """, [expression] + params_ville + [limite, decalage])
+
+        # Terme court (1-2 caractères) ou FTS5 indisponible : balayage par LIKE
+        else:
+            source = "utilisateurs_recherche f JOIN utilisateurs u ON u.id = f.rowid" \
+                if self.recherche_fts else "utilisateurs u"
+            colonnes = "f" if self.recherche_fts else "u"
+
+            conditions = []
+            params = []
+            for terme in termes:
+                conditions.append(
+                    f"({colonnes}.login LIKE ? OR {colonnes}.nom LIKE ? OR {colonnes}.prenom LIKE ? "
+                    f"OR {colonnes}.ville LIKE ? OR {colonnes}.role LIKE ?)")
+                params.extend([f"%{terme}%"] * 5)
+            clause = " AND ".join(conditions)
+
+            curseur.execute(f"SELECT COUNT(*) FROM {source} WHERE {clause} {filtre_ville}",
+                            params + params_ville)
+            total = curseur.fetchone()[0]
+
+            curseur.execute(f"""
+                SELECT u.login, u.nom, u.prenom, u.ville, u.role
+                FROM {source}
+                WHERE {clause} {filtre_ville}
+                ORDER BY u.login
+                LIMIT ? OFFSET ?
+            """, params + params_ville + [limite, decalage])
+
+        # Conversion des lignes en objets User au moment de la lecture
+        curseur.row_factory = User.depuis_ligne
+        return curseur.fetchall(), total
+
     def modifier_utilisateur(self, login, nouveau_nom=None, nouveau_prenom=None, 
                             nouvelle_ville=None, nouveau_role=None, nouveau_hash=None, nouvelle_expiration=None):
         """Met à jour un ou plusieurs champs d'un utilisateur.
@@ -313,12 +651,15 @@ class DatabaseManager:
         # Construction finale de la requête SQL
         requete = f"UPDATE utilisateurs SET {', '.join(champs_a_modifier)} WHERE login = ?"
         
-        # Exécution et sauvegarde
-        curseur.execute(requete, valeurs)
-        connexion.commit()
-        
-        lignes_modifiees = curseur.rowcount
-        connexion.close()
+        # Exécution et sauvegarde (le bloc 'with' valide, ou annule en cas d'erreur)
+        with connexion:
+            curseur.execute(requete, valeurs)
+            lignes_modifiees = curseur.rowcount
+
+            # Le trigger a réindexé le compte avec lower() : normalisation des accents
+            if nouveau_nom or nouveau_prenom or nouvelle_ville or nouveau_role:
+                self._affiner_index_recherche(curseur, "u.login = ?", (login,))
+        self.cache_utilisateurs.invalider(login)
         
         # Retourne True si au moins une ligne a été modifiée
         return lignes_modifiees > 0
@@ -330,11 +671,11 @@ class DatabaseManager:
         curseur = connexion.cursor()
         
         # Suppression du compte correspondant au login
-        curseur.execute("DELETE FROM utilisateurs WHERE login = ?", (login,))
+        with connexion:
+            curseur.execute("DELETE FROM utilisateurs WHERE login = ?", (login,))
+        self.cache_utilisateurs.invalider(login)
         
-        connexion.commit()
         lignes_supprimees = curseur.rowcount
-        connexion.close()
         
         # True si au moins une ligne supprimée (login existant)
         return lignes_supprimees > 0
@@ -346,14 +687,13 @@ class DatabaseManager:
         curseur = connexion.cursor()
 
         # Mise à jour du champ de verrouillage avec une date future (verrouillage temporaire)
-        curseur.execute("""
-            UPDATE utilisateurs
-            SET account_locked_until = datetime('now', '+1 minutes')
-            WHERE login = ?
-        """, (login,))
-
-        connexion.commit()
-        connexion.close()
+        with connexion:
+            curseur.execute("""
+                UPDATE utilisateurs
+                SET account_locked_until = datetime('now', '+1 minutes')
+                WHERE login = ?
+            """, (login,))
+        self.cache_utilisateurs.invalider(login)
 
     def existe_admin_ou_superadmin_dans_ville(self, ville):
         """Vérifie s'il existe déjà un Admin ou Super Admin dans une ville donnée.
@@ -371,7 +711,6 @@ class DatabaseManager:
         """, (ville,))
 
         row = curseur.fetchone()
-        connexion.close()
 
         if row:
             return {"login": row[0], "role": row[1]}
@@ -393,7 +732,6 @@ class DatabaseManager:
         """, (login,))
         
         resultats = curseur.fetchone()
-        connexion.close()
         
         # Si aucun enregistrement, le compte n'est pas bloqué
         if resultats is None:
@@ -20,3 +20,7 @@ class ReseauInvalideError(ErreurReseau):
 
 class PseudoInvalideError(ErreurReseau):
     """Levée quand un client de chat fournit un pseudo vide."""
+
+
+class HoteIntrouvableError(ErreurReseau):
+    """Levée quand le nom d'hôte à scanner ne peut pas être résolu (ex : 'hote.inexistant')."""
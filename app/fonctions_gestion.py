@@ -1,5 +1,7 @@
 import getpass
+import logging
 
+import hachage
 from classes import User
 from datetime import datetime, timedelta
 
@@ -18,6 +20,10 @@ VILLES_DISPONIBLES = [
     "Grenoble"
 ]
 
+# Nombre de résultats affichés par page lors d'une recherche / d'un listing
+TAILLE_PAGE_RECHERCHE = 20
+TAILLE_PAGE_LISTE = 20
+
 
 def est_entier(valeur):
     """Vérifie si une chaîne peut être convertie en entier."""
@@ -146,20 +152,8 @@ def creer_utilisateur(db, user_connecte):
     # Création de l’objet User
     user = User(nom, prenom, ville, role)
     
-    # Génération du login initial
-    user.generer_login()
-    login_de_base = user.Login
-    
-    # Vérification que le login n'existe pas déjà
-    nouveau_login = login_de_base
-    suffixe = 1
-
-    # Incrémentation automatique en cas de doublon de login
-    while db.rechercher_par_login(nouveau_login) is not None:
-        nouveau_login = f"{login_de_base}{suffixe}"
-        suffixe += 1
-    
-    user.Login = nouveau_login 
+    # Génération du login : login de base + premier suffixe libre (une requête au plus)
+    login_de_base = db.allocateur_logins.allouer_pour(user)
     
     # Génération d'un mot de passe temporaire
     mot_de_passe_clair = user.generer_mot_de_passe()
@@ -174,6 +168,9 @@ def creer_utilisateur(db, user_connecte):
         print(f"Rôle : {user.Role}")
         print(f"Mot de passe temporaire : {mot_de_passe_clair}")
         print("\n⚠ IMPORTANT : Notez ce mot de passe, il ne sera plus affiché.")
+    else:
+        # Le login a pu être pris par un autre processus : la prochaine attribution relira la base
+        db.allocateur_logins.oublier(login_de_base)
 
 
 def consulter_profil(user_connecte):
@@ -198,7 +195,7 @@ def consulter_liste_utilisateurs(db, user_connecte):
 
         # Option 1 : toutes les villes
         if choix == "1":
-            liste_users = db.lister_tous_utilisateurs()
+            ville_cible = None
         
         # Option 2 : filtrer par ville 
         elif choix == "2":
@@ -213,7 +210,6 @@ def consulter_liste_utilisateurs(db, user_connecte):
 
                 if 0 <= index < len(VILLES_DISPONIBLES):
                     ville_cible = VILLES_DISPONIBLES[index]
-                    liste_users = db.lister_tous_utilisateurs(ville_visible=ville_cible)
                 else:
                     print("Erreur : numéro de ville invalide.")
                     return
@@ -229,80 +225,70 @@ def consulter_liste_utilisateurs(db, user_connecte):
     
     # l'admin classique ne peut voir que sa propre ville
     else:
-        liste_users = db.lister_tous_utilisateurs(ville_filter=user_connecte.Ville)
+        ville_cible = user_connecte.Ville
+
+    # Seule la page affichée est chargée en mémoire (pagination par login)
+    liste_users, precedent, suivant = db.lister_page_utilisateurs(
+        ville_visible=ville_cible, taille_page=TAILLE_PAGE_LISTE)
 
     # Vérification des résultats
     if not liste_users:
         print("\nAucun utilisateur trouvé pour ce filtre.")
         return
     
-    print(f"\nNombre total d'utilisateurs : {len(liste_users)}\n")
-    print("-" * 80)
-    print(f"{'Login':<15} | {'Nom complet':<25} | {'Rôle':<15} | {'Ville':<15}")
-    print("-" * 80)
-    
-    # Affichage formaté
-    for user in liste_users:
-        nom_complet = f"{user.Prenom} {user.Nom}"
-        print(f"{user.Login:<15} | {nom_complet:<25} | {user.Role:<15} | {user.Ville:<15}")
-    
-    print("-" * 80)
+    print(f"\nNombre total d'utilisateurs : {db.compter_utilisateurs(ville_cible)}\n")
 
-def recherche_generale(db, recherche, user_connecte):
-    """
-    Effectue une recherche dans plusieurs colonnes :
-    login, nom, prénom, ville, rôle.
-    Retourne une liste d’objets User correspondants.
-    """
-
-    connexion = db.get_connexion()
-    curseur = connexion.cursor()
-
-    pattern = f"%{recherche}%"
-
-    # Super Admin : pas de filtrage sur la ville
-    if est_superadmin(user_connecte):
-        curseur.execute("""
-            SELECT login, nom, prenom, ville, role, password_expiry
-            FROM utilisateurs
-            WHERE login  LIKE ?
-               OR nom    LIKE ?
-               OR prenom LIKE ?
-               OR ville  LIKE ?
-               OR role   LIKE ?
-        """, (pattern, pattern, pattern, pattern, pattern))
-
-    # Admin : filtrage sur sa ville
-    else:
-        curseur.execute("""
-            SELECT login, nom, prenom, ville, role, password_expiry
-            FROM utilisateurs
-            WHERE (login  LIKE ?
-               OR nom    LIKE ?
-               OR prenom LIKE ?
-               OR ville  LIKE ?
-               OR role   LIKE ?)
-              AND ville = ?
-        """, (pattern, pattern, pattern, pattern, pattern, user_connecte.Ville))
+    while True:
+        print("-" * 80)
+        print(f"{'Login':<15} | {'Nom complet':<25} | {'Rôle':<15} | {'Ville':<15}")
+        print("-" * 80)
         
-    resultats = curseur.fetchall()
-    connexion.close()
+        # Affichage formaté
+        for user in liste_users:
+            nom_complet = f"{user.Prenom} {user.Nom}"
+            print(f"{user.Login:<15} | {nom_complet:<25} | {user.Role:<15} | {user.Ville:<15}")
+        
+        print("-" * 80)
+
+        # Une seule page : rien à naviguer
+        if precedent is None and suivant is None:
+            break
+
+        options = []
+        if suivant is not None:
+            options.append("s : suivante")
+        if precedent is not None:
+            options.append("p : précédente")
+        options.append("q : quitter")
+        choix = input(f"\nNavigation ({', '.join(options)}) : ").strip().lower()
+
+        if choix == "s" and suivant is not None:
+            liste_users, precedent, suivant = db.lister_page_utilisateurs(
+                ville_visible=ville_cible, apres=suivant, taille_page=TAILLE_PAGE_LISTE)
+        elif choix == "p" and precedent is not None:
+            liste_users, precedent, suivant = db.lister_page_utilisateurs(
+                ville_visible=ville_cible, avant=precedent, taille_page=TAILLE_PAGE_LISTE)
+        elif choix == "q":
+            break
+        else:
+            print("Choix invalide.")
 
-    utilisateurs = []
+def recherche_generale(db, recherche, user_connecte, page=1, taille_page=TAILLE_PAGE_RECHERCHE):
+    """
+    Effectue une recherche plein texte dans plusieurs colonnes :
+    login, nom, prénom, ville, rôle (insensible à la casse et aux accents).
+    Retourne un tuple (liste d’objets User de la page demandée, nombre total de résultats).
+    """
 
-    # Reconstruction d’un User pour chaque ligne trouvée
-    for resultat in resultats:
-        user = User(
-            nom=resultat[1],
-            prenom=resultat[2],
-            ville=resultat[3],
-            role=resultat[4],
-            login=resultat[0],
-            password_expiry=resultat[5],
-        )
-        utilisateurs.append(user)
+    # Super Admin : pas de filtrage sur la ville ; Admin : limité à sa ville
+    ville_visible = None if est_superadmin(user_connecte) else user_connecte.Ville
 
-    return utilisateurs
+    return db.rechercher_utilisateurs(
+        recherche,
+        ville_visible=ville_visible,
+        limite=taille_page,
+        decalage=(page - 1) * taille_page
+    )
 
 
 def rechercher_utilisateur(db, user_connecte):
@@ -317,28 +303,41 @@ def rechercher_utilisateur(db, user_connecte):
         print("\nErreur : La recherche ne peut pas être vide.")
         return
 
-    # Appel de la recherche globale
-    
-    utilisateurs_trouves = recherche_generale(db, recherche, user_connecte)
+    # Appel de la recherche globale (première page)
+    page = 1
+    utilisateurs_trouves, total = recherche_generale(db, recherche, user_connecte, page)
 
     # Gestion d’absence de résultat
     if not utilisateurs_trouves:
         print(f"\nErreur : Aucun utilisateur trouvé correspondant à '{recherche}'.")
         return
     
-    print(f"\n {len(utilisateurs_trouves)} utilisateur(s) trouvé(s) pour '{recherche}':")
+    print(f"\n {total} utilisateur(s) trouvé(s) pour '{recherche}':")
     
     # Si un seul utilisateur, on affiche sa fiche complète
-    if len(utilisateurs_trouves) == 1:
+    if total == 1:
         utilisateurs_trouves[0].Afficher_User()
         return
     
-    # Sinon, tableau récapitulatif
-    print(f"\n{'Login':<12} {'Nom':<12} {'Prénom':<12} {'Ville':<12} {'Rôle'}")
-    print("-" * 65)
-    
-    for user in utilisateurs_trouves:
-        print(f"{user.Login:<12} {user.Nom:<12} {user.Prenom:<12} {user.Ville:<12} {user.Role}")
+    nb_pages = (total + TAILLE_PAGE_RECHERCHE - 1) // TAILLE_PAGE_RECHERCHE
+
+    # Sinon, tableau récapitulatif page par page (résultats les plus pertinents d'abord)
+    while True:
+        print(f"\n{'Login':<12} {'Nom':<12} {'Prénom':<12} {'Ville':<12} {'Rôle'}")
+        print("-" * 65)
+        
+        for user in utilisateurs_trouves:
+            print(f"{user.Login:<12} {user.Nom:<12} {user.Prenom:<12} {user.Ville:<12} {user.Role}")
+
+        if page >= nb_pages:
+            break
+
+        choix = input(f"\nPage {page}/{nb_pages} - Entrée : page suivante, q : quitter : ").strip().lower()
+        if choix == "q":
+            break
+
+        page += 1
+        utilisateurs_trouves, _ = recherche_generale(db, recherche, user_connecte, page)
 
 
 def modifier_utilisateur(db, user_connecte):
@@ -574,8 +573,15 @@ def authentifier_utilisateur(db):
         # getpass masque la saisie (aucun caractère affiché) contrairement à input()
         mot_de_passe = getpass.getpass("Mot de passe : ")
 
-        # Vérification du mot de passe via le hash
-        if user.verifier_mot_de_passe(mot_de_passe):
+        # Vérification du hash dans le pool de processus (calcul volontairement coûteux)
+        if hachage.soumettre_verification(user.Password_Hash, mot_de_passe).result():
+
+            # Mise à niveau transparente d'un hash ancien (SHA-256) ou de coût insuffisant
+            if user.mot_de_passe_a_rehacher():
+                user.hacher_mot_de_passe(mot_de_passe)
+                if db.modifier_utilisateur(user.Login, nouveau_hash=user.Password_Hash):
+                    logging.info(f"HACHAGE : mot de passe de '{user.Login}' re-haché au format actuel")
+
             print(f"\nAuthentification réussie. Bienvenue {user.Prenom} {user.Nom} !")
             return user
         
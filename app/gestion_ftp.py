@@ -1,9 +1,17 @@
-from ftplib import FTP
-import io
+from ftplib import all_errors, error_perm
 import os
 import logging
-import threading
-from datetime import datetime, timedelta
+from datetime import datetime, timezone
+
+from transfert_ftp import EnvoiAvecEmpreintes, MoteurTransfertFTP, formater_debit, telecharger_vers_fichier
+from sauvegarde_incrementale import DOSSIER_INSTANTANES, sauvegarder_incremental
+from sauvegarde_archive import DOSSIER_ARCHIVES, sauvegarder_archive
+from restauration_ftp import restaurer_fichiers
+from retention_ftp import RETENTION_AUTOMATIQUE, appliquer_retention
+from verification_ftp import (ECHANTILLON_VERIFICATION, NOM_MANIFESTE_INTEGRITE, enregistrer_manifeste_integrite,
+                              verifier_sauvegarde)
+from session_ftp import obtenir_pool
+from planificateur import obtenir_planificateur
 
 # Racine du projet (dossier parent de app/)
 _ROOT_DIR = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
@@ -18,16 +26,30 @@ class FTPManager:
         self.current_user = current_user_login
         self.ftp = None
 
+        # Rapport du dernier transfert parallèle (fichiers, octets, durée, débit)
+        self.dernier_transfert = None
+
+        # Listages des dossiers distants mémorisés pour la session ({chemin absolu: entrées})
+        self._cache_listages = {}
+        self._mlsd_supporte = True
+
         # Identifiants de connexion, surchargés par variables d'environnement si disponibles
         self.ftp_user = os.getenv("FTP_USER", "admin")
         self.ftp_pass = os.getenv("FTP_PASS", "password")
 
+        # Pool de sessions persistantes partagé avec les autres gestionnaires (renseigné à la connexion)
+        self._pool = None
+
     def connecter(self):
-        """Établit la connexion au serveur FTP local."""
+        """Emprunte une session authentifiée au pool persistant du serveur (voir session_ftp) :
+        la connexion TCP et le login ne sont refaits que si aucune session n'est disponible."""
         try:
-            self.ftp = FTP()
-            self.ftp.connect(self.host, self.port)
-            self.ftp.login(self.ftp_user, self.ftp_pass)
+            # Session précédente non rendue : on la rend avant d'en emprunter une autre
+            self.deconnecter()
+            self._pool = obtenir_pool(self.host, self.port, self.ftp_user, self.ftp_pass)
+            self.ftp = self._pool.acquerir()
+            self.invalider_cache_listages()
+            self._mlsd_supporte = True
             logging.info(f"CONNEXION FTP RÉUSSIE : '{self.current_user}' connecté à {self.host}:{self.port}")
             return True
         except Exception as e:
@@ -36,12 +58,10 @@ class FTPManager:
             return False
 
     def deconnecter(self):
-        """Ferme proprement la connexion FTP si elle est active."""
+        """Rend la session FTP au pool (elle reste ouverte pour les opérations suivantes)."""
         if self.ftp:
-            try:
-                self.ftp.quit()
-            except:
-                pass
+            self._pool.liberer(self.ftp)
+            self.ftp = None
 
     def _naviguer_vers(self, chemin_ftp):
         """Navigue vers un chemin FTP absolu en créant les dossiers manquants (usage upload uniquement)."""
@@ -57,16 +77,6 @@ class FTPManager:
                 self.ftp.mkd(partie)
                 self.ftp.cwd(partie)
 
-    def _naviguer_lecture(self, chemin_ftp):
-        """Navigue vers un chemin FTP absolu en lecture seule. Lève une exception si un segment est introuvable."""
-        parties = [p for p in chemin_ftp.strip("/").split("/") if p]
-        self.ftp.cwd("/")
-        for partie in parties:
-            try:
-                self.ftp.cwd(partie)
-            except Exception:
-                raise FileNotFoundError(f"Chemin FTP introuvable : '{chemin_ftp}' (segment manquant : '{partie}')")
-
     def upload_versioning(self, local_path, ville):
         """Upload un fichier ou un dossier vers le FTP avec horodatage dans le nom."""
         if not self.ftp:
@@ -81,6 +91,7 @@ class FTPManager:
         nom_original = os.path.basename(local_path)
         nom_versionne = f"{timestamp}_{nom_original}"
         nom_ville = ville.lower()
+        self.invalider_cache_listages()
 
         try:
             if os.path.isdir(local_path):
@@ -96,38 +107,61 @@ class FTPManager:
             return False
 
     def _upload_dossier(self, local_path, nom_ville, nom_racine_ftp):
-        """Upload récursif d'un dossier vers le FTP. Retourne le nombre de fichiers envoyés."""
-        nb_ok = 0
+        """Upload récursif d'un dossier vers le FTP. Retourne le nombre de fichiers envoyés.
+        Les dossiers distants sont créés une seule fois, puis les fichiers sont répartis
+        sur un pool de sessions FTP parallèles (voir transfert_ftp). Les empreintes calculées
+        pendant l'envoi sont écrites dans un manifeste d'intégrité (voir verification_ftp)."""
+        racine_ftp = f"/{nom_ville}/{nom_racine_ftp}"
+        dossiers = [f"/{nom_ville}", racine_ftp]
+        taches = []
+
         for racine, sous_dossiers, fichiers in os.walk(local_path):
 
             # Calcul du chemin FTP cible relatif à la racine de l'arborescence locale
             chemin_relatif = os.path.relpath(racine, local_path)
             if chemin_relatif == ".":
-                ftp_courant = f"{nom_ville}/{nom_racine_ftp}"
+                ftp_courant = racine_ftp
             else:
-                ftp_courant = f"{nom_ville}/{nom_racine_ftp}/{chemin_relatif.replace(os.sep, '/')}"
+                ftp_courant = f"{racine_ftp}/{chemin_relatif.replace(os.sep, '/')}"
 
-            self._naviguer_vers(ftp_courant)
+            dossiers.extend(f"{ftp_courant}/{d}" for d in sous_dossiers)
+            taches.extend((os.path.join(racine, fichier), f"{ftp_courant}/{fichier}") for fichier in fichiers)
 
-            # Pré-création des sous-dossiers pour éviter les erreurs lors du dépôt des fichiers
-            for d in sous_dossiers:
-                try:
-                    self.ftp.mkd(d)
-                except Exception:
-                    pass
+        # La session principale crée l'arborescence puis rejoint le pool de transfert (qui la ferme)
+        session, self.ftp = self.ftp, None
+        envoi = EnvoiAvecEmpreintes()
+        try:
+            rapport = self._moteur_transfert().envoyer_fichiers(taches, dossiers, session=session, action=envoi)
+        except BaseException:
+            # Nouvelle session tentée pour les actions suivantes du menu ; si le serveur est
+            # injoignable, cet échec est journalisé sans masquer l'erreur du transfert
+            try:
+                self.ftp = self._pool.acquerir()
+            except all_errors as e:
+                logging.error(f"UPLOAD DOSSIER : reconnexion impossible après l'échec du transfert ({e})")
+                self.ftp = None
+            raise
 
-            # Envoi de chaque fichier du niveau courant
-            for fichier in fichiers:
-                chemin_local = os.path.join(racine, fichier)
-                try:
-                    with open(chemin_local, "rb") as f:
-                        self.ftp.storbinary(f"STOR {fichier}", f)
-                    nb_ok += 1
-                except Exception as e:
-                    logging.error(f"Erreur upload {chemin_local}: {e}")
+        # Nouvelle session empruntée au pool pour le manifeste ci-dessous
+        self.ftp = self._pool.acquerir()
+        self.dernier_transfert = rapport
+
+        for (chemin_local, _), erreur in rapport["echecs"]:
+            logging.error(f"Erreur upload {chemin_local}: {erreur}")
+
+        # Manifeste d'intégrité (sauvegarde complète uniquement)
+        if not rapport["echecs"]:
+            enregistrer_manifeste_integrite(self.ftp, racine_ftp, envoi.empreintes)
+
+        logging.info(
+            f"UPLOAD DOSSIER : {local_path} -> {nom_ville}/{nom_racine_ftp} ({rapport['reussis']} fichiers, "
+            f"{rapport['octets']} octets en {rapport['duree']:.2f}s, {formater_debit(rapport['debit'])})"
+        )
+        return rapport["reussis"]
 
-        logging.info(f"UPLOAD DOSSIER : {local_path} -> {nom_ville}/{nom_racine_ftp} ({nb_ok} fichiers)")
-        return nb_ok
+    def _moteur_transfert(self):
+        """Retourne un moteur de transfert parallèle utilisant les paramètres de connexion courants."""
+        return MoteurTransfertFTP(self.host, self.port, self.ftp_user, self.ftp_pass, pool=self._pool)
 
     def _nom_sauvegarde(self, prefixe):
         """Retourne le nom du dossier de sauvegarde au format AAAAMMJJ_HHMM_prefixe."""
@@ -149,63 +183,105 @@ class FTPManager:
             logging.error(f"Erreur listing FTP ({ville}): {e}")
             return []
 
+    def _lister_repertoire(self, chemin_ftp):
+        """Retourne le contenu du dossier FTP absolu 'chemin_ftp' en un seul aller-retour :
+        liste de dicts {nom, dossier (bool), taille, modifie (datetime UTC ou None)}, triée par nom.
+        Utilise MLSD, ou LIST si le serveur ne le supporte pas. Le résultat est mémorisé pour la
+        session (voir invalider_cache_listages). Lève FileNotFoundError si le dossier n'existe pas."""
+        chemin_ftp = "/" + chemin_ftp.strip("/")
+        if chemin_ftp in self._cache_listages:
+            return self._cache_listages[chemin_ftp]
+
+        try:
+            if self._mlsd_supporte:
+                try:
+                    entrees = _entrees_mlsd(self.ftp.mlsd(chemin_ftp, facts=["type", "size", "modify"]))
+                except error_perm as e:
+                    # 500/502 : commande inconnue -> LIST pour le reste de la session ; sinon dossier absent
+                    if not str(e).startswith(("500", "502")):
+                        raise
+                    self._mlsd_supporte = False
+            if not self._mlsd_supporte:
+                lignes = []
+                self.ftp.retrlines(f"LIST {chemin_ftp}", lignes.append)
+                entrees = _entrees_list(lignes)
+        except error_perm as e:
+            raise FileNotFoundError(f"Chemin FTP introuvable : '{chemin_ftp.lstrip('/')}' ({e})")
+
+        entrees.sort(key=lambda entree: entree["nom"])
+        self._cache_listages[chemin_ftp] = entrees
+        return entrees
+
+    def invalider_cache_listages(self):
+        """Oublie les listages mémorisés (après une écriture sur le serveur)."""
+        self._cache_listages.clear()
+
     def lister_arbre_ftp(self, ville, prefixe=""):
         """Liste récursivement le contenu FTP sous forme d'arbre indenté (même format que lister_arbre local)."""
         if not self.ftp:
             return []
         try:
             self._naviguer_vers(ville.lower())
-            return self._lister_arbre_ftp_recursif(prefixe)
+            return self._lister_arbre_ftp_recursif(f"/{ville.lower()}", prefixe)
         except Exception as e:
             logging.error(f"Erreur listing arbre FTP ({ville}): {e}")
             return []
 
-    def _lister_arbre_ftp_recursif(self, prefixe=""):
-        """Parcourt récursivement le répertoire FTP courant et retourne les lignes de l'arbre."""
+    def _lister_arbre_ftp_recursif(self, chemin_ftp, prefixe=""):
+        """Parcourt récursivement le dossier FTP 'chemin_ftp' et retourne les lignes de l'arbre
+        (un listage par dossier, aucun CWD)."""
         lignes = []
         try:
-            entrees = sorted([os.path.basename(e) for e in self.ftp.nlst()])
+            entrees = self._lister_repertoire(chemin_ftp)
         except Exception:
             return lignes
 
         for entree in entrees:
-            if self._est_dossier_ftp(entree):
-                lignes.append(f"{prefixe}[D] {entree}/")
-                self.ftp.cwd(entree)
-                lignes.extend(self._lister_arbre_ftp_recursif(prefixe + "    "))
-                self.ftp.cwd("..")
+            if entree["dossier"]:
+                lignes.append(f"{prefixe}[D] {entree['nom']}/")
+                lignes.extend(self._lister_arbre_ftp_recursif(f"{chemin_ftp}/{entree['nom']}", prefixe + "    "))
             else:
-                lignes.append(f"{prefixe}[F] {entree}")
+                lignes.append(f"{prefixe}[F] {entree['nom']}")
         return lignes
 
-    def _est_dossier_ftp(self, nom):
-        """Retourne True si l'entrée FTP courante est un dossier, False si c'est un fichier."""
-        try:
-            self.ftp.cwd(nom)
-            self.ftp.cwd("..")
-            return True
-        except Exception:
-            return False
-
-    def _telecharger_dossier(self, nom_ftp, destination_locale):
-        """Télécharge récursivement un dossier FTP vers le système local."""
-        dossier_local = os.path.join(destination_locale, nom_ftp)
+    def _enumerer_dossier(self, chemin_ftp, dossier_local):
+        """Liste récursivement les fichiers du dossier FTP absolu 'chemin_ftp' (un listage par
+        dossier) et retourne les éléments à restaurer dans 'dossier_local' :
+        dicts {ftp, local, taille, mtime}."""
+        elements = []
+        for entree in self._lister_repertoire(chemin_ftp):
+            # Manifeste d'intégrité d'une copie complète : propre au serveur, non restauré
+            if entree["nom"] == NOM_MANIFESTE_INTEGRITE:
+                continue
+            chemin_entree = f"{chemin_ftp}/{entree['nom']}"
+            chemin_local = os.path.join(dossier_local, entree["nom"])
+            if entree["dossier"]:
+                os.makedirs(chemin_local, exist_ok=True)
+                elements.extend(self._enumerer_dossier(chemin_entree, chemin_local))
+            else:
+                modifie = entree["modifie"]
+                elements.append({"ftp": chemin_entree, "local": chemin_local, "taille": entree["taille"],
+                                 "mtime": modifie.timestamp() if modifie else None})
+        return elements
+
+    def restaurer_dossier(self, chemin_ftp, destination_locale):
+        """Télécharge le dossier FTP absolu 'chemin_ftp' dans destination_locale/<nom du dossier>.
+        L'arborescence est énumérée d'abord, puis les fichiers sont reçus en parallèle (tailles
+        vérifiées, dates restaurées, reprise sur journal : voir restauration_ftp).
+        Retourne le rapport du moteur de transfert."""
+        dossier_local = os.path.join(destination_locale, chemin_ftp.rstrip("/").rsplit("/", 1)[-1])
         os.makedirs(dossier_local, exist_ok=True)
-        self.ftp.cwd(nom_ftp)
 
-        entrees = [os.path.basename(e) for e in self.ftp.nlst()]
-        for entree in entrees:
-            if self._est_dossier_ftp(entree):
-                self._telecharger_dossier(entree, dossier_local)
-            else:
-                chemin_local = os.path.join(dossier_local, entree)
-                # Téléchargement en mémoire d'abord pour éviter de créer un fichier vide en cas d'erreur
-                buf = io.BytesIO()
-                self.ftp.retrbinary(f"RETR {entree}", buf.write)
-                with open(chemin_local, "wb") as f:
-                    f.write(buf.getvalue())
+        elements = self._enumerer_dossier(chemin_ftp, dossier_local)
+        rapport = restaurer_fichiers(self._moteur_transfert(), elements, dossier_local)
+        self.dernier_transfert = rapport
 
-        self.ftp.cwd("..")
+        logging.info(
+            f"RESTAURATION FTP : {chemin_ftp} -> {dossier_local} ({rapport['reussis']} reçus, "
+            f"{rapport['ignores']} déjà présents, {len(rapport['echecs'])} échec(s), "
+            f"{formater_debit(rapport['debit'])})"
+        )
+        return rapport
 
     def telecharger_fichier(self, nom_fichier, ville, destination_locale):
         """Télécharge un fichier ou un dossier depuis le dossier FTP de la ville vers le dossier local.
@@ -213,7 +289,7 @@ class FTPManager:
         if not self.ftp:
             return False
         try:
-            # Décomposition du chemin : navigation jusqu'au répertoire parent, puis action sur la cible
+            # Décomposition du chemin : listage du répertoire parent, puis action sur la cible
             parties = nom_fichier.replace("\\", "/").strip("/").split("/")
             nom_cible = parties[-1]
             sous_chemin = "/".join(parties[:-1])
@@ -222,27 +298,28 @@ class FTPManager:
             if sous_chemin:
                 chemin_ftp = f"{chemin_ftp}/{sous_chemin}"
 
-            # Navigation en lecture seule : lève une exception si le chemin parent n'existe pas sur le FTP
-            self._naviguer_lecture(chemin_ftp)
+            # Lève FileNotFoundError si le chemin parent n'existe pas sur le FTP
+            entrees = {entree["nom"]: entree for entree in self._lister_repertoire(chemin_ftp)}
 
-            # Vérification explicite de l'existence de la cible dans le répertoire courant
-            entrees = [os.path.basename(e) for e in self.ftp.nlst()]
+            # Vérification explicite de l'existence de la cible dans le répertoire parent
             if nom_cible not in entrees:
                 msg = f"'{nom_fichier}' est introuvable sur le serveur FTP."
                 logging.error(f"DOWNLOAD FTP : {msg}")
                 print(f"\nErreur : {msg}")
                 return False
 
-            if self._est_dossier_ftp(nom_cible):
-                self._telecharger_dossier(nom_cible, destination_locale)
+            chemin_cible = f"/{chemin_ftp}/{nom_cible}"
+            if entrees[nom_cible]["dossier"]:
+                rapport = self.restaurer_dossier(chemin_cible, destination_locale)
+                if rapport["echecs"]:
+                    print(f"\nErreur : {len(rapport['echecs'])} fichier(s) non téléchargé(s) ; "
+                          "relancez le téléchargement pour reprendre.")
+                    return False
                 logging.info(f"DOWNLOAD FTP RÉUSSI (dossier) : {nom_fichier} -> {destination_locale}")
             else:
-                # Téléchargement en mémoire d'abord pour éviter de créer un fichier vide en cas d'erreur
-                buf = io.BytesIO()
-                self.ftp.retrbinary(f"RETR {nom_cible}", buf.write)
+                # Écriture en flux dans un '.part' renommé à la fin : pas de fichier partiel en cas d'erreur
                 chemin_local = os.path.join(destination_locale, nom_cible)
-                with open(chemin_local, "wb") as f:
-                    f.write(buf.getvalue())
+                telecharger_vers_fichier(self.ftp, chemin_cible, chemin_local)
                 logging.info(f"DOWNLOAD FTP RÉUSSI (fichier) : {nom_fichier} -> {chemin_local}")
             return True
         except FileNotFoundError as e:
@@ -255,40 +332,110 @@ class FTPManager:
             return False
 
 
-def _prochaine_sauvegarde_vendredi():
-    """Calcule le datetime du prochain vendredi à 20h00."""
-    now = datetime.now()
-    jours_avant_vendredi = (4 - now.weekday()) % 7
-    prochain = now.replace(hour=20, minute=0, second=0, microsecond=0) + timedelta(days=jours_avant_vendredi)
-
-    # Si on est déjà vendredi après 20h00, on reporte à la semaine suivante
-    if prochain <= now:
-        prochain += timedelta(weeks=1)
-    return prochain
-
-
-def demarrer_sauvegarde_auto(ville, user_login):
-    """Planifie la prochaine sauvegarde automatique du vendredi à 20h00
-    SANS effectuer de sauvegarde immédiate. Appelée au démarrage de l'application."""
-    prochain = _prochaine_sauvegarde_vendredi()
-    delai = (prochain - datetime.now()).total_seconds()
-    timer = threading.Timer(delai, sauvegarder_vers_ftp, args=[ville, user_login, "automatic_saving"])
-    timer.daemon = True
-    timer.start()
-    logging.info(
-        f"PLANIFICATION AUTO : {ville} -> "
-        f"prochaine sauvegarde le {prochain.strftime('%A %d/%m/%Y à %H:%M')}"
-    )
-    return prochain
-
-
-def sauvegarder_vers_ftp(ville, user_login, prefixe="automatic_saving"):
-    """Uploade le dossier local de la ville vers un dossier versionné sur le FTP,
-    puis planifie automatiquement la prochaine exécution le vendredi à 20h00."""
+def _date_mlsd(valeur):
+    """Convertit une date MLSD 'AAAAMMJJHHMMSS[.sss]' (UTC) en datetime, ou None."""
+    try:
+        return datetime.strptime(valeur[:14], "%Y%m%d%H%M%S").replace(tzinfo=timezone.utc)
+    except (TypeError, ValueError):
+        return None
+
+
+def _entrees_mlsd(reponses):
+    """Convertit les couples (nom, faits) de ftp.mlsd() en entrées de listage."""
+    entrees = []
+    for nom, faits in reponses:
+        type_entree = faits.get("type", "").lower()
+        # 'cdir' / 'pdir' : le dossier lui-même et son parent
+        if type_entree in ("cdir", "pdir") or nom in (".", ".."):
+            continue
+        taille = faits.get("size")
+        entrees.append({
+            "nom": os.path.basename(nom),
+            "dossier": type_entree == "dir",
+            "taille": int(taille) if taille and taille.isdigit() else None,
+            "modifie": _date_mlsd(faits.get("modify")),
+        })
+    return entrees
+
+
+def _entrees_list(lignes):
+    """Analyse une réponse LIST au format Unix ('drwxr-xr-x 2 u g 4096 Jan 01 12:00 nom')
+    ou DOS/IIS ('01-01-24  12:00PM  <DIR>  nom'). La date n'est pas exploitée (format ambigu)."""
+    entrees = []
+    for ligne in lignes:
+        champs = ligne.split(None, 8)
+        if len(champs) == 9 and champs[0][:1] in "d-l":
+            nom, dossier, taille = champs[8], champs[0].startswith("d"), champs[4]
+            # Lien symbolique : 'nom -> cible'
+            if champs[0].startswith("l"):
+                nom = nom.split(" -> ", 1)[0]
+        else:
+            champs = ligne.split(None, 3)
+            if len(champs) != 4:
+                continue
+            nom, dossier, taille = champs[3], champs[2].upper() == "<DIR>", champs[2]
+
+        if nom in (".", ".."):
+            continue
+        entrees.append({
+            "nom": nom,
+            "dossier": dossier,
+            "taille": None if dossier or not taille.isdigit() else int(taille),
+            "modifie": None,
+        })
+    return entrees
+
+
+def sauvegarder_vers_ftp(ville, user_login, prefixe="automatic_saving", mode="incrementale"):
+    """Sauvegarde le dossier local de la ville sur le FTP.
+    mode "incrementale" : instantané n'envoyant que les fichiers nouveaux ou modifiés
+    (voir sauvegarde_incrementale) ; "archive" : archive compressée découpée en parties
+    (voir sauvegarde_archive) ; "complete" : copie fichier par fichier dans un dossier versionné.
+    Retourne (nb_ok, nom_sauvegarde, prochain) : nb_ok vaut -1 en cas d'échec et
+    prochain est la prochaine sauvegarde automatique de la ville (None si non planifiée)."""
+    nb_ok, nom_sauvegarde, _ = _sauvegarder(ville, user_login, prefixe, mode)
+    planificateur = obtenir_planificateur()
+    prochain = planificateur.prochaine_execution(ville) if planificateur else None
+    return nb_ok, nom_sauvegarde, prochain
+
+
+def executer_sauvegarde_planifiee(ville, user_login):
+    """Sauvegarde automatique lancée par le planificateur. Si elle a réussi, elle est vérifiée
+    (empreintes calculées par le serveur et relecture d'un échantillon, voir verification_ftp),
+    puis la politique de rétention est appliquée (voir retention_ftp).
+    Retourne un dict {fichiers, octets, statut, verifiee, supprimees} inscrit à l'historique
+    des exécutions."""
+    nb_ok, nom_sauvegarde, octets = _sauvegarder(ville, user_login, "automatic_saving", "incrementale")
+    resultat = {"fichiers": max(nb_ok, 0), "octets": octets, "statut": "echec" if nb_ok == -1 else "ok",
+                "verifiee": False, "supprimees": 0}
+    if nb_ok == -1:
+        return resultat
+
+    ftp = FTPManager(user_login)
+    if not ftp.connecter():
+        return resultat
+    try:
+        verification = verifier_sauvegarde(ftp, ville, nom_sauvegarde, ECHANTILLON_VERIFICATION)
+        resultat["verifiee"] = not verification["differents"]
+        if not resultat["verifiee"]:
+            resultat["statut"] = "echec"
+        elif RETENTION_AUTOMATIQUE:
+            # Aucune ancienne sauvegarde supprimée tant que la nouvelle n'est pas vérifiée
+            rapport = appliquer_retention(ftp, ville, simulation=False)
+            resultat["supprimees"] = len(rapport["supprimees"])
+    except Exception as e:
+        logging.error(f"VÉRIFICATION / RÉTENTION ÉCHOUÉE : {ville} ({e})")
+    finally:
+        ftp.deconnecter()
+    return resultat
+
+
+def _sauvegarder(ville, user_login, prefixe, mode):
+    """Effectue la sauvegarde. Retourne (nb_ok, nom_sauvegarde, octets envoyés)."""
     logging.info(f"SAUVEGARDE DÉMARRÉE : {ville} ({prefixe})")
     base_path = os.path.join(_ROOT_DIR, "data_hospital", ville.lower())
 
-    nb_ok, nom_sauvegarde = 0, None
+    nb_ok, nom_sauvegarde, octets = 0, None, 0
 
     # Vérification de l'existence du dossier local avant toute tentative de connexion FTP
     if not os.path.exists(base_path):
@@ -300,18 +447,39 @@ def sauvegarder_vers_ftp(ville, user_login, prefixe="automatic_saving"):
             logging.error("SAUVEGARDE ÉCHOUÉE : impossible de se connecter au FTP")
             nb_ok = -1
         else:
-            # Génération du nom versionné et upload de l'arborescence complète du dossier ville
             nom_sauvegarde = ftp._nom_sauvegarde(prefixe)
-            nb_ok = ftp._upload_dossier(base_path, ville.lower(), nom_sauvegarde)
-            ftp.deconnecter()
+            try:
+                if mode == "incrementale":
+                    # Instantané : seuls les contenus absents du serveur sont envoyés
+                    try:
+                        rapport = sauvegarder_incremental(ftp, ville, nom_sauvegarde)
+                        nb_ok = -1 if rapport["echecs"] else rapport["fichiers"]
+                        octets = rapport["octets"]
+                        nom_sauvegarde = f"{DOSSIER_INSTANTANES}/{nom_sauvegarde}.json"
+                    except Exception as e:
+                        logging.error(f"SAUVEGARDE INCRÉMENTALE ÉCHOUÉE : {ville} ({e})")
+                        nb_ok = -1
+                elif mode == "archive":
+                    # Archive : parties tar.gz envoyées au fil de leur production
+                    try:
+                        rapport = sauvegarder_archive(ftp, ville, nom_sauvegarde)
+                        nb_ok = -1 if rapport["echecs"] else rapport["fichiers"]
+                        octets = rapport["octets"]
+                        nom_sauvegarde = f"{DOSSIER_ARCHIVES}/{nom_sauvegarde}"
+                    except Exception as e:
+                        logging.error(f"SAUVEGARDE ARCHIVE ÉCHOUÉE : {ville} ({e})")
+                        nb_ok = -1
+                else:
+                    # Génération du nom versionné et upload de l'arborescence complète du dossier ville
+                    try:
+                        nb_ok = ftp._upload_dossier(base_path, ville.lower(), nom_sauvegarde)
+                        if ftp.dernier_transfert:
+                            octets = ftp.dernier_transfert["octets"]
+                    except Exception as e:
+                        logging.error(f"SAUVEGARDE COMPLÈTE ÉCHOUÉE : {ville} ({e})")
+                        nb_ok = -1
+            finally:
+                ftp.deconnecter()
             logging.info(f"SAUVEGARDE TERMINÉE : {nb_ok} fichier(s) -> {ville}/{nom_sauvegarde}")
 
-    # Planification de la prochaine exécution automatique (vendredi 20h00)
-    prochain = _prochaine_sauvegarde_vendredi()
-    delai = (prochain - datetime.now()).total_seconds()
-    timer = threading.Timer(delai, sauvegarder_vers_ftp, args=[ville, user_login, "automatic_saving"])
-    timer.daemon = True
-    timer.start()
-    logging.info(f"PROCHAINE SAUVEGARDE : {ville} -> {prochain.strftime('%A %d/%m/%Y à %H:%M')}")
-
-    return nb_ok, nom_sauvegarde, prochain
+    return nb_ok, nom_sauvegarde, octets
@@ -0,0 +1,225 @@
+"""Hachage des mots de passe (sel aléatoire + fonction de dérivation coûteuse).
+
+Format stocké en base, préfixé par l'algorithme utilisé :
+  - pbkdf2_sha256$<itérations>$<sel base64>$<hash base64>
+  - scrypt$<n>$<r>$<p>$<sel base64>$<hash base64>
+Les anciens hash SHA-256 non salés (64 caractères hexadécimaux) restent
+vérifiables ; necessite_rehash() signale qu'ils doivent être remplacés après
+une connexion réussie.
+
+La vérification d'un mot de passe est volontairement lente : elle peut être
+confiée à un pool de processus (soumettre_verification) afin de ne bloquer ni
+le thread interactif ni les autres connexions simultanées."""
+
+import os
+import sys
+import time
+import hmac
+import base64
+import hashlib
+import logging
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+
+# Logger du module, rattaché à la configuration définie dans main.py (operations.log)
+logger = logging.getLogger(__name__)
+
+# Algorithme utilisé pour tout nouveau hash ('pbkdf2_sha256' ou 'scrypt')
+ALGORITHME_DEFAUT = os.getenv("HASH_ALGORITHME", "pbkdf2_sha256")
+
+# Coût PBKDF2 (recommandation OWASP 2023 pour HMAC-SHA256), surchargeable / calibrable
+ITERATIONS_PBKDF2 = int(os.getenv("HASH_ITERATIONS", "600000"))
+
+# Plancher en dessous duquel la calibration ne descend jamais
+ITERATIONS_PBKDF2_MIN = 210000
+
+# Paramètres scrypt : n=2^14, r=8 -> 16 Mo de mémoire par calcul
+SCRYPT_N = 2 ** 14
+SCRYPT_R = 8
+SCRYPT_P = 1
+
+LONGUEUR_SEL = 16
+LONGUEUR_HASH = 32
+
+# Nombre de processus dédiés aux calculs de hash
+NB_PROCESSUS = min(4, os.cpu_count() or 1)
+
+_pool = None
+_verrou_pool = threading.Lock()
+
+
+def _b64(donnees):
+    """Encode des octets en base64 ASCII."""
+    return base64.b64encode(donnees).decode("ascii")
+
+
+def _est_sha256_historique(hash_stocke):
+    """True pour un ancien hash : SHA-256 hexadécimal, sans sel ni préfixe."""
+    return len(hash_stocke) == 64 and "$" not in hash_stocke
+
+
+def hacher(mot_de_passe, algorithme=None, iterations=None):
+    """Retourne le hash salé d'un mot de passe au format '<algorithme>$<paramètres>$...'.
+       'iterations' ne s'applique qu'à PBKDF2 (défaut : ITERATIONS_PBKDF2)."""
+    algorithme = algorithme or ALGORITHME_DEFAUT
+    sel = os.urandom(LONGUEUR_SEL)
+    mot_de_passe = mot_de_passe.encode("utf-8")
+
+    if algorithme == "scrypt":
+        derive = hashlib.scrypt(mot_de_passe, salt=sel, n=SCRYPT_N, r=SCRYPT_R, p=SCRYPT_P,
+                                dklen=LONGUEUR_HASH)
+        return f"scrypt${SCRYPT_N}${SCRYPT_R}${SCRYPT_P}${_b64(sel)}${_b64(derive)}"
+
+    if algorithme == "pbkdf2_sha256":
+        iterations = iterations or ITERATIONS_PBKDF2
+        derive = hashlib.pbkdf2_hmac("sha256", mot_de_passe, sel, iterations, LONGUEUR_HASH)
+        return f"pbkdf2_sha256${iterations}${_b64(sel)}${_b64(derive)}"
+
+    raise ValueError(f"Algorithme de hachage inconnu : '{algorithme}'")
+
+
+def verifier(hash_stocke, mot_de_passe):
+    """Compare un mot de passe saisi avec un hash stocké (tout format supporté).
+       La comparaison se fait en temps constant."""
+    if not hash_stocke:
+        return False
+    mot_de_passe = mot_de_passe.encode("utf-8")
+
+    try:
+        if _est_sha256_historique(hash_stocke):
+            calcule = hashlib.sha256(mot_de_passe).hexdigest()
+            return hmac.compare_digest(calcule, hash_stocke)
+
+        algorithme, *parametres = hash_stocke.split("$")
+
+        if algorithme == "pbkdf2_sha256":
+            iterations, sel, attendu = parametres
+            attendu = base64.b64decode(attendu)
+            calcule = hashlib.pbkdf2_hmac("sha256", mot_de_passe, base64.b64decode(sel),
+                                          int(iterations), len(attendu))
+            return hmac.compare_digest(calcule, attendu)
+
+        if algorithme == "scrypt":
+            n, r, p, sel, attendu = parametres
+            attendu = base64.b64decode(attendu)
+            calcule = hashlib.scrypt(mot_de_passe, salt=base64.b64decode(sel), n=int(n), r=int(r),
+                                     p=int(p), dklen=len(attendu))
+            return hmac.compare_digest(calcule, attendu)
+
+    except (ValueError, TypeError) as e:
+        # Hash corrompu ou paramètres illisibles : on refuse l'accès
+        logger.error(f"HACHAGE : hash stocké illisible ({e})")
+        return False
+
+    logger.error(f"HACHAGE : algorithme inconnu dans le hash stocké ('{hash_stocke.split('$')[0]}')")
+    return False
+
+
+def necessite_rehash(hash_stocke):
+    """True si le hash doit être recalculé avec les paramètres actuels :
+       ancien SHA-256, autre algorithme que celui par défaut ou coût inférieur."""
+    if not hash_stocke or _est_sha256_historique(hash_stocke):
+        return True
+
+    algorithme, *parametres = hash_stocke.split("$")
+    if algorithme != ALGORITHME_DEFAUT:
+        return True
+    try:
+        if algorithme == "pbkdf2_sha256":
+            return int(parametres[0]) < ITERATIONS_PBKDF2
+        if algorithme == "scrypt":
+            return (int(parametres[0]), int(parametres[1])) < (SCRYPT_N, SCRYPT_R)
+    except (ValueError, IndexError):
+        return True
+    return False
+
+
+def calibrer_iterations(duree_cible=0.25):
+    """Mesure la vitesse de PBKDF2-SHA256 sur cette machine et retourne le nombre
+       d'itérations correspondant à ~'duree_cible' secondes par hash (jamais sous le plancher)."""
+    essai = 20000
+    debut = time.perf_counter()
+    hashlib.pbkdf2_hmac("sha256", b"calibration", os.urandom(LONGUEUR_SEL), essai, LONGUEUR_HASH)
+    duree = time.perf_counter() - debut
+
+    iterations = int(essai * duree_cible / duree) if duree > 0 else ITERATIONS_PBKDF2
+    # Arrondi au millier pour des valeurs lisibles dans les hash stockés
+    iterations = max(ITERATIONS_PBKDF2_MIN, iterations // 1000 * 1000)
+    logger.info(f"HACHAGE : calibration -> {iterations} itérations pour ~{duree_cible}s")
+    return iterations
+
+
+def configurer(iterations=None, algorithme=None):
+    """Modifie les paramètres utilisés pour les nouveaux hash (ex : après calibration)."""
+    global ITERATIONS_PBKDF2, ALGORITHME_DEFAUT
+    if iterations:
+        ITERATIONS_PBKDF2 = iterations
+    if algorithme:
+        ALGORITHME_DEFAUT = algorithme
+
+
+# ---------------------------------------------------------------------------
+# Calculs dans un pool de processus (hors GIL et hors thread interactif)
+# ---------------------------------------------------------------------------
+
+def _obtenir_pool():
+    """Retourne le pool de processus partagé (créé au premier besoin), ou None s'il
+       ne peut pas être créé sur cette plateforme."""
+    global _pool
+    with _verrou_pool:
+        if _pool is None:
+            try:
+                _pool = ProcessPoolExecutor(max_workers=NB_PROCESSUS)
+            except (OSError, NotImplementedError, ImportError) as e:
+                logger.warning(f"HACHAGE : pool de processus indisponible ({e}), calcul local")
+                return None
+        return _pool
+
+
+def soumettre_verification(hash_stocke, mot_de_passe):
+    """Lance la vérification dans le pool de processus. Retourne un Future (bool).
+       Sans pool disponible, le calcul est fait immédiatement dans le thread appelant."""
+    pool = _obtenir_pool()
+    if pool is not None:
+        try:
+            return pool.submit(verifier, hash_stocke, mot_de_passe)
+        except RuntimeError as e:
+            # Pool arrêté ou processus morts (BrokenProcessPool hérite de RuntimeError)
+            logger.warning(f"HACHAGE : pool de processus inutilisable ({e}), calcul local")
+
+    futur = Future()
+    futur.set_result(verifier(hash_stocke, mot_de_passe))
+    return futur
+
+
+def hacher_en_lot(mots_de_passe, iterations=None):
+    """Hache une liste de mots de passe en parallèle sur le pool de processus.
+       Retourne la liste des hash dans le même ordre."""
+    if not mots_de_passe:
+        return []
+
+    # Sur une machine mono-cœur, le pool n'apporte que le coût des échanges inter-processus
+    pool = _obtenir_pool() if NB_PROCESSUS > 1 else None
+    if pool is not None:
+        taille = max(1, len(mots_de_passe) // (NB_PROCESSUS * 4))
+        try:
+            return list(pool.map(hacher, mots_de_passe, [None] * len(mots_de_passe),
+                                 [iterations] * len(mots_de_passe), chunksize=taille))
+        except RuntimeError as e:
+            logger.warning(f"HACHAGE : pool de processus inutilisable ({e}), calcul local")
+    return [hacher(mot_de_passe, iterations=iterations) for mot_de_passe in mots_de_passe]
+
+
+def arreter_pool():
+    """Arrête le pool de processus (appelé à la fermeture de l'application)."""
+    global _pool
+    with _verrou_pool:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+
+
+if __name__ == "__main__":
+    # python app/hachage.py : affiche le coût PBKDF2 recommandé pour cette machine
+    cible = float(sys.argv[1]) if len(sys.argv) > 1 else 0.25
+    print(f"HASH_ITERATIONS recommandé (~{cible}s par hash) : {calibrer_iterations(cible)}")
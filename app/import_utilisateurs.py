@@ -0,0 +1,287 @@
+import csv
+import json
+import os
+import time
+import sqlite3
+import logging
+
+import hachage
+from classes import User
+from fonctions_gestion import ROLES_DISPONIBLES, VILLES_DISPONIBLES, est_superadmin, est_admin
+
+# Logger du module, rattaché à la configuration définie dans main.py (operations.log)
+logger = logging.getLogger(__name__)
+
+# Nombre de lignes lues, préparées puis insérées en une seule transaction
+TAILLE_LOT = 1000
+
+# Correspondance entre les en-têtes acceptés dans le fichier et les champs internes
+_COLONNES = {
+    "nom": "nom",
+    "prenom": "prenom",
+    "prénom": "prenom",
+    "ville": "ville",
+    "role": "role",
+    "rôle": "role",
+}
+
+
+def _normaliser_ligne(ligne):
+    """Ramène les clés d'une ligne (CSV ou JSON) aux champs internes nom/prenom/ville/role."""
+    resultat = {}
+    for cle, valeur in ligne.items():
+        if cle is None:
+            continue
+        champ = _COLONNES.get(str(cle).strip().lower())
+        if champ:
+            resultat[champ] = str(valeur).strip() if valeur is not None else ""
+    return resultat
+
+
+def lire_lignes(chemin):
+    """Lit le fichier d'import ligne par ligne (générateur, sans tout charger en mémoire).
+
+    Format déduit de l'extension : .jsonl (un objet JSON par ligne) ou CSV
+    (séparateur ',' ';' ou tabulation détecté automatiquement).
+    Produit des tuples (numero_ligne, dict_ou_None, erreur_de_lecture)."""
+    if chemin.lower().endswith((".jsonl", ".ndjson")):
+        with open(chemin, encoding="utf-8") as f:
+            for numero, texte in enumerate(f, start=1):
+                if not texte.strip():
+                    continue
+                try:
+                    objet = json.loads(texte)
+                except json.JSONDecodeError as e:
+                    yield numero, None, f"JSON invalide ({e.msg})"
+                    continue
+                if not isinstance(objet, dict):
+                    yield numero, None, "un objet JSON est attendu"
+                    continue
+                yield numero, _normaliser_ligne(objet), None
+        return
+
+    with open(chemin, encoding="utf-8-sig", newline="") as f:
+        # Détection du séparateur sur le début du fichier uniquement
+        echantillon = f.read(4096)
+        f.seek(0)
+        try:
+            dialecte = csv.Sniffer().sniff(echantillon, delimiters=",;\t")
+        except csv.Error:
+            dialecte = csv.excel
+        lecteur = csv.DictReader(f, dialect=dialecte)
+
+        # La ligne 1 est l'en-tête : les données commencent à la ligne 2
+        for numero, ligne in enumerate(lecteur, start=2):
+            yield numero, _normaliser_ligne(ligne), None
+
+
+def lire_par_lots(lignes, taille_lot=TAILLE_LOT):
+    """Regroupe un itérable de lignes en listes de 'taille_lot' éléments maximum."""
+    lot = []
+    for ligne in lignes:
+        lot.append(ligne)
+        if len(lot) >= taille_lot:
+            yield lot
+            lot = []
+    if lot:
+        yield lot
+
+
+class ImportUtilisateurs:
+    """Import en masse d'utilisateurs depuis un fichier CSV/JSONL.
+
+       Les couples nom/prénom et les villes possédant déjà un Admin sont
+       préchargés une fois et les logins sont attribués par l'allocateur de la
+       base : les doublons sont résolus en mémoire, puis chaque lot est inséré
+       via executemany dans une seule transaction.
+
+       Les mots de passe temporaires sont hachés au coût normal (hachage.hacher_en_lot,
+       en parallèle sur hachage.NB_PROCESSUS processus) : c'est ce hachage qui borne
+       le débit de l'import, de l'ordre de 1 / (durée d'un hash) ligne par seconde
+       et par processus."""
+
+    def __init__(self, db, user_connecte, taille_lot=TAILLE_LOT):
+        self.db = db
+        self.user_connecte = user_connecte
+        self.taille_lot = taille_lot
+
+        # Préchargement des contraintes d'unicité pour éviter une requête par ligne
+        self.identites = db.lister_noms_prenoms()
+        self.villes_avec_admin = {
+            ville for ville in VILLES_DISPONIBLES
+            if db.existe_admin_ou_superadmin_dans_ville(ville)
+        }
+
+    def _valider(self, ligne):
+        """Contrôle une ligne et retourne (nom, prenom, ville, role) ou lève ValueError."""
+        nom = ligne.get("nom", "")
+        prenom = ligne.get("prenom", "")
+        if not nom or not prenom:
+            raise ValueError("nom et prénom sont obligatoires")
+
+        # Ville : obligatoire pour le Super Admin, imposée pour un Admin
+        ville_saisie = ligne.get("ville", "")
+        villes = {v.lower(): v for v in VILLES_DISPONIBLES}
+        if est_superadmin(self.user_connecte):
+            ville = villes.get(ville_saisie.lower())
+            if ville is None:
+                raise ValueError(f"ville inconnue '{ville_saisie}'")
+        else:
+            ville = self.user_connecte.Ville
+            if ville_saisie and ville_saisie.lower() != ville.lower():
+                raise ValueError(f"ville '{ville_saisie}' hors de votre périmètre ({ville})")
+
+        # Rôle : 'User' par défaut, mêmes droits d'attribution que creer_utilisateur
+        roles = {r.lower(): r for r in ROLES_DISPONIBLES}
+        role = roles.get((ligne.get("role") or "User").lower())
+        if est_superadmin(self.user_connecte):
+            roles_attribuables = ROLES_DISPONIBLES[:2]
+        else:
+            roles_attribuables = ROLES_DISPONIBLES[:1]
+        if role not in roles_attribuables:
+            raise ValueError(f"rôle '{ligne.get('role')}' non attribuable")
+
+        if (nom, prenom) in self.identites:
+            raise ValueError(f"un utilisateur '{prenom} {nom}' existe déjà")
+
+        if role in ("Admin", "Super Admin") and ville in self.villes_avec_admin:
+            raise ValueError(f"la ville '{ville}' possède déjà un Admin/Super Admin")
+
+        return nom, prenom, ville, role
+
+    def _preparer_lot(self, lot, rapport):
+        """Transforme un lot de lignes en utilisateurs prêts à insérer.
+           Retourne une liste de tuples (numero_ligne, user, mot_de_passe_clair)."""
+        prets = []
+        for numero, ligne, erreur in lot:
+            if erreur:
+                rapport["erreurs"].append((numero, erreur))
+                continue
+            try:
+                nom, prenom, ville, role = self._valider(ligne)
+            except ValueError as e:
+                rapport["erreurs"].append((numero, str(e)))
+                continue
+
+            user = User(nom, prenom, ville, role)
+            self.db.allocateur_logins.allouer_pour(user)
+
+            # Génération du mot de passe temporaire (haché plus bas pour tout le lot)
+            mot_de_passe_clair = user.generer_mot_de_passe()
+
+            # Réservation immédiate pour détecter les doublons internes au fichier
+            self.identites.add((nom, prenom))
+            if role in ("Admin", "Super Admin"):
+                self.villes_avec_admin.add(ville)
+
+            prets.append((numero, user, mot_de_passe_clair))
+
+        # Hachage de tout le lot en parallèle sur le pool de processus, au coût normal
+        hashes = hachage.hacher_en_lot([mdp for _, _, mdp in prets])
+        for (_, user, _), hash_mdp in zip(prets, hashes):
+            user.Password_Hash = hash_mdp
+        return prets
+
+    def _inserer_lot(self, prets, rapport):
+        """Insère un lot préparé en une transaction ; repli ligne par ligne en cas de conflit."""
+        if not prets:
+            return
+        try:
+            self.db.ajouter_utilisateurs_en_masse([user for _, user, _ in prets])
+            rapport["importes"].extend((user, mdp) for _, user, mdp in prets)
+            return
+        except sqlite3.IntegrityError as e:
+            # Conflit avec une écriture concurrente : le lot a été annulé, on isole la ligne fautive
+            logger.warning(f"IMPORT : conflit dans un lot ({e}), insertion ligne par ligne")
+
+        for numero, user, mdp in prets:
+            try:
+                self.db.ajouter_utilisateurs_en_masse([user])
+                rapport["importes"].append((user, mdp))
+                continue
+            except sqlite3.IntegrityError as e:
+                if "utilisateurs.login" not in str(e):
+                    rapport["erreurs"].append((numero, f"conflit d'intégrité ({e})"))
+                    continue
+
+            # Login pris entre-temps : on relit la base et on retente une fois
+            user.generer_login()
+            self.db.allocateur_logins.oublier(user.Login)
+            self.db.allocateur_logins.allouer_pour(user)
+            try:
+                self.db.ajouter_utilisateurs_en_masse([user])
+                rapport["importes"].append((user, mdp))
+            except sqlite3.IntegrityError as e:
+                rapport["erreurs"].append((numero, f"conflit d'intégrité ({e})"))
+
+    def importer(self, chemin):
+        """Importe le fichier complet. Retourne un rapport sous forme de dictionnaire :
+           {'importes': [(user, mot_de_passe_clair)], 'erreurs': [(ligne, message)], 'duree': s}."""
+        debut = time.perf_counter()
+        rapport = {"importes": [], "erreurs": [], "duree": 0.0}
+
+        for lot in lire_par_lots(lire_lignes(chemin), self.taille_lot):
+            prets = self._preparer_lot(lot, rapport)
+            self._inserer_lot(prets, rapport)
+
+        rapport["duree"] = time.perf_counter() - debut
+        logger.info(
+            f"IMPORT UTILISATEURS : {chemin} par {self.user_connecte.Login} -> "
+            f"{len(rapport['importes'])} importé(s), {len(rapport['erreurs'])} erreur(s) "
+            f"en {rapport['duree']:.3f}s"
+        )
+        return rapport
+
+
+def ecrire_identifiants(rapport, chemin_sortie):
+    """Écrit les logins et mots de passe temporaires générés dans un fichier CSV."""
+    with open(chemin_sortie, "w", encoding="utf-8", newline="") as f:
+        ecrivain = csv.writer(f, delimiter=";")
+        ecrivain.writerow(["login", "nom", "prenom", "ville", "role", "mot_de_passe_temporaire"])
+        for user, mot_de_passe in rapport["importes"]:
+            ecrivain.writerow([user.Login, user.Nom, user.Prenom, user.Ville, user.Role, mot_de_passe])
+
+
+# ---------------------------------------------------------------------------
+# Fonction interactive appelée depuis le menu (saisie + affichage)
+# ---------------------------------------------------------------------------
+
+def action_importer_utilisateurs(db, user_connecte):
+    """Import en masse depuis un fichier CSV ou JSONL. Réservé aux administrateurs."""
+
+    print("\n=== IMPORT EN MASSE D'UTILISATEURS ===")
+    if not est_admin(user_connecte):
+        print("Erreur : Vous n'avez pas les permissions pour créer des utilisateurs.")
+        return
+
+    print("Colonnes attendues : nom, prenom, ville, role (role facultatif, 'User' par défaut)")
+    chemin = input("Chemin du fichier (.csv ou .jsonl) : ").strip().strip('"')
+    if not os.path.isfile(chemin):
+        print(f"Erreur : le fichier '{chemin}' est introuvable.")
+        return
+
+    try:
+        rapport = ImportUtilisateurs(db, user_connecte).importer(chemin)
+    except (OSError, UnicodeDecodeError, csv.Error) as e:
+        logger.error(f"IMPORT UTILISATEURS : lecture impossible de {chemin} ({e})")
+        print(f"Erreur : lecture du fichier impossible ({e}).")
+        return
+
+    print(f"\n✓ {len(rapport['importes'])} utilisateur(s) importé(s) en {rapport['duree']:.2f} s.")
+
+    # Détail des lignes rejetées (limité à l'écran, complet dans le journal)
+    if rapport["erreurs"]:
+        for numero, message in rapport["erreurs"]:
+            logger.warning(f"IMPORT : ligne {numero} rejetée ({message})")
+
+        print(f"\n⚠ {len(rapport['erreurs'])} ligne(s) rejetée(s) :")
+        for numero, message in rapport["erreurs"][:20]:
+            print(f"  - ligne {numero} : {message}")
+        if len(rapport["erreurs"]) > 20:
+            print(f"  ... ({len(rapport['erreurs']) - 20} autre(s), voir operations.log)")
+
+    if rapport["importes"]:
+        chemin_sortie = os.path.splitext(chemin)[0] + "_identifiants.csv"
+        ecrire_identifiants(rapport, chemin_sortie)
+        print(f"\nIdentifiants générés enregistrés dans : {chemin_sortie}")
+        print("⚠ IMPORTANT : Transmettez puis supprimez ce fichier, il contient des mots de passe en clair.")
@@ -1,7 +1,11 @@
+import atexit
 import os
+import hachage
+import session_ftp
 from database import DatabaseManager
 from fonctions_gestion import authentifier_utilisateur
-from gestion_ftp import demarrer_sauvegarde_auto
+from gestion_ftp import executer_sauvegarde_planifiee
+from planificateur import demarrer_planificateur
 from menu import menu_principal
 import logging
 
@@ -42,12 +46,19 @@ def main():
     # Initialisation du gestionnaire de base de données
     db = DatabaseManager()
 
+    # Fermeture des connexions SQLite, du pool de hachage et des sessions FTP à la sortie (y compris via quit())
+    atexit.register(db.fermer)
+    atexit.register(hachage.arreter_pool)
+    atexit.register(session_ftp.fermer_pools)
+
     # Authentification de l'utilisateur avant accès au menu
     user_connecte = authentifier_utilisateur(db)
 
-    # Planification automatique des sauvegardes FTP pour toutes les villes
-    for ville in VILLES:
-        demarrer_sauvegarde_auto(ville, user_connecte.Login)
+    # Planification persistante des sauvegardes FTP de toutes les villes (échelonnées,
+    # exécutions manquées pendant l'arrêt de l'application rattrapées au démarrage)
+    planificateur = demarrer_planificateur(
+        VILLES, lambda ville: executer_sauvegarde_planifiee(ville, user_connecte.Login))
+    atexit.register(planificateur.arreter)
 
     # Redirection vers le menu principal selon le rôle de l'utilisateur
     menu_principal(db, user_connecte)
@@ -12,13 +12,19 @@ from fonctions_gestion import (
 # Liste des villes disponibles dans l'application
 VILLES = ["paris", "marseille", "rennes", "grenoble"]
 
+from import_utilisateurs import action_importer_utilisateurs
 from gestion_fichiers import FileManager
 from gestion_ftp import FTPManager, sauvegarder_vers_ftp
+from sauvegarde_incrementale import lister_instantanes, restaurer_instantane
+from sauvegarde_archive import lister_archives, extraire_archive
+from retention_ftp import appliquer_retention, inventorier_sauvegardes
+from verification_ftp import ECHANTILLON_VERIFICATION, verifier_sauvegarde
 
 # Modules T3 : scans réseau/ports (importés comme espaces de noms pour éviter
 # les collisions entre fonctions homonymes des deux modules)
 import scan_ports
 import scan_reseau
+import scan_orchestre
 
 # Dossier du module app/ (pour retrouver les scripts de chat quel que soit le cwd)
 _APP_DIR = os.path.dirname(os.path.abspath(__file__))
@@ -40,7 +46,8 @@ def afficher_menu_admin(user_connecte):
     print("5. Supprimer un utilisateur")
     print("6. Consulter mon profil")
     print("7. Changer mon mot de passe")
-    print("8. Quitter vers le menu principal")
+    print("8. Importer des utilisateurs (CSV / JSONL)")
+    print("9. Quitter vers le menu principal")
     print("\n" + "=" * 60)
 
 
@@ -188,6 +195,11 @@ def menu_ftp(user_connecte):
         print("2. Lister le contenu FTP")
         print("3. Télécharger depuis FTP")
         print("4. Sauvegarder dossier local vers FTP")
+        print("5. Restaurer une sauvegarde (instantané)")
+        print("6. Extraire une sauvegarde archivée")
+        if est_admin(user_connecte):
+            print("7. Appliquer la politique de rétention")
+        print("8. Vérifier l'intégrité d'une sauvegarde")
 
         # Option de changement de ville réservée au Super Admin
         if est_superadmin(user_connecte):
@@ -252,13 +264,141 @@ def menu_ftp(user_connecte):
 
             case "4":
                 # Sauvegarde manuelle complète de l'arborescence de la ville vers le FTP
+                print("1. Instantané incrémental (par défaut)")
+                print("2. Archive compressée (dossiers de nombreux petits fichiers)")
+                mode = "archive" if input("Type de sauvegarde : ").strip() == "2" else "incrementale"
                 print("Sauvegarde en cours...")
-                nb_ok, nom_sauvegarde, prochain = sauvegarder_vers_ftp(ville_active, user_connecte.Login, "manual_saving")
+                nb_ok, nom_sauvegarde, prochain = sauvegarder_vers_ftp(ville_active, user_connecte.Login,
+                                                                       "manual_saving", mode)
                 if nb_ok == -1:
                     print("Erreur : impossible de se connecter au serveur FTP.")
                 else:
                     print(f"{nb_ok} fichier(s) sauvegardé(s) dans '{ville_active.lower()}/{nom_sauvegarde}'.")
-                print(f"Prochaine sauvegarde automatique : {prochain.strftime('%A %d/%m/%Y à %H:%M')}.")
+                if prochain is not None:
+                    print(f"Prochaine sauvegarde automatique : {prochain.strftime('%A %d/%m/%Y à %H:%M')}.")
+
+            case "5":
+                # Restauration d'un instantané de sauvegarde incrémentale dans le dossier local
+                if not ftp_m.connecter():
+                    print("Erreur : Impossible de se connecter au serveur FTP.")
+                    continue
+                try:
+                    instantanes = lister_instantanes(ftp_m, ville_active)
+                    if not instantanes:
+                        print(" (Aucun instantané disponible)")
+                        continue
+
+                    print(f"\nInstantanés disponibles ({ville_active}) :")
+                    for i, nom in enumerate(instantanes, 1):
+                        print(f" {i}. {nom}")
+                    numero = input("Numéro de l'instantané à restaurer : ").strip()
+                    if not numero.isdigit() or not 1 <= int(numero) <= len(instantanes):
+                        print("Choix invalide.")
+                        continue
+
+                    nom = instantanes[int(numero) - 1]
+                    print(f"Restauration de '{nom}' vers {fm.base_path} ...")
+                    nb_ok = restaurer_instantane(ftp_m, ville_active, nom, fm.base_path)
+                    print(f"{nb_ok} fichier(s) restauré(s) dans '{os.path.join(fm.base_path, nom)}'.")
+                except Exception as e:
+                    logging.error(f"Erreur restauration FTP ({ville_active}): {e}")
+                    print(f"Erreur lors de la restauration : {e}")
+                finally:
+                    ftp_m.deconnecter()
+
+            case "6":
+                # Extraction de tout ou partie d'une archive (seules les parties utiles sont téléchargées)
+                if not ftp_m.connecter():
+                    print("Erreur : Impossible de se connecter au serveur FTP.")
+                    continue
+                try:
+                    archives = lister_archives(ftp_m, ville_active)
+                    if not archives:
+                        print(" (Aucune archive disponible)")
+                        continue
+
+                    print(f"\nArchives disponibles ({ville_active}) :")
+                    for i, nom in enumerate(archives, 1):
+                        print(f" {i}. {nom}")
+                    numero = input("Numéro de l'archive à extraire : ").strip()
+                    if not numero.isdigit() or not 1 <= int(numero) <= len(archives):
+                        print("Choix invalide.")
+                        continue
+
+                    nom = archives[int(numero) - 1]
+                    saisie = input("Fichiers ou dossiers à extraire (séparés par des virgules, vide = tout) : ").strip()
+                    selection = [c.strip() for c in saisie.split(",") if c.strip()] or None
+                    print(f"Extraction de '{nom}' vers {fm.base_path} ...")
+                    nb_ok = extraire_archive(ftp_m, ville_active, nom, fm.base_path, selection)
+                    print(f"{nb_ok} fichier(s) extrait(s) dans '{os.path.join(fm.base_path, nom)}'.")
+                except Exception as e:
+                    logging.error(f"Erreur extraction archive FTP ({ville_active}): {e}")
+                    print(f"Erreur lors de l'extraction : {e}")
+                finally:
+                    ftp_m.deconnecter()
+
+            case "7" if est_admin(user_connecte):
+                # Simulation d'abord : rien n'est supprimé sans confirmation
+                if not ftp_m.connecter():
+                    print("Erreur : Impossible de se connecter au serveur FTP.")
+                    continue
+                try:
+                    rapport = appliquer_retention(ftp_m, ville_active)
+                    print(f"\nSauvegardes conservées : {len(rapport['conservees'])}")
+                    print(f"Sauvegardes à supprimer : {len(rapport['supprimees'])}")
+                    for chemin in rapport["supprimees"]:
+                        print(f" - {chemin}")
+                    print(f"Objets orphelins : {rapport['objets']}")
+                    print(f"Espace libéré : {rapport['octets']} octets ({rapport['fichiers']} fichier(s))")
+                    if not rapport["fichiers"]:
+                        continue
+                    if input("Confirmer la suppression ? (o/n) : ").strip().lower() != "o":
+                        print("Suppression annulée.")
+                        continue
+                    rapport = appliquer_retention(ftp_m, ville_active, simulation=False)
+                    if rapport["echecs"]:
+                        print(f"Erreur : {len(rapport['echecs'])} suppression(s) en échec.")
+                    else:
+                        print(f"{len(rapport['supprimees'])} sauvegarde(s) supprimée(s).")
+                except Exception as e:
+                    logging.error(f"Erreur rétention FTP ({ville_active}): {e}")
+                    print(f"Erreur lors de l'application de la rétention : {e}")
+                finally:
+                    ftp_m.deconnecter()
+
+            case "8":
+                # Vérification sans retéléchargement (empreintes serveur) + relecture d'un échantillon
+                if not ftp_m.connecter():
+                    print("Erreur : Impossible de se connecter au serveur FTP.")
+                    continue
+                try:
+                    sauvegardes = sorted(inventorier_sauvegardes(ftp_m, ville_active), key=lambda s: s["date"])
+                    if not sauvegardes:
+                        print(" (Aucune sauvegarde disponible)")
+                        continue
+
+                    print(f"\nSauvegardes disponibles ({ville_active}) :")
+                    for i, sauvegarde in enumerate(sauvegardes, 1):
+                        print(f" {i}. {sauvegarde['chemin']}")
+                    numero = input("Numéro de la sauvegarde à vérifier : ").strip()
+                    if not numero.isdigit() or not 1 <= int(numero) <= len(sauvegardes):
+                        print("Choix invalide.")
+                        continue
+
+                    # Nom relatif au dossier de la ville, comme retourné par sauvegarder_vers_ftp
+                    nom = sauvegardes[int(numero) - 1]["chemin"].removeprefix(f"/{ville_active.lower()}/")
+                    print(f"Vérification de '{nom}' ...")
+                    rapport = verifier_sauvegarde(ftp_m, ville_active, nom, ECHANTILLON_VERIFICATION)
+                    print(f"Méthode : {rapport['methode']} ({rapport['echantillon']} fichier(s) relu(s))")
+                    print(f"{rapport['conformes']}/{rapport['fichiers']} fichier(s) conforme(s) "
+                          f"en {rapport['duree']:.2f}s.")
+                    for chemin, raison in rapport["differents"]:
+                        print(f" - {chemin} : {raison}")
+                except Exception as e:
+                    logging.error(f"Erreur vérification FTP ({ville_active}): {e}")
+                    print(f"Erreur lors de la vérification : {e}")
+                finally:
+                    ftp_m.deconnecter()
 
             case "c" if est_superadmin(user_connecte):
                 # Changement de ville et réinitialisation du gestionnaire de fichiers
@@ -282,9 +422,10 @@ def menu_scan_ports():
         print("1. Scanner un port unique")
         print("2. Scanner une plage de ports")
         print("3. Scanner tous les ports (1-65535)")
-        print("4. Comparer les performances (séquentiel vs threads)")
+        print("4. Comparer les performances (séquentiel vs threads vs asyncio)")
+        print("5. Audit multi-hôtes (plusieurs hôtes / réseaux, TCP)")
         print("0. Retour")
-        print("\n(le protocole TCP / UDP / les deux est demandé après le choix)")
+        print("\n(le protocole TCP / UDP / les deux est demandé après le choix, sauf pour l'audit)")
 
         choix = input("\nVotre choix : ").strip()
 
@@ -302,6 +443,9 @@ def menu_scan_ports():
             case "4":
                 scan_ports.action_comparer_performances()
 
+            case "5":
+                scan_orchestre.action_scan_multi_hotes()
+
             case "0":
                 break
 
@@ -488,6 +632,9 @@ def menu_administrateur(db, user_connecte):
                 changer_mon_mot_de_passe(db, user_connecte)
 
             case "8":
+                action_importer_utilisateurs(db, user_connecte)
+
+            case "9":
                 break
 
             case _:
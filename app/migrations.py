@@ -0,0 +1,81 @@
+"""Migrations versionnées du schéma de la base des utilisateurs.
+
+La version courante du schéma est stockée dans l'en-tête du fichier SQLite
+(PRAGMA user_version). Chaque migration n'est appliquée qu'une fois, dans
+l'ordre, et dans sa propre transaction : une base existante est ainsi mise à
+niveau automatiquement au démarrage de l'application."""
+
+import logging
+
+# Logger du module, rattaché à la configuration définie dans main.py (operations.log)
+logger = logging.getLogger(__name__)
+
+
+# Liste ordonnée des migrations : (version, description, instructions SQL).
+# Les instructions sont idempotentes (IF NOT EXISTS) afin qu'une base créée
+# avant l'introduction des migrations (user_version = 0) soit reprise sans erreur.
+MIGRATIONS = [
+    (1, "Table utilisateurs et unicité Admin/Super Admin par ville", [
+        """
+        CREATE TABLE IF NOT EXISTS utilisateurs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            login TEXT UNIQUE NOT NULL,
+            nom TEXT NOT NULL,
+            prenom TEXT NOT NULL,
+            ville TEXT NOT NULL,
+            role TEXT NOT NULL,
+            password_hash TEXT NOT NULL,
+            password_expiry DATE NOT NULL,
+            account_locked_until DATE
+        )
+        """,
+        # Garantit qu'il ne peut y avoir qu'un Admin ou Super Admin par ville
+        """
+        CREATE UNIQUE INDEX IF NOT EXISTS unique_admin_superadmin_ville
+        ON utilisateurs(ville)
+        WHERE role IN ('Admin', 'Super Admin')
+        """,
+    ]),
+    (2, "Index secondaires pour les filtres par ville, nom/prénom et rôle", [
+        # Listing et pagination d'une ville triés par login, comptage par ville
+        "CREATE INDEX IF NOT EXISTS idx_utilisateurs_ville_login ON utilisateurs(ville, login)",
+        # Recherche exacte par nom + prénom (avec ou sans restriction de ville)
+        "CREATE INDEX IF NOT EXISTS idx_utilisateurs_nom_prenom_ville ON utilisateurs(nom, prenom, ville)",
+        # Recherche d'un Admin / Super Admin dans une ville
+        "CREATE INDEX IF NOT EXISTS idx_utilisateurs_role_ville ON utilisateurs(role, ville)",
+        # Statistiques de l'optimiseur pour qu'il choisisse ces index
+        "ANALYZE utilisateurs",
+    ]),
+]
+
+
+def version_schema(connexion):
+    """Retourne la version du schéma enregistrée dans la base (0 si jamais migrée)."""
+    return connexion.execute("PRAGMA user_version").fetchone()[0]
+
+
+def appliquer_migrations(connexion):
+    """Applique, dans l'ordre, les migrations dont la version dépasse celle de la base.
+       Retourne la version finale du schéma."""
+    version = version_schema(connexion)
+
+    for numero, description, instructions in MIGRATIONS:
+        if numero <= version:
+            continue
+
+        # Instructions et nouvelle version validées ensemble, ou annulées ensemble
+        connexion.execute("BEGIN")
+        try:
+            for instruction in instructions:
+                connexion.execute(instruction)
+            connexion.execute(f"PRAGMA user_version = {numero}")
+            connexion.execute("COMMIT")
+        except Exception:
+            connexion.execute("ROLLBACK")
+            logger.error(f"MIGRATION {numero} ÉCHOUÉE : {description}")
+            raise
+
+        version = numero
+        logger.info(f"MIGRATION {numero} APPLIQUÉE : {description}")
+
+    return version
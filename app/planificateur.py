@@ -0,0 +1,260 @@
+"""Planificateur persistant des sauvegardes automatiques.
+
+Remplace les chaînes de threading.Timer (une par ville, toutes déclenchées le
+vendredi à 20h00) par :
+  - une table des tâches sur disque (data_hospital/.planificateur/taches.json)
+    qui survit à l'arrêt de l'application ;
+  - des horaires échelonnés (ECART_VILLES entre deux villes, plus une gigue
+    aléatoire) pour ne pas solliciter le serveur FTP au même instant ;
+  - un pool de threads borné (SAUVEGARDES_SIMULTANEES) pour l'exécution ;
+  - le rattrapage au démarrage des exécutions manquées pendant l'arrêt ;
+  - un historique (historique.jsonl) : durée, fichiers, octets et statut."""
+
+import os
+import json
+import random
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+# Logger du module, rattaché à la configuration définie dans main.py (operations.log)
+logger = logging.getLogger(__name__)
+
+# Racine du projet (dossier parent de app/)
+_ROOT_DIR = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+DOSSIER_PLANIFICATEUR = os.path.join(_ROOT_DIR, "data_hospital", ".planificateur")
+
+# Créneau hebdomadaire de référence : vendredi (weekday 4) à 20h00
+JOUR_SAUVEGARDE = 4
+HEURE_SAUVEGARDE = 20
+
+# Décalage entre deux villes consécutives et gigue aléatoire maximale (secondes)
+ECART_VILLES = timedelta(minutes=15)
+GIGUE_MAX = 300
+
+# Nombre de sauvegardes exécutées en même temps (surchargeable par variable d'environnement)
+SAUVEGARDES_SIMULTANEES = int(os.getenv("SAUVEGARDES_SIMULTANEES", "1"))
+
+# Un rattrapage terminé moins de cette durée avant le créneau suivant tient lieu de ce
+# créneau : la ville n'est pas sauvegardée deux fois le même soir
+MARGE_RATTRAPAGE = timedelta(days=1)
+
+# Durée maximale (secondes) entre deux réveils du planificateur (tient compte des mises en veille)
+INTERVALLE_REVEIL = 60
+
+_planificateur_actif = None
+
+
+def prochain_creneau(apres):
+    """Retourne le premier vendredi 20h00 strictement postérieur à 'apres'."""
+    jours = (JOUR_SAUVEGARDE - apres.weekday()) % 7
+    creneau = apres.replace(hour=HEURE_SAUVEGARDE, minute=0, second=0, microsecond=0) + timedelta(days=jours)
+    if creneau <= apres:
+        creneau += timedelta(weeks=1)
+    return creneau
+
+
+def dernier_creneau(avant):
+    """Retourne le dernier vendredi 20h00 antérieur ou égal à 'avant'."""
+    return prochain_creneau(avant) - timedelta(weeks=1)
+
+
+class PlanificateurSauvegardes:
+    """Exécute les sauvegardes hebdomadaires des villes selon une table persistante.
+
+       'executer(ville)' lance la sauvegarde d'une ville et retourne un dict
+       {fichiers, octets, statut ('ok' ou 'echec')}."""
+
+    def __init__(self, executer, dossier=DOSSIER_PLANIFICATEUR, concurrence=SAUVEGARDES_SIMULTANEES):
+        self.executer = executer
+        self.dossier = dossier
+        self.chemin_taches = os.path.join(dossier, "taches.json")
+        self.chemin_historique = os.path.join(dossier, "historique.jsonl")
+
+        # {ville: {"rang", "prochaine" (ISO), "derniere" (ISO ou None)}}
+        self.taches = self._charger_taches()
+        self._en_cours = set()
+        self._verrou = threading.Lock()
+
+        self._pool = ThreadPoolExecutor(max_workers=max(1, concurrence), thread_name_prefix="sauvegarde")
+        self._reveil = threading.Event()
+        self._arret = threading.Event()
+        self._thread = None
+
+    # ------------------------------------------------------------------
+    # Table des tâches
+    # ------------------------------------------------------------------
+
+    def _charger_taches(self):
+        """Lit la table des tâches sur disque (vide si absente ou illisible)."""
+        try:
+            with open(self.chemin_taches, encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            logger.warning(f"PLANIFICATEUR : table des tâches illisible ({e}), réinitialisée")
+            return {}
+
+    def _enregistrer_taches(self):
+        """Écrit la table des tâches de façon atomique (appelé sous verrou)."""
+        os.makedirs(self.dossier, exist_ok=True)
+        with open(self.chemin_taches + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(self.taches, f, ensure_ascii=False, indent=1)
+        os.replace(self.chemin_taches + ".tmp", self.chemin_taches)
+
+    def _horaire(self, rang, apres):
+        """Horaire de la prochaine exécution d'une ville : créneau + décalage du rang + gigue."""
+        gigue = timedelta(seconds=random.uniform(0, GIGUE_MAX))
+        return prochain_creneau(apres) + rang * ECART_VILLES + gigue
+
+    def _horaire_suivant(self, rang, echeance, debut, fin):
+        """Horaire de l'exécution qui suit celle prévue à 'echeance' (lancée à 'debut',
+           terminée à 'fin') : il se déduit du créneau couvert par l'exécution, et non de
+           l'heure de fin. Un rattrapage couvre le dernier créneau passé à son lancement
+           et, s'il se termine moins de MARGE_RATTRAPAGE avant lui, le créneau suivant."""
+        couvert = max(dernier_creneau(echeance), dernier_creneau(debut))
+        suivant = prochain_creneau(fin)
+        if suivant - fin < MARGE_RATTRAPAGE and suivant > couvert:
+            couvert = suivant
+        return self._horaire(rang, couvert)
+
+    def ajouter_ville(self, ville, rang):
+        """Enregistre la sauvegarde hebdomadaire d'une ville (conservée si déjà présente)."""
+        with self._verrou:
+            tache = self.taches.get(ville)
+            if tache is None:
+                self.taches[ville] = {"rang": rang, "derniere": None,
+                                      "prochaine": self._horaire(rang, datetime.now()).isoformat()}
+            else:
+                tache["rang"] = rang
+            self._enregistrer_taches()
+
+    def prochaine_execution(self, ville):
+        """Retourne le datetime de la prochaine sauvegarde de la ville, ou None."""
+        with self._verrou:
+            tache = self.taches.get(ville)
+            return datetime.fromisoformat(tache["prochaine"]) if tache else None
+
+    # ------------------------------------------------------------------
+    # Exécution
+    # ------------------------------------------------------------------
+
+    def demarrer(self):
+        """Lance le thread du planificateur. Les exécutions manquées pendant l'arrêt de
+           l'application sont rattrapées immédiatement (une seule fois par ville)."""
+        maintenant = datetime.now()
+        with self._verrou:
+            en_retard = [v for v, t in self.taches.items() if datetime.fromisoformat(t["prochaine"]) <= maintenant]
+        for ville, tache in sorted(self.taches.items(), key=lambda e: e[1]["rang"]):
+            if ville in en_retard:
+                logger.info(f"PLANIFICATEUR : sauvegarde manquée de {ville}, rattrapage")
+            else:
+                logger.info(f"PLANIFICATION AUTO : {ville} -> prochaine sauvegarde le "
+                            f"{datetime.fromisoformat(tache['prochaine']).strftime('%A %d/%m/%Y à %H:%M')}")
+
+        self._thread = threading.Thread(target=self._boucle, daemon=True, name="planificateur")
+        self._thread.start()
+
+    def arreter(self):
+        """Arrête le planificateur (les sauvegardes en cours se terminent)."""
+        self._arret.set()
+        self._reveil.set()
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+    def _boucle(self):
+        """Soumet au pool les tâches arrivées à échéance, puis dort jusqu'à la suivante."""
+        while not self._arret.is_set():
+            maintenant = datetime.now()
+            attente = INTERVALLE_REVEIL
+
+            with self._verrou:
+                for ville, tache in self.taches.items():
+                    if ville in self._en_cours:
+                        continue
+                    echeance = datetime.fromisoformat(tache["prochaine"])
+                    if echeance <= maintenant:
+                        self._en_cours.add(ville)
+                        self._pool.submit(self._executer_tache, ville, echeance)
+                    else:
+                        attente = min(attente, (echeance - maintenant).total_seconds())
+
+            self._reveil.wait(max(attente, 0.1))
+            self._reveil.clear()
+
+    def _executer_tache(self, ville, echeance):
+        """Exécute la sauvegarde d'une ville, l'inscrit à l'historique et la replanifie."""
+        debut = datetime.now()
+        # Rattrapage : l'échéance est passée depuis plus d'un intervalle de réveil
+        rattrapage = (debut - echeance).total_seconds() > INTERVALLE_REVEIL
+        try:
+            resultat = self.executer(ville)
+        except Exception as e:
+            logger.error(f"PLANIFICATEUR : sauvegarde de {ville} en erreur ({e})")
+            resultat = {"fichiers": 0, "octets": 0, "statut": "echec", "erreur": str(e)}
+        fin = datetime.now()
+
+        self._ajouter_historique({
+            "ville": ville,
+            "echeance": echeance.isoformat(timespec="seconds"),
+            "debut": debut.isoformat(timespec="seconds"),
+            "duree": round((fin - debut).total_seconds(), 3),
+            "rattrapage": rattrapage,
+            **resultat,
+        })
+
+        with self._verrou:
+            tache = self.taches[ville]
+            tache["derniere"] = debut.isoformat(timespec="seconds")
+            tache["prochaine"] = self._horaire_suivant(tache["rang"], echeance, debut, fin).isoformat()
+            self._enregistrer_taches()
+            self._en_cours.discard(ville)
+            prochaine = tache["prochaine"]
+
+        logger.info(f"PROCHAINE SAUVEGARDE : {ville} -> "
+                    f"{datetime.fromisoformat(prochaine).strftime('%A %d/%m/%Y à %H:%M')}")
+        self._reveil.set()
+
+    # ------------------------------------------------------------------
+    # Historique
+    # ------------------------------------------------------------------
+
+    def _ajouter_historique(self, entree):
+        """Ajoute une exécution à l'historique (une ligne JSON par exécution)."""
+        os.makedirs(self.dossier, exist_ok=True)
+        with self._verrou:
+            with open(self.chemin_historique, "a", encoding="utf-8") as f:
+                f.write(json.dumps(entree, ensure_ascii=False) + "\n")
+
+    def historique(self, limite=20):
+        """Retourne les 'limite' dernières exécutions (la plus récente en dernier)."""
+        try:
+            with open(self.chemin_historique, encoding="utf-8") as f:
+                lignes = f.readlines()[-limite:]
+        except FileNotFoundError:
+            return []
+        entrees = []
+        for ligne in lignes:
+            try:
+                entrees.append(json.loads(ligne))
+            except ValueError:
+                continue
+        return entrees
+
+
+def demarrer_planificateur(villes, executer):
+    """Crée et démarre le planificateur de l'application pour les villes données (ordre = rang)."""
+    global _planificateur_actif
+    planificateur = PlanificateurSauvegardes(executer)
+    for rang, ville in enumerate(villes):
+        planificateur.ajouter_ville(ville, rang)
+    planificateur.demarrer()
+    _planificateur_actif = planificateur
+    return planificateur
+
+
+def obtenir_planificateur():
+    """Retourne le planificateur démarré par l'application, ou None."""
+    return _planificateur_actif
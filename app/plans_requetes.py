@@ -0,0 +1,169 @@
+"""Contrôle des plans d'exécution des requêtes de DatabaseManager.
+
+Exécute chaque méthode de DatabaseManager sur une base temporaire, capture
+toutes les requêtes SQL réellement envoyées à SQLite (trace de la connexion),
+puis demande leur plan à SQLite (EXPLAIN QUERY PLAN). Une requête qui parcourt
+entièrement une table ou un index (ligne « SCAN » sans contrainte (col=?), y
+compris « USING COVERING INDEX », dont le coût croît aussi avec la table, ou
+table virtuelle sans contrainte, « VIRTUAL TABLE INDEX 0: ») est signalée comme
+une régression. Seul un parcours d'index dans l'ordre demandé et interrompu par
+un LIMIT (première page d'un listage) reste admis. Les lectures complètes
+voulues (comptage et liste des noms de toute la base, recherche par terme trop
+court pour l'index trigramme) sont exercées à part et signalées « ASSUMÉ ».
+
+Utilisation : python app/plans_requetes.py   (code de sortie 1 en cas de régression)"""
+
+import os
+import re
+import sys
+import tempfile
+import contextlib
+import io
+
+from classes import User
+from database import DatabaseManager
+
+# Instructions dont le plan est contrôlé (les INSERT et le DDL n'ont pas de parcours)
+_INSTRUCTIONS_CONTROLEES = ("SELECT", "UPDATE", "DELETE", "WITH")
+
+# Contrainte transmise à un accès indexé, ex : « (login=?) », « (ville=? AND login>?) »
+_CONTRAINTE = re.compile(r"\([^)]*[=<>][^)]*\?[^)]*\)")
+
+# Clause LIMIT d'une requête (parcours interrompu après quelques lignes)
+_LIMIT = re.compile(r"\bLIMIT\b", re.IGNORECASE)
+
+
+def _peupler(db):
+    """Ajoute quelques comptes représentatifs dans la base temporaire."""
+    users = []
+    for i in range(50):
+        user = User(f"Nom{i}", f"Prenom{i}", ["Paris", "Rennes"][i % 2], "User", login=f"pnom{i}")
+        user.Password_Hash = "x"
+        users.append(user)
+    db.ajouter_utilisateurs_en_masse(users)
+
+
+def _exercer(db):
+    """Appelle chaque méthode de lecture/écriture de DatabaseManager au moins une fois
+       (avec et sans restriction de ville)."""
+    db.rechercher_par_login("pnom1")
+    db.rechercher_par_login("pnom1", ville_visible="Rennes")
+    db.rechercher_par_nom_prenom("Nom1", "Prenom1")
+    db.rechercher_par_nom_prenom("Nom1", "Prenom1", ville_visible="Rennes")
+    db.compter_utilisateurs("Paris")
+
+    _, precedent, suivant = db.lister_page_utilisateurs(taille_page=10)
+    db.lister_page_utilisateurs(apres=suivant, taille_page=10)
+    db.lister_page_utilisateurs(avant="pnom30", taille_page=10)
+    db.lister_page_utilisateurs(ville_visible="Paris", apres="pnom10", taille_page=10)
+    db.lister_page_utilisateurs(ville_visible="Paris", avant="pnom30", taille_page=10)
+
+    db.rechercher_utilisateurs("prenom1")
+    db.rechercher_utilisateurs("prenom1", ville_visible="Rennes")
+
+    db.existe_admin_ou_superadmin_dans_ville("Paris")
+    db.allocateur_logins.allouer("pnom")
+
+    db.modifier_utilisateur("pnom2", nouveau_nom="Autre", nouveau_hash="y")
+    db.bloquer_utilisateur("pnom3")
+    db.verifier_bloquage_utilisateur("pnom4")
+    db.supprimer_utilisateur("pnom5")
+
+
+def _exercer_parcours_assumes(db):
+    """Appelle les chemins qui lisent toute la table par construction : comptage
+       sans restriction de ville, liste des couples nom/prénom (préchargée par
+       l'import) et recherche d'un terme de moins de 3 caractères, qui ne peut pas
+       utiliser l'index trigramme (repli LIKE)."""
+    db.compter_utilisateurs()
+    db.lister_noms_prenoms()
+    db.rechercher_utilisateurs("no")
+    db.rechercher_utilisateurs("no", ville_visible="Rennes")
+
+
+def _est_parcours_complet(detail, requete, plan):
+    """True si une ligne de plan parcourt toute une table ou tout un index.
+
+       Une ligne « SCAN » sans contrainte (col=?) est un parcours complet, même
+       « USING COVERING INDEX ». Exception : un parcours d'index (ou de clé
+       primaire) qui fournit directement l'ordre demandé (pas de « USE TEMP
+       B-TREE ») à une requête avec LIMIT s'arrête après quelques lignes.
+       Pour une table virtuelle (FTS5), « INDEX 0: » sans chaîne d'index signifie
+       qu'aucune contrainte (MATCH, rowid) n'a été transmise : parcours complet."""
+    if not detail.startswith("SCAN"):
+        return False
+    if " VIRTUAL TABLE " in detail:
+        return detail.rstrip().endswith("INDEX 0:")
+    if _CONTRAINTE.search(detail):
+        return False
+    parcours_ordonne = " USING " in detail and not any(ligne.startswith("USE TEMP B-TREE") for ligne in plan)
+    return not (parcours_ordonne and _LIMIT.search(requete))
+
+
+def _capturer(connexion, fonction, db):
+    """Exécute fonction(db) en capturant le texte des requêtes envoyées à SQLite."""
+    requetes = []
+    connexion.set_trace_callback(requetes.append)
+    try:
+        fonction(db)
+    finally:
+        connexion.set_trace_callback(None)
+    return requetes
+
+
+def verifier_plans_requetes(db):
+    """Capture les requêtes émises par DatabaseManager et analyse leur plan.
+       Retourne une liste de tuples (requete, lignes_du_plan, statut), statut valant
+       "OK", "ÉCHEC" (parcours complet non prévu) ou "ASSUMÉ" (parcours attendu)."""
+    connexion = db.get_connexion()
+
+    requetes = [(requete, False) for requete in _capturer(connexion, _exercer, db)]
+    requetes += [(requete, True) for requete in _capturer(connexion, _exercer_parcours_assumes, db)]
+
+    resultats = []
+    deja_vues = set()
+    for requete, assume in requetes:
+        texte = " ".join(requete.split())
+
+        # Requêtes internes aux triggers (préfixées par '--') et doublons ignorés
+        if not texte.upper().startswith(_INSTRUCTIONS_CONTROLEES) or texte in deja_vues:
+            continue
+        deja_vues.add(texte)
+
+        plan = [ligne[3] for ligne in connexion.execute(f"EXPLAIN QUERY PLAN {texte}")]
+        if not any(_est_parcours_complet(detail, texte, plan) for detail in plan):
+            statut = "OK"
+        else:
+            statut = "ASSUMÉ" if assume else "ÉCHEC"
+        resultats.append((texte, plan, statut))
+
+    return resultats
+
+
+def main():
+    """Point d'entrée en ligne de commande : affiche le rapport et retourne le code de sortie."""
+    with tempfile.TemporaryDirectory() as dossier:
+        # Les messages d'initialisation (création du Super Admin) sont masqués
+        with contextlib.redirect_stdout(io.StringIO()):
+            db = DatabaseManager(os.path.join(dossier, "plans.db"))
+        try:
+            _peupler(db)
+            resultats = verifier_plans_requetes(db)
+        finally:
+            db.fermer()
+
+    nb_regressions = nb_assumes = 0
+    for requete, plan, statut in resultats:
+        print(f"[{statut}] {requete}")
+        for detail in plan:
+            print(f"         {detail}")
+        nb_regressions += statut == "ÉCHEC"
+        nb_assumes += statut == "ASSUMÉ"
+
+    print(f"\n{len(resultats)} requête(s) analysée(s), {nb_regressions} parcours complet(s) de table"
+          f" ({nb_assumes} parcours assumé(s)).")
+    return 1 if nb_regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
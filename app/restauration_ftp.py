@@ -0,0 +1,100 @@
+"""Restauration parallèle d'arborescences FTP.
+
+L'arborescence à restaurer est d'abord énumérée entièrement (liste de fichiers
+avec taille et date attendues), puis les fichiers sont téléchargés en parallèle
+par le moteur de transfert (pool borné de sessions FTP). Chaque fichier terminé
+voit sa taille vérifiée et sa date de modification restaurée, puis est inscrit
+dans un journal local : une restauration interrompue reprend là où elle s'était
+arrêtée (les fichiers déjà restaurés sont ignorés, un fichier à moitié reçu
+reprend grâce à son '.part')."""
+
+import os
+import json
+import logging
+import threading
+
+from transfert_ftp import telecharger_vers_fichier
+
+# Logger du module, rattaché à la configuration définie dans main.py (operations.log)
+logger = logging.getLogger(__name__)
+
+# Nom du journal de progression, créé à la racine du dossier restauré et supprimé à la fin
+NOM_JOURNAL = ".journal_restauration.jsonl"
+
+
+class JournalRestauration:
+    """Journal de progression d'une restauration : une ligne JSON par fichier terminé."""
+
+    def __init__(self, chemin):
+        self.chemin = chemin
+        self._verrou = threading.Lock()
+
+    def charger(self):
+        """Retourne l'ensemble des chemins locaux déjà restaurés (vide si pas de journal)."""
+        termines = set()
+        try:
+            with open(self.chemin, encoding="utf-8") as f:
+                for ligne in f:
+                    try:
+                        termines.add(json.loads(ligne)["local"])
+                    except (ValueError, KeyError):
+                        # Dernière ligne tronquée par une interruption : ignorée
+                        continue
+        except FileNotFoundError:
+            pass
+        return termines
+
+    def ajouter(self, chemin_local):
+        """Inscrit un fichier terminé (écriture immédiate sur disque)."""
+        with self._verrou:
+            with open(self.chemin, "a", encoding="utf-8") as f:
+                f.write(json.dumps({"local": chemin_local}, ensure_ascii=False) + "\n")
+
+    def supprimer(self):
+        """Supprime le journal (restauration terminée sans erreur)."""
+        try:
+            os.remove(self.chemin)
+        except FileNotFoundError:
+            pass
+
+
+def restaurer_fichiers(moteur, elements, dossier_local):
+    """Télécharge en parallèle les 'elements' : dicts {ftp, local, taille, mtime}
+       (taille en octets et mtime en timestamp, None si inconnus).
+       Le journal est tenu dans 'dossier_local'. Retourne le rapport du moteur
+       complété de 'ignores' (fichiers déjà restaurés lors d'une exécution précédente)."""
+    os.makedirs(dossier_local, exist_ok=True)
+    journal = JournalRestauration(os.path.join(dossier_local, NOM_JOURNAL))
+    termines = journal.charger()
+
+    taches = []
+    ignores = 0
+    for element in elements:
+        # Déjà restauré : présent au journal et toujours complet sur le disque
+        if element["local"] in termines and os.path.exists(element["local"]) and (
+                element["taille"] is None or os.path.getsize(element["local"]) == element["taille"]):
+            ignores += 1
+            continue
+        taches.append(element)
+
+    # Création des dossiers locaux avant le lancement des téléchargements
+    for dossier in {os.path.dirname(element["local"]) for element in taches}:
+        os.makedirs(dossier, exist_ok=True)
+
+    def recevoir(ftp, element):
+        octets = telecharger_vers_fichier(ftp, element["ftp"], element["local"],
+                                          taille_attendue=element["taille"])
+        if element["mtime"] is not None:
+            os.utime(element["local"], (element["mtime"], element["mtime"]))
+        journal.ajouter(element["local"])
+        return octets
+
+    rapport = moteur.executer(taches, recevoir)
+    rapport["ignores"] = ignores
+
+    if not rapport["echecs"]:
+        journal.supprimer()
+    else:
+        logger.warning(f"RESTAURATION INCOMPLÈTE : {len(rapport['echecs'])} fichier(s) en échec, "
+                       f"journal conservé ({journal.chemin})")
+    return rapport
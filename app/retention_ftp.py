@@ -0,0 +1,255 @@
+"""Politique de rétention des sauvegardes FTP.
+
+Les sauvegardes horodatées (AAAAMMJJ_HHMM_prefixe) s'accumulent sans limite dans
+trois emplacements par ville :
+  /<ville>/<AAAAMMJJ_HHMM_prefixe>/              copies complètes (dossiers versionnés)
+  /<ville>/instantanes/<AAAAMMJJ_HHMM_prefixe>.json   instantanés incrémentaux
+  /<ville>/archives/<AAAAMMJJ_HHMM_prefixe>/     archives compressées
+
+Pour chaque série (même emplacement et même préfixe, ex : automatic_saving), on
+conserve la plus récente sauvegarde de chacun des N derniers jours, des N
+dernières semaines et des N derniers mois ; les autres sont supprimées. Les dates
+viennent du nom, ou à défaut de la date MLSD. Les suppressions (un DELE par
+fichier) sont réparties sur le pool de sessions du moteur de transfert.
+
+Supprimer un instantané ne supprime que son index : les objets qu'il était le
+seul à référencer deviennent orphelins et sont supprimés ensuite, sauf s'ils
+ont été envoyés depuis moins de DELAI_GRACE_OBJETS. La rétention prend le verrou
+de la ville (voir sauvegarde_incrementale.verrou_ville) et ne supprime aucun objet
+tant qu'une sauvegarde incrémentale de la ville est en cours sur un autre poste :
+elle peut réutiliser des objets qu'aucun index ne référence encore."""
+
+import io
+import os
+import re
+import json
+import time
+import logging
+from datetime import datetime, timedelta, timezone
+
+from sauvegarde_incrementale import (DOSSIER_OBJETS, DOSSIER_INSTANTANES, charger_manifeste,
+                                     enregistrer_manifeste, sauvegarde_en_cours, verrou_ville)
+from sauvegarde_archive import DOSSIER_ARCHIVES
+
+# Logger du module, rattaché à la configuration définie dans main.py (operations.log)
+logger = logging.getLogger(__name__)
+
+# Nombre de jours, semaines et mois conservés par série (surchargeables par variables d'environnement)
+RETENTION_QUOTIDIENNE = int(os.getenv("RETENTION_QUOTIDIENNE", "7"))
+RETENTION_HEBDOMADAIRE = int(os.getenv("RETENTION_HEBDOMADAIRE", "4"))
+RETENTION_MENSUELLE = int(os.getenv("RETENTION_MENSUELLE", "12"))
+
+# Application de la politique après chaque sauvegarde automatique réussie ("0" pour désactiver)
+RETENTION_AUTOMATIQUE = os.getenv("RETENTION_AUTOMATIQUE", "1") == "1"
+
+# Un objet orphelin plus récent que ce délai n'est pas supprimé
+DELAI_GRACE_OBJETS = timedelta(hours=24)
+
+# Nom de sauvegarde : horodatage puis préfixe de la série
+_MOTIF_SAUVEGARDE = re.compile(r"^(\d{8}_\d{4})_(.+)$")
+
+
+def _date_sauvegarde(nom, modifie):
+    """Date (locale, naïve) d'une sauvegarde : horodatage du nom, sinon date MLSD, sinon None."""
+    correspondance = _MOTIF_SAUVEGARDE.match(nom)
+    if correspondance:
+        try:
+            return datetime.strptime(correspondance.group(1), "%Y%m%d_%H%M")
+        except ValueError:
+            pass
+    return modifie.astimezone().replace(tzinfo=None) if modifie else None
+
+
+def selectionner_a_conserver(sauvegardes, quotidiennes=RETENTION_QUOTIDIENNE,
+                             hebdomadaires=RETENTION_HEBDOMADAIRE, mensuelles=RETENTION_MENSUELLE):
+    """'sauvegardes' : liste de (nom, date). Retourne l'ensemble des noms à conserver :
+       la plus récente sauvegarde de chacun des 'quotidiennes' derniers jours,
+       'hebdomadaires' dernières semaines ISO et 'mensuelles' derniers mois."""
+    recentes_d_abord = sorted(sauvegardes, key=lambda s: s[1], reverse=True)
+    conservees = set()
+    periodes = (
+        (lambda d: d.date(), quotidiennes),
+        (lambda d: d.isocalendar()[:2], hebdomadaires),
+        (lambda d: (d.year, d.month), mensuelles),
+    )
+    for periode, limite in periodes:
+        vues = set()
+        for nom, date in recentes_d_abord:
+            cle = periode(date)
+            if cle in vues:
+                continue
+            if len(vues) >= limite:
+                break
+            vues.add(cle)
+            conservees.add(nom)
+    return conservees
+
+
+def inventorier_sauvegardes(ftp_manager, ville):
+    """Retourne les sauvegardes de la ville : dicts {chemin, nom, serie, date, dossier, taille}
+       (taille = taille MLSD pour un fichier, None pour un dossier)."""
+    nom_ville = ville.lower()
+    emplacements = (
+        (f"/{nom_ville}", True, ""),
+        (f"/{nom_ville}/{DOSSIER_INSTANTANES}", False, ".json"),
+        (f"/{nom_ville}/{DOSSIER_ARCHIVES}", True, ""),
+    )
+
+    sauvegardes = []
+    for chemin, dossiers, extension in emplacements:
+        try:
+            entrees = ftp_manager._lister_repertoire(chemin)
+        except FileNotFoundError:
+            continue
+        for entree in entrees:
+            nom = entree["nom"]
+            if entree["dossier"] != dossiers or not nom.endswith(extension):
+                continue
+            nom = nom[:len(nom) - len(extension)]
+            correspondance = _MOTIF_SAUVEGARDE.match(nom)
+            date = _date_sauvegarde(nom, entree["modifie"])
+            # Seuls les noms horodatés sont des sauvegardes (objets/, instantanes/... exclus)
+            if not correspondance or date is None:
+                continue
+            sauvegardes.append({"chemin": f"{chemin}/{entree['nom']}", "nom": nom,
+                                "serie": f"{chemin}/{correspondance.group(2)}", "date": date,
+                                "dossier": entree["dossier"], "taille": entree["taille"]})
+    return sauvegardes
+
+
+def _enumerer_contenu(ftp_manager, chemin):
+    """Liste récursivement un dossier FTP : ([(chemin_fichier, taille)], [chemins de dossiers])."""
+    fichiers, dossiers = [], [chemin]
+    for entree in ftp_manager._lister_repertoire(chemin):
+        chemin_entree = f"{chemin}/{entree['nom']}"
+        if entree["dossier"]:
+            sous_fichiers, sous_dossiers = _enumerer_contenu(ftp_manager, chemin_entree)
+            fichiers += sous_fichiers
+            dossiers += sous_dossiers
+        else:
+            fichiers.append((chemin_entree, entree["taille"] or 0))
+    return fichiers, dossiers
+
+
+def _objets_orphelins(ftp_manager, ville, instantanes_conserves):
+    """Retourne les objets [(chemin, taille, sha256)] référencés par aucun instantané conservé
+       et plus anciens que DELAI_GRACE_OBJETS."""
+    nom_ville = ville.lower()
+    references = set()
+    for chemin in instantanes_conserves:
+        tampon = io.BytesIO()
+        ftp_manager.ftp.retrbinary(f"RETR {chemin}", tampon.write)
+        index = json.loads(tampon.getvalue().decode("utf-8"))
+        references.update(infos["sha256"] for infos in index["fichiers"].values())
+
+    limite = datetime.now(timezone.utc) - DELAI_GRACE_OBJETS
+    orphelins = []
+    try:
+        prefixes = ftp_manager._lister_repertoire(f"/{nom_ville}/{DOSSIER_OBJETS}")
+    except FileNotFoundError:
+        return orphelins
+    for prefixe in prefixes:
+        chemin_prefixe = f"/{nom_ville}/{DOSSIER_OBJETS}/{prefixe['nom']}"
+        for objet in ftp_manager._lister_repertoire(chemin_prefixe):
+            if objet["nom"] in references or (objet["modifie"] and objet["modifie"] > limite):
+                continue
+            orphelins.append((f"{chemin_prefixe}/{objet['nom']}", objet["taille"] or 0, objet["nom"]))
+    return orphelins
+
+
+def _supprimer_fichier(ftp, chemin):
+    """Action du moteur de transfert : suppression d'un fichier (DELE)."""
+    ftp.delete(chemin)
+    return 0
+
+
+def _supprimer_dossier(ftp, chemin):
+    """Action du moteur de transfert : suppression d'un dossier vide (RMD)."""
+    ftp.rmd(chemin)
+    return 0
+
+
+def appliquer_retention(ftp_manager, ville, quotidiennes=RETENTION_QUOTIDIENNE,
+                        hebdomadaires=RETENTION_HEBDOMADAIRE, mensuelles=RETENTION_MENSUELLE,
+                        simulation=True):
+    """Applique la politique de rétention aux sauvegardes de la ville ('ftp_manager' connecté).
+       En simulation, rien n'est supprimé : le rapport indique ce qui le serait.
+       Retourne un dict {ville, simulation, conservees, supprimees (noms), objets (orphelins),
+       fichiers, octets (libérés), duree, echecs}. Attend la fin d'une sauvegarde
+       incrémentale de la ville lancée sur ce poste (verrou de la ville)."""
+    with verrou_ville(ville):
+        return _appliquer_retention(ftp_manager, ville, quotidiennes, hebdomadaires, mensuelles, simulation)
+
+
+def _appliquer_retention(ftp_manager, ville, quotidiennes, hebdomadaires, mensuelles, simulation):
+    """Corps de appliquer_retention (verrou de la ville déjà pris)."""
+    debut = time.perf_counter()
+    sauvegardes = inventorier_sauvegardes(ftp_manager, ville)
+
+    series = {}
+    for sauvegarde in sauvegardes:
+        series.setdefault(sauvegarde["serie"], []).append(sauvegarde)
+    a_conserver = set()
+    for membres in series.values():
+        noms = selectionner_a_conserver([(s["chemin"], s["date"]) for s in membres],
+                                        quotidiennes, hebdomadaires, mensuelles)
+        a_conserver.update(noms)
+    a_supprimer = [s for s in sauvegardes if s["chemin"] not in a_conserver]
+
+    # Fichiers et dossiers de chaque sauvegarde supprimée (un listage MLSD par dossier)
+    fichiers, dossiers = [], []
+    for sauvegarde in a_supprimer:
+        if sauvegarde["dossier"]:
+            sous_fichiers, sous_dossiers = _enumerer_contenu(ftp_manager, sauvegarde["chemin"])
+            fichiers += sous_fichiers
+            dossiers += sous_dossiers
+        else:
+            fichiers.append((sauvegarde["chemin"], sauvegarde["taille"] or 0))
+
+    instantanes_conserves = [s["chemin"] for s in sauvegardes
+                             if s["chemin"] in a_conserver and not s["dossier"]]
+    orphelins = []
+    if any(not s["dossier"] for s in a_supprimer):
+        if sauvegarde_en_cours(ftp_manager.ftp, ville):
+            logger.warning(f"RÉTENTION : sauvegarde de {ville} en cours sur un autre poste, "
+                           f"objets orphelins conservés jusqu'à la prochaine rétention")
+        else:
+            orphelins = _objets_orphelins(ftp_manager, ville, instantanes_conserves)
+    fichiers += [(chemin, taille) for chemin, taille, _ in orphelins]
+
+    rapport = {
+        "ville": ville,
+        "simulation": simulation,
+        "conservees": sorted(s["chemin"] for s in sauvegardes if s["chemin"] in a_conserver),
+        "supprimees": sorted(s["chemin"] for s in a_supprimer),
+        "objets": len(orphelins),
+        "fichiers": len(fichiers),
+        "octets": sum(taille for _, taille in fichiers),
+        "duree": 0.0,
+        "echecs": [],
+    }
+
+    if not simulation and fichiers:
+        moteur = ftp_manager._moteur_transfert()
+        rapport["echecs"] += moteur.executer([chemin for chemin, _ in fichiers], _supprimer_fichier)["echecs"]
+
+        # Dossiers vidés : les plus profonds d'abord, chaque niveau en parallèle
+        for profondeur in sorted({d.count("/") for d in dossiers}, reverse=True):
+            niveau = [d for d in dossiers if d.count("/") == profondeur]
+            rapport["echecs"] += moteur.executer(niveau, _supprimer_dossier)["echecs"]
+        ftp_manager.invalider_cache_listages()
+
+        # Objets supprimés : oubliés du manifeste local pour être renvoyés si le contenu réapparaît
+        if orphelins:
+            supprimes = {sha256 for _, _, sha256 in orphelins}
+            manifeste = charger_manifeste(ville)
+            manifeste["objets"] = [o for o in manifeste["objets"] if o not in supprimes]
+            enregistrer_manifeste(ville, manifeste)
+
+    rapport["duree"] = time.perf_counter() - debut
+    logger.info(
+        f"RÉTENTION{' (simulation)' if simulation else ''} : {ville} -> {len(rapport['conservees'])} "
+        f"conservée(s), {len(rapport['supprimees'])} supprimée(s), {rapport['objets']} objet(s) orphelin(s), "
+        f"{rapport['fichiers']} fichier(s), {rapport['octets']} octets, {len(rapport['echecs'])} échec(s)"
+    )
+    return rapport
@@ -0,0 +1,239 @@
+"""Sauvegardes FTP sous forme d'archives compressées découpées en parties.
+
+Envoyer un dossier rempli de petits documents fichier par fichier coûte un STOR
+(et ses allers-retours) par fichier. Ce mode regroupe l'arborescence de la
+ville dans des archives tar.gz d'environ TAILLE_PARTIE octets compressés : chaque
+partie est envoyée dès qu'elle est produite, pendant que la suivante se
+construit. Organisation sur le serveur FTP :
+  /<ville>/archives/<AAAAMMJJ_HHMM_prefixe>/partie_0001.tar.gz, partie_0002.tar.gz...
+  /<ville>/archives/<AAAAMMJJ_HHMM_prefixe>/manifeste.json
+
+Chaque partie est une archive autonome qui ne contient que des fichiers entiers :
+le manifeste indique la partie de chaque fichier, ce qui permet d'extraire une
+sélection de fichiers en ne téléchargeant que les parties concernées."""
+
+import io
+import os
+import gzip
+import json
+import time
+import queue
+import logging
+import tarfile
+import tempfile
+import threading
+from datetime import datetime
+
+from transfert_ftp import EnvoiAvecEmpreintes, MoteurTransfertFTP, telecharger_vers_fichier
+from sauvegarde_incrementale import sha256_fichier
+
+# Logger du module, rattaché à la configuration définie dans main.py (operations.log)
+logger = logging.getLogger(__name__)
+
+# Racine du projet (dossier parent de app/)
+_ROOT_DIR = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+DOSSIER_ARCHIVES = "archives"
+NOM_MANIFESTE = "manifeste.json"
+
+# Taille visée (octets compressés) d'une partie (surchargeable par variable d'environnement).
+# Un fichier n'est jamais coupé : une partie peut dépasser cette taille d'un fichier.
+TAILLE_PARTIE = int(os.getenv("ARCHIVE_TAILLE_PARTIE", str(32 * 1024 * 1024)))
+
+# Niveau de compression gzip (6 : bon compromis entre taille et temps processeur)
+NIVEAU_COMPRESSION = 6
+
+# Nombre de parties produites d'avance en attente d'envoi (borne l'espace disque temporaire)
+PARTIES_EN_ATTENTE = 2
+
+
+class _EnvoiInterrompu(Exception):
+    """Levée dans la production des parties quand l'envoi d'une partie a échoué."""
+
+
+def _nom_partie(numero):
+    """Retourne le nom de fichier de la partie 'numero' (à partir de 1)."""
+    return f"partie_{numero:04d}.tar.gz"
+
+
+def _produire_parties(base_path, dossier_temp, taille_partie, publier):
+    """Regroupe les fichiers de 'base_path' dans des parties tar.gz écrites dans 'dossier_temp'.
+       publier(chemin_partie) est appelé dès qu'une partie est complète.
+       Retourne (parties, fichiers) pour le manifeste."""
+    parties = []
+    fichiers = {}
+    brut = archive_gz = tar = None
+
+    def cloturer():
+        tar.close()
+        archive_gz.close()
+        brut.close()
+        parties.append({"nom": _nom_partie(len(parties) + 1), "fichiers": 0})
+        publier(os.path.join(dossier_temp, parties[-1]["nom"]))
+
+    for racine, dossiers, noms in os.walk(base_path):
+        # Ordre stable : deux archives d'une même arborescence ont le même découpage
+        dossiers.sort()
+        for nom in sorted(noms):
+            if tar is None:
+                brut = open(os.path.join(dossier_temp, _nom_partie(len(parties) + 1)), "wb")
+                archive_gz = gzip.GzipFile(fileobj=brut, mode="wb", compresslevel=NIVEAU_COMPRESSION)
+                tar = tarfile.open(fileobj=archive_gz, mode="w")
+
+            chemin = os.path.join(racine, nom)
+            relatif = os.path.relpath(chemin, base_path).replace(os.sep, "/")
+            infos = os.stat(chemin)
+            tar.add(chemin, arcname=relatif, recursive=False)
+            fichiers[relatif] = {"partie": len(parties), "taille": infos.st_size, "mtime": infos.st_mtime}
+
+            # Taille compressée déjà écrite sur disque (hors tampon de compression)
+            if brut.tell() >= taille_partie:
+                cloturer()
+                tar = None
+
+    if tar is not None:
+        cloturer()
+
+    for infos in fichiers.values():
+        parties[infos["partie"]]["fichiers"] += 1
+    return parties, fichiers
+
+
+def sauvegarder_archive(ftp_manager, ville, nom_archive, taille_partie=TAILLE_PARTIE):
+    """Crée l'archive 'nom_archive' du dossier local de la ville, envoyée partie par partie
+       pendant sa construction. 'ftp_manager' doit être connecté. Retourne un dict
+       {fichiers, parties, octets (envoyés), octets_bruts, duree, echecs} ; lève
+       OSError / ftplib.all_errors si le manifeste ne peut pas être écrit."""
+    nom_ville = ville.lower()
+    base_path = os.path.join(_ROOT_DIR, "data_hospital", nom_ville)
+    dossier_ftp = f"/{nom_ville}/{DOSSIER_ARCHIVES}/{nom_archive}"
+    debut = time.perf_counter()
+
+    MoteurTransfertFTP.creer_dossiers(ftp_manager.ftp, [f"/{nom_ville}", f"/{nom_ville}/{DOSSIER_ARCHIVES}",
+                                                        dossier_ftp])
+    moteur = ftp_manager._moteur_transfert()
+
+    # Envoi des parties au fil de l'eau par un thread dédié, sur une seule session (file bornée :
+    # production freinée si le réseau est plus lent que la compression). Les empreintes des
+    # parties sont calculées pendant leur envoi, sans relecture du disque.
+    file_parties = queue.Queue(maxsize=PARTIES_EN_ATTENTE)
+    envoi = {"reussis": 0, "octets": 0, "echecs": []}
+    empreintes = EnvoiAvecEmpreintes()
+
+    def envoyer_parties():
+        ftp = None
+        verrou = threading.Lock()
+        # La file est toujours vidée jusqu'à la fin (None), même après un échec : le
+        # producteur ne peut pas rester bloqué sur une file pleine
+        while (chemin := file_parties.get()) is not None:
+            if envoi["echecs"]:
+                continue
+            try:
+                ftp = moteur.executer_tache(ftp, (chemin, f"{dossier_ftp}/{os.path.basename(chemin)}"),
+                                            empreintes, envoi, verrou)
+                os.remove(chemin)
+            except Exception as e:
+                envoi["echecs"].append((chemin, f"{type(e).__name__}: {e}"))
+        if ftp is not None:
+            moteur.fermer_session(ftp)
+
+    def publier(chemin):
+        # Une partie non envoyée condamne l'archive : inutile de compresser la suite
+        if envoi["echecs"]:
+            raise _EnvoiInterrompu()
+        file_parties.put(chemin)
+
+    envoyeur = threading.Thread(target=envoyer_parties, daemon=True, name=f"archive-{nom_ville}")
+    envoyeur.start()
+    with tempfile.TemporaryDirectory(prefix="archive_") as dossier_temp:
+        try:
+            parties, fichiers = _produire_parties(base_path, dossier_temp, taille_partie, publier)
+        except _EnvoiInterrompu:
+            parties, fichiers = [], {}
+        finally:
+            file_parties.put(None)
+            envoyeur.join()
+
+    rapport = {"fichiers": len(fichiers), "parties": len(parties), "octets": envoi["octets"],
+               "octets_bruts": sum(infos["taille"] for infos in fichiers.values()),
+               "duree": time.perf_counter() - debut, "echecs": envoi["echecs"]}
+    if rapport["echecs"]:
+        logger.error(f"ARCHIVE ABANDONNÉE : {ville}/{nom_archive} ({len(rapport['echecs'])} partie(s) non envoyée(s))")
+        return rapport
+
+    for partie in parties:
+        partie.update(empreintes.empreintes[f"{dossier_ftp}/{partie['nom']}"])
+
+    # Le manifeste n'est écrit qu'une fois toutes les parties présentes sur le serveur
+    manifeste = {
+        "nom": nom_archive,
+        "ville": nom_ville,
+        "date": datetime.now().isoformat(timespec="seconds"),
+        "parties": parties,
+        "fichiers": fichiers,
+    }
+    donnees = json.dumps(manifeste, ensure_ascii=False, indent=1).encode("utf-8")
+    ftp_manager.ftp.storbinary(f"STOR {dossier_ftp}/{NOM_MANIFESTE}", io.BytesIO(donnees))
+
+    logger.info(
+        f"ARCHIVE : {ville}/{nom_archive} -> {rapport['fichiers']} fichier(s) en {rapport['parties']} partie(s), "
+        f"{rapport['octets_bruts']} octets compressés en {rapport['octets']}"
+    )
+    return rapport
+
+
+def lister_archives(ftp_manager, ville):
+    """Retourne les noms des archives de la ville, de la plus ancienne à la plus récente."""
+    try:
+        entrees = ftp_manager.ftp.nlst(f"/{ville.lower()}/{DOSSIER_ARCHIVES}")
+    except Exception as e:
+        logger.error(f"Erreur listing archives ({ville}): {e}")
+        return []
+    return sorted(os.path.basename(e) for e in entrees if os.path.basename(e) not in (".", ".."))
+
+
+def lire_manifeste_archive(ftp_manager, ville, nom_archive):
+    """Télécharge et retourne le manifeste (dict) de l'archive."""
+    tampon = io.BytesIO()
+    ftp_manager.ftp.retrbinary(f"RETR /{ville.lower()}/{DOSSIER_ARCHIVES}/{nom_archive}/{NOM_MANIFESTE}",
+                               tampon.write)
+    return json.loads(tampon.getvalue().decode("utf-8"))
+
+
+def extraire_archive(ftp_manager, ville, nom_archive, destination_locale, selection=None):
+    """Extrait l'archive dans destination_locale/<nom_archive>.
+       'selection' : chemins relatifs de fichiers ou de dossiers à extraire (tout si None) ;
+       seules les parties qui les contiennent sont téléchargées (en parallèle).
+       Retourne le nombre de fichiers extraits ; lève OSError si une partie est
+       manquante ou corrompue."""
+    manifeste = lire_manifeste_archive(ftp_manager, ville, nom_archive)
+    dossier_ftp = f"/{ville.lower()}/{DOSSIER_ARCHIVES}/{nom_archive}"
+    dossier = os.path.join(destination_locale, nom_archive)
+
+    voulus = {
+        relatif: infos for relatif, infos in manifeste["fichiers"].items()
+        if selection is None or any(relatif == s.strip("/") or relatif.startswith(s.strip("/") + "/")
+                                    for s in selection)
+    }
+    parties = [manifeste["parties"][i] for i in sorted({infos["partie"] for infos in voulus.values()})]
+
+    with tempfile.TemporaryDirectory(prefix="archive_") as dossier_temp:
+        elements = [{"ftp": f"{dossier_ftp}/{p['nom']}", "local": os.path.join(dossier_temp, p["nom"]),
+                     "taille": p["taille"]} for p in parties]
+        rapport = ftp_manager._moteur_transfert().executer(
+            elements, lambda ftp, e: telecharger_vers_fichier(ftp, e["ftp"], e["local"], taille_attendue=e["taille"]))
+        if rapport["echecs"]:
+            raise OSError(f"{len(rapport['echecs'])} partie(s) non téléchargée(s)")
+
+        os.makedirs(dossier, exist_ok=True)
+        for partie, element in zip(parties, elements):
+            if sha256_fichier(element["local"]) != partie["sha256"]:
+                raise OSError(f"partie corrompue : {partie['nom']}")
+            with tarfile.open(element["local"], "r:gz") as tar:
+                membres = [m for m in tar.getmembers() if m.name in voulus]
+                # Filtre 'data' : refuse les chemins absolus, '..' et liens sortant du dossier
+                tar.extractall(dossier, members=membres, filter="data")
+
+    logger.info(f"EXTRACTION : {ville}/{nom_archive} -> {dossier} "
+                f"({len(voulus)} fichier(s), {len(parties)}/{len(manifeste['parties'])} partie(s))")
+    return len(voulus)
@@ -0,0 +1,290 @@
+"""Sauvegardes FTP incrémentales à adressage par contenu.
+
+Organisation sur le serveur FTP, pour chaque ville :
+  /<ville>/objets/<2 premiers caractères>/<sha256>   contenu des fichiers (un objet par contenu distinct)
+  /<ville>/instantanes/<AAAAMMJJ_HHMM_prefixe>.json   index d'un instantané : chemin -> sha256, taille, mtime
+
+Un manifeste local par ville (data_hospital/.manifestes/<ville>.json) mémorise
+la taille, la date de modification et le sha256 de chaque fichier, ainsi que
+les objets déjà présents sur le serveur. Seuls les fichiers dont la taille ou
+la date a changé sont relus et hachés, et seuls les contenus encore absents du
+serveur sont envoyés : un instantané sans modification ne transfère que son
+index. Chaque instantané reste restaurable seul, quel que soit son ancienneté.
+
+Une sauvegarde réutilise des objets déjà présents mais n'écrit son index qu'à la
+fin : la rétention ne doit pas supprimer d'objets pendant ce temps. Les deux
+opérations prennent le verrou de la ville (verrou_ville), et une sauvegarde
+signale sa présence sur le serveur (MARQUEUR_SAUVEGARDE) aux autres postes."""
+
+import io
+import os
+import json
+import socket
+import hashlib
+import logging
+import threading
+import contextlib
+import collections
+from datetime import datetime, timedelta
+from ftplib import all_errors
+
+try:
+    import fcntl
+except ImportError:
+    # Windows : le verrou de ville ne protège que le processus courant
+    fcntl = None
+
+from transfert_ftp import EnvoiAvecEmpreintes, MoteurTransfertFTP
+from restauration_ftp import restaurer_fichiers
+
+# Logger du module, rattaché à la configuration définie dans main.py (operations.log)
+logger = logging.getLogger(__name__)
+
+# Racine du projet (dossier parent de app/)
+_ROOT_DIR = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+# Manifestes locaux, hors des dossiers de ville (qui sont eux-mêmes sauvegardés)
+DOSSIER_MANIFESTES = os.path.join(_ROOT_DIR, "data_hospital", ".manifestes")
+
+DOSSIER_OBJETS = "objets"
+DOSSIER_INSTANTANES = "instantanes"
+
+# Taille des blocs lus pour le calcul du sha256
+TAILLE_BLOC_HACHAGE = 1024 * 1024
+
+# Fichier posé à la racine de la ville sur le serveur pendant une sauvegarde incrémentale
+MARQUEUR_SAUVEGARDE = ".sauvegarde_en_cours"
+
+# Au-delà de cette ancienneté, un marqueur est celui d'une sauvegarde interrompue : il est ignoré
+VALIDITE_MARQUEUR = timedelta(hours=6)
+
+# Verrous des villes entre threads du processus (le fichier verrou couvre les autres processus)
+_VERROUS_VILLES = collections.defaultdict(threading.Lock)
+
+
+def _chemin_manifeste(ville):
+    """Retourne le chemin du manifeste local de la ville."""
+    return os.path.join(DOSSIER_MANIFESTES, f"{ville.lower()}.json")
+
+
+def charger_manifeste(ville):
+    """Charge le manifeste local de la ville (manifeste vide s'il n'existe pas ou est illisible)."""
+    try:
+        with open(_chemin_manifeste(ville), encoding="utf-8") as f:
+            manifeste = json.load(f)
+        manifeste.setdefault("fichiers", {})
+        manifeste.setdefault("objets", [])
+        return manifeste
+    except FileNotFoundError:
+        pass
+    except (OSError, ValueError) as e:
+        logger.warning(f"MANIFESTE : illisible pour {ville} ({e}), analyse complète")
+    return {"fichiers": {}, "objets": []}
+
+
+def enregistrer_manifeste(ville, manifeste):
+    """Écrit le manifeste local de façon atomique (fichier temporaire puis renommage)."""
+    os.makedirs(DOSSIER_MANIFESTES, exist_ok=True)
+    chemin = _chemin_manifeste(ville)
+    with open(chemin + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(manifeste, f, ensure_ascii=False)
+    os.replace(chemin + ".tmp", chemin)
+
+
+@contextlib.contextmanager
+def verrou_ville(ville):
+    """Verrou exclusif de la ville, partagé par les sauvegardes incrémentales et la rétention
+       (objets du serveur et manifeste local) : entre threads, et entre processus de la
+       machine par flock sur data_hospital/.manifestes/<ville>.lock. Bloquant."""
+    with _VERROUS_VILLES[ville.lower()]:
+        if fcntl is None:
+            yield
+            return
+        os.makedirs(DOSSIER_MANIFESTES, exist_ok=True)
+        with open(os.path.join(DOSSIER_MANIFESTES, f"{ville.lower()}.lock"), "a") as fichier_verrou:
+            fcntl.flock(fichier_verrou, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(fichier_verrou, fcntl.LOCK_UN)
+
+
+def sauvegarde_en_cours(ftp, ville):
+    """Indique si une sauvegarde incrémentale de la ville est en cours (sur n'importe quel
+       poste) : marqueur présent sur le serveur et plus récent que VALIDITE_MARQUEUR."""
+    tampon = io.BytesIO()
+    try:
+        ftp.retrbinary(f"RETR /{ville.lower()}/{MARQUEUR_SAUVEGARDE}", tampon.write)
+        debut = datetime.fromisoformat(json.loads(tampon.getvalue().decode("utf-8"))["date"])
+    except all_errors:
+        return False
+    except (ValueError, KeyError):
+        # Marqueur illisible : on le considère actif par prudence
+        return True
+    return datetime.now() - debut < VALIDITE_MARQUEUR
+
+
+def sha256_fichier(chemin):
+    """Calcule le sha256 (hexadécimal) d'un fichier lu par blocs."""
+    empreinte = hashlib.sha256()
+    with open(chemin, "rb") as f:
+        for bloc in iter(lambda: f.read(TAILLE_BLOC_HACHAGE), b""):
+            empreinte.update(bloc)
+    return empreinte.hexdigest()
+
+
+def analyser_dossier(base_path, fichiers_connus):
+    """Parcourt 'base_path' et retourne {chemin_relatif: {taille, mtime, sha256}}.
+       Le sha256 d'un fichier dont la taille et la date n'ont pas changé depuis
+       'fichiers_connus' est repris tel quel, sans relire le fichier.
+       Retourne aussi le nombre de fichiers hachés."""
+    fichiers = {}
+    nb_haches = 0
+
+    for racine, _, noms in os.walk(base_path):
+        for nom in noms:
+            chemin = os.path.join(racine, nom)
+            relatif = os.path.relpath(chemin, base_path).replace(os.sep, "/")
+            infos = os.stat(chemin)
+            connu = fichiers_connus.get(relatif)
+
+            if connu and connu["taille"] == infos.st_size and connu["mtime"] == infos.st_mtime:
+                sha256 = connu["sha256"]
+            else:
+                sha256 = sha256_fichier(chemin)
+                nb_haches += 1
+
+            fichiers[relatif] = {"taille": infos.st_size, "mtime": infos.st_mtime, "sha256": sha256}
+
+    return fichiers, nb_haches
+
+
+def chemin_objet(ville, sha256):
+    """Retourne le chemin FTP absolu de l'objet 'sha256' de la ville."""
+    return f"/{ville.lower()}/{DOSSIER_OBJETS}/{sha256[:2]}/{sha256}"
+
+
+def sauvegarder_incremental(ftp_manager, ville, nom_instantane):
+    """Crée l'instantané 'nom_instantane' du dossier local de la ville, sous le verrou de la
+       ville et avec le marqueur de sauvegarde posé sur le serveur.
+       'ftp_manager' doit être connecté. Retourne un dict
+       {fichiers, envoyes, octets, duree, echecs} ; lève OSError / ftplib.all_errors
+       si l'index ne peut pas être écrit."""
+    nom_ville = ville.lower()
+    marqueur = f"/{nom_ville}/{MARQUEUR_SAUVEGARDE}"
+    with verrou_ville(ville):
+        MoteurTransfertFTP.creer_dossiers(ftp_manager.ftp, [f"/{nom_ville}"])
+        contenu = {"date": datetime.now().isoformat(timespec="seconds"), "poste": socket.gethostname(),
+                   "pid": os.getpid(), "instantane": nom_instantane}
+        ftp_manager.ftp.storbinary(f"STOR {marqueur}", io.BytesIO(json.dumps(contenu).encode("utf-8")))
+        try:
+            return _creer_instantane(ftp_manager, ville, nom_instantane)
+        finally:
+            try:
+                ftp_manager.ftp.delete(marqueur)
+            except all_errors as e:
+                logger.warning(f"INSTANTANÉ : marqueur {marqueur} non supprimé ({e})")
+
+
+def _creer_instantane(ftp_manager, ville, nom_instantane):
+    """Corps de sauvegarder_incremental (verrou et marqueur déjà en place)."""
+    nom_ville = ville.lower()
+    base_path = os.path.join(_ROOT_DIR, "data_hospital", nom_ville)
+
+    manifeste = charger_manifeste(ville)
+    fichiers, nb_haches = analyser_dossier(base_path, manifeste["fichiers"])
+    objets_distants = set(manifeste["objets"])
+
+    # Un seul envoi par contenu absent du serveur (les fichiers identiques partagent leur objet)
+    a_envoyer = {}
+    for relatif, infos in fichiers.items():
+        if infos["sha256"] not in objets_distants:
+            a_envoyer.setdefault(infos["sha256"], os.path.join(base_path, relatif))
+
+    dossiers = [f"/{nom_ville}", f"/{nom_ville}/{DOSSIER_OBJETS}", f"/{nom_ville}/{DOSSIER_INSTANTANES}"]
+    dossiers += [f"/{nom_ville}/{DOSSIER_OBJETS}/{sha256[:2]}" for sha256 in a_envoyer]
+    MoteurTransfertFTP.creer_dossiers(ftp_manager.ftp, dossiers)
+
+    taches = [(chemin, chemin_objet(ville, sha256)) for sha256, chemin in a_envoyer.items()]
+    envoi = EnvoiAvecEmpreintes()
+    rapport = ftp_manager._moteur_transfert().executer(taches, envoi)
+
+    # Contenu modifié entre l'analyse et l'envoi : l'objet ne correspond pas à son nom
+    for (chemin_local, chemin_ftp), sha256 in zip(taches, a_envoyer):
+        empreinte = envoi.empreintes.get(chemin_ftp)
+        if empreinte and empreinte["sha256"] != sha256:
+            rapport["echecs"].append(((chemin_local, chemin_ftp), "fichier modifié pendant la sauvegarde"))
+
+    # Les objets envoyés avec succès sont mémorisés même si l'instantané échoue
+    echecs = {chemin_ftp for (_, chemin_ftp), _ in rapport["echecs"]}
+    objets_distants.update(sha256 for sha256 in a_envoyer if chemin_objet(ville, sha256) not in echecs)
+    manifeste["objets"] = sorted(objets_distants)
+
+    if echecs:
+        enregistrer_manifeste(ville, manifeste)
+        logger.error(f"INSTANTANÉ ABANDONNÉ : {ville}/{nom_instantane} ({len(echecs)} objet(s) non envoyé(s))")
+        return {"fichiers": len(fichiers), "envoyes": rapport["reussis"], "octets": rapport["octets"],
+                "duree": rapport["duree"], "echecs": rapport["echecs"]}
+
+    # L'index n'est écrit qu'une fois tous ses objets présents sur le serveur
+    index = {
+        "nom": nom_instantane,
+        "ville": nom_ville,
+        "date": datetime.now().isoformat(timespec="seconds"),
+        "fichiers": fichiers,
+    }
+    donnees = json.dumps(index, ensure_ascii=False, indent=1).encode("utf-8")
+    ftp_manager.ftp.storbinary(f"STOR /{nom_ville}/{DOSSIER_INSTANTANES}/{nom_instantane}.json",
+                               io.BytesIO(donnees))
+
+    manifeste["fichiers"] = fichiers
+    enregistrer_manifeste(ville, manifeste)
+
+    logger.info(
+        f"INSTANTANÉ : {ville}/{nom_instantane} -> {len(fichiers)} fichier(s), {nb_haches} haché(s), "
+        f"{rapport['reussis']} objet(s) envoyé(s) ({rapport['octets']} octets)"
+    )
+    return {"fichiers": len(fichiers), "envoyes": rapport["reussis"], "octets": rapport["octets"],
+            "duree": rapport["duree"], "echecs": []}
+
+
+def lister_instantanes(ftp_manager, ville):
+    """Retourne les noms des instantanés de la ville, du plus ancien au plus récent."""
+    try:
+        entrees = ftp_manager.ftp.nlst(f"/{ville.lower()}/{DOSSIER_INSTANTANES}")
+    except Exception as e:
+        logger.error(f"Erreur listing instantanés ({ville}): {e}")
+        return []
+    noms = [os.path.basename(e) for e in entrees]
+    return sorted(n[:-len(".json")] for n in noms if n.endswith(".json"))
+
+
+def lire_instantane(ftp_manager, ville, nom_instantane):
+    """Télécharge et retourne l'index (dict) de l'instantané."""
+    tampon = io.BytesIO()
+    ftp_manager.ftp.retrbinary(f"RETR /{ville.lower()}/{DOSSIER_INSTANTANES}/{nom_instantane}.json",
+                               tampon.write)
+    return json.loads(tampon.getvalue().decode("utf-8"))
+
+
+def restaurer_instantane(ftp_manager, ville, nom_instantane, destination_locale):
+    """Reconstitue l'arborescence de l'instantané dans destination_locale/<nom_instantane>,
+       fichiers téléchargés en parallèle avec leurs tailles et dates d'origine.
+       Retourne le nombre de fichiers restaurés (y compris lors d'une exécution précédente
+       interrompue) ; lève OSError si certains fichiers n'ont pas pu être restaurés."""
+    index = lire_instantane(ftp_manager, ville, nom_instantane)
+    dossier = os.path.join(destination_locale, nom_instantane)
+
+    elements = [
+        {"ftp": chemin_objet(ville, infos["sha256"]), "local": os.path.join(dossier, *relatif.split("/")),
+         "taille": infos["taille"], "mtime": infos["mtime"]}
+        for relatif, infos in index["fichiers"].items()
+    ]
+    rapport = restaurer_fichiers(ftp_manager._moteur_transfert(), elements, dossier)
+
+    if rapport["echecs"]:
+        raise OSError(f"{len(rapport['echecs'])} fichier(s) non restauré(s) ; relancez pour reprendre")
+
+    nb_ok = rapport["reussis"] + rapport["ignores"]
+    logger.info(f"RESTAURATION : {ville}/{nom_instantane} -> {dossier} ({nb_ok} fichier(s))")
+    return nb_ok
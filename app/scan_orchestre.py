@@ -0,0 +1,415 @@
+"""Orchestrateur de scans de ports TCP sur plusieurs hôtes (audit de sites complets).
+
+Les cibles sont des adresses IP, des réseaux CIDR (développés comme dans
+scan_reseau, au plus MAX_HOTES hôtes par audit) ou des noms de machine ; les
+ports, une spécification mêlant listes, plages et « top N » (ex : '22,80,443',
+'1-1024', 'top100').
+
+Les hôtes sont répartis entre les processus d'un pool (un par cœur). Dans chaque
+processus, une seule boucle asyncio sonde tous ses hôtes en alternance : une
+sonde par hôte à chaque tour, de sorte qu'aucune cible ne reçoit une rafale de
+connexions. Le nombre de sondes en vol est borné globalement (réparti entre les
+processus) et par hôte, où il suit la fenêtre de congestion de l'hôte
+(FenetreCongestion) ; le délai d'attente de chaque adresse est adaptatif
+(EstimateurRTT), comme pour scanner_plage_async. Les résultats des processus
+sont fusionnés en un seul rapport."""
+
+import os
+import time
+import asyncio
+import logging
+import ipaddress
+import itertools
+import collections
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from exceptions_reseau import PlagePortsInvalideError, ReseauInvalideError, HoteIntrouvableError
+from scan_reseau import _lister_hotes
+from scan_ports import (DEBIT_MAX_PAR_HOTE, FENETRE_INITIALE, SERVICES_CONNUS, TIMEOUT_MIN, EstimateurRTT,
+                        FenetreCongestion, LimiteurDebit, _Progression, _adresse_port, _bilan_sonde,
+                        _etat_erreur_sonde, _fenetre_effective, _sonder_tcp, _surveiller_echeances,
+                        _valider_plage, nom_service, resoudre_cible)
+
+# Logger du module, rattaché à la configuration définie dans main.py (operations.log)
+logger = logging.getLogger(__name__)
+
+# Nombre de processus du pool (un par cœur)
+PROCESSUS_SCAN = os.cpu_count() or 1
+
+# Connexions en vol, tous hôtes confondus (réparties entre les processus) puis par hôte
+LIMITE_GLOBALE = 2048
+LIMITE_PAR_HOTE = 128
+
+# Nombre maximal d'hôtes par audit (un /16 IPv4) : un réseau plus large (/8, préfixe
+# IPv6...) est refusé avant d'être développé en mémoire
+MAX_HOTES = 65536
+
+# Spécification de ports par défaut
+PORTS_DEFAUT = "top100"
+
+# Ports TCP les plus souvent ouverts, du plus fréquent au moins fréquent (classement de nmap),
+# pour les spécifications « top N » ; au-delà, les ports de SERVICES_CONNUS puis les autres
+PORTS_FREQUENTS = (
+    80, 23, 443, 21, 22, 25, 3389, 110, 445, 139, 143, 53, 135, 3306, 8080, 1723, 111, 995, 993, 5900,
+    1025, 587, 8888, 199, 1720, 465, 548, 113, 81, 6001, 10000, 514, 5060, 179, 1026, 2000, 8443, 8000,
+    32768, 554, 26, 1433, 49152, 2001, 515, 8008, 49154, 1027, 5666, 646, 5000, 5631, 631, 49153, 8081,
+    2049, 88, 79, 5800, 106, 2121, 1110, 49155, 6000, 513, 990, 5357, 427, 49156, 543, 544, 5101, 144,
+    7, 389, 8009, 3128, 444, 9999, 5009, 7070, 5190, 3000, 5432, 1900, 3986, 13, 1029, 9, 5051, 6646,
+    49157, 1028, 873, 1755, 2717, 4899, 9100, 119, 37,
+)
+
+
+def _ports_par_frequence():
+    """Tous les ports (1-65535), les plus susceptibles d'être ouverts en premier."""
+    return list(dict.fromkeys(itertools.chain(PORTS_FREQUENTS, sorted(SERVICES_CONNUS), range(1, 65536))))
+
+
+def analyser_ports(specification):
+    """Convertit une spécification de ports en liste triée sans doublon.
+
+    Éléments séparés par des virgules : un port ('443'), une plage ('8000-8100')
+    ou les N ports les plus fréquents ('top100'). Lève PlagePortsInvalideError
+    si un élément est invalide."""
+    ports = set()
+    for element in specification.replace(" ", "").lower().split(","):
+        if not element:
+            continue
+        try:
+            if element.startswith("top"):
+                nombre = int(element[3:])
+                if not 1 <= nombre <= 65535:
+                    raise PlagePortsInvalideError(f"Nombre de ports hors limites (autorisé : 1-65535) : {element}.")
+                ports.update(_ports_par_frequence()[:nombre])
+            else:
+                debut, tiret, fin = element.partition("-")
+                # int('') lève ValueError : '1-' ou '-5' sont refusés comme invalides
+                port_debut = int(debut)
+                port_fin = int(fin) if tiret else port_debut
+                _valider_plage(port_debut, port_fin)
+                ports.update(range(port_debut, port_fin + 1))
+        except ValueError as e:
+            raise PlagePortsInvalideError(f"Spécification de ports invalide : '{element}'.") from e
+    if not ports:
+        raise PlagePortsInvalideError(f"Aucun port à scanner : '{specification}'.")
+    return sorted(ports)
+
+
+def developper_cibles(cibles, max_hotes=MAX_HOTES):
+    """Retourne la liste ordonnée et sans doublon des hôtes à scanner.
+
+    Chaque cible est une IP, un réseau CIDR (développé par _lister_hotes) ou un
+    nom de machine (résolu au moment du scan). Lève ReseauInvalideError si une
+    notation réseau est invalide, si la liste est vide ou si elle dépasse
+    'max_hotes' hôtes (contrôlé avant de développer chaque réseau)."""
+    hotes = []
+    for cible in cibles:
+        cible = cible.strip()
+        if not cible:
+            continue
+        try:
+            ipaddress.ip_address(cible)
+            est_adresse = True
+        except ValueError:
+            est_adresse = "/" in cible
+        if not est_adresse:
+            taille = 1
+        else:
+            try:
+                taille = ipaddress.ip_network(cible, strict=False).num_addresses
+            except ValueError as e:
+                raise ReseauInvalideError(f"Notation réseau invalide : '{cible}' ({e}).") from e
+        if len(hotes) + taille > max_hotes:
+            raise ReseauInvalideError(
+                f"Trop d'hôtes à scanner ({cible} : {taille} adresse(s), maximum {max_hotes} par audit) : "
+                f"découpez la cible en réseaux plus petits.")
+        hotes += _lister_hotes(cible) if est_adresse else [cible]
+    if not hotes:
+        raise ReseauInvalideError("Aucun hôte à scanner.")
+    return list(dict.fromkeys(hotes))
+
+
+class _EtatHote:
+    """Sondes d'un hôte pendant un scan orchestré : délais adaptatifs par adresse,
+    fenêtre de congestion, ports restant à sonder et retransmissions."""
+
+    def __init__(self, hote, cibles, ports, timeout, limite, debit_max):
+        self.hote = hote
+        self.cibles = cibles
+        self.estimateurs = {cible[3]: EstimateurRTT(timeout) for cible in cibles}
+        self.fenetre = FenetreCongestion(limite, initiale=min(FENETRE_INITIALE, limite))
+        self.limiteur = LimiteurDebit(debit_max)
+        # Délai lu au moment de la soumission : il suit les réponses déjà reçues
+        self.a_sonder = ((cible, port, self.estimateurs[cible[3]].timeout(), 1)
+                         for port, cible in itertools.product(ports, cibles))
+        self.relances = collections.deque()
+        self.epuise = False
+        self.actifs = 0
+        self.sondes = 0
+        self.ouverts = set()
+        self.duree = 0.0
+
+    def prochaine(self):
+        """Prochaine sonde (cible, port, delai, tentative) si la fenêtre de l'hôte le permet,
+        retransmissions d'abord ; None sinon."""
+        if self.actifs >= self.fenetre.limite:
+            return None
+        if self.relances:
+            return self.relances.popleft()
+        if self.epuise:
+            return None
+        tache = next(self.a_sonder, None)
+        self.epuise = tache is None
+        return tache
+
+    def termine(self):
+        """Toutes les sondes de l'hôte ont un résultat définitif."""
+        return self.epuise and not self.relances and self.actifs == 0
+
+    def bilan(self):
+        """Résultat de l'hôte pour le rapport."""
+        return {"hote": self.hote, "adresses": [cible[3][0] for cible in self.cibles],
+                "ouverts": sorted(self.ouverts), "sondes": self.sondes, "duree": self.duree, "erreur": None}
+
+
+async def _orchestrer_async(etats, limite):
+    """Sonde les hôtes 'etats' à tour de rôle (une sonde par hôte et par tour) avec au plus
+    'limite' connexions en vol au total et 'fenetre.limite' par hôte."""
+    boucle = asyncio.get_running_loop()
+    debut = time.monotonic()
+    echeances = {}
+    reveil = asyncio.Event()
+    en_vol = 0
+    taches = set()
+    erreurs = []
+
+    async def sonder(etat, tache):
+        (famille, _, _, sockaddr), port, delai, _ = tache
+        if etat.limiteur.intervalle:
+            await etat.limiteur.attendre()
+        try:
+            etat_port, rtt = await _sonder_tcp(boucle, famille, _adresse_port(sockaddr, port), echeances, delai)
+        except OSError as e:
+            etat_port, rtt = _etat_erreur_sonde(e), None
+        if _bilan_sonde(tache, etat_port, rtt, etat.estimateurs[sockaddr], etat.fenetre, etat.relances):
+            etat.sondes += 1
+            if etat_port == "ouvert":
+                etat.ouverts.add(port)
+        elif etat_port == "ressources":
+            # On laisse les connexions en vol se terminer avant de réessayer
+            await asyncio.sleep(TIMEOUT_MIN)
+
+    def fin_sonde(tache_sonde, etat):
+        nonlocal en_vol
+        en_vol -= 1
+        etat.actifs -= 1
+        taches.discard(tache_sonde)
+        if not tache_sonde.cancelled() and tache_sonde.exception() is not None:
+            erreurs.append(tache_sonde.exception())
+        reveil.set()
+
+    # Le balayage des échéances n'a pas de rappel de progression à alimenter
+    estimateurs = [estimateur for etat in etats for estimateur in etat.estimateurs.values()]
+    surveillance = asyncio.ensure_future(_surveiller_echeances(echeances, estimateurs, _Progression(0, None)))
+    file = collections.deque(etats)
+    try:
+        while file and not erreurs:
+            lance = False
+            for _ in range(len(file)):
+                if en_vol >= limite:
+                    break
+                etat = file.popleft()
+                if etat.termine():
+                    etat.duree = time.monotonic() - debut
+                    continue
+                file.append(etat)
+                tache = etat.prochaine()
+                if tache is None:
+                    continue
+                en_vol += 1
+                etat.actifs += 1
+                tache_sonde = boucle.create_task(sonder(etat, tache))
+                taches.add(tache_sonde)
+                tache_sonde.add_done_callback(lambda t, etat=etat: fin_sonde(t, etat))
+                lance = True
+
+            # Nouveau tour tant qu'il reste de la place ; sinon on attend la fin d'une sonde
+            if en_vol and not (lance and en_vol < limite):
+                reveil.clear()
+                await reveil.wait()
+        if erreurs:
+            raise erreurs[0]
+    finally:
+        surveillance.cancel()
+        for tache_sonde in list(taches):
+            tache_sonde.cancel()
+
+
+def _scanner_lot(hotes, ports, timeout, limite, limite_par_hote, debit_max):
+    """(processus du pool) Scanne les hôtes d'un lot dans une même boucle asyncio.
+    Retourne la liste des résultats par hôte (voir _EtatHote.bilan) ; un hôte introuvable
+    figure avec son message d'erreur."""
+    limite = _fenetre_effective(limite)
+    resultats, etats = [], []
+    for hote in hotes:
+        try:
+            cibles = resoudre_cible(hote)
+        except HoteIntrouvableError as e:
+            resultats.append({"hote": hote, "adresses": [], "ouverts": [], "sondes": 0, "duree": 0.0,
+                              "erreur": str(e)})
+            continue
+        etats.append(_EtatHote(hote, cibles, ports, timeout, min(limite_par_hote, limite), debit_max))
+
+    if etats:
+        asyncio.run(_orchestrer_async(etats, limite))
+    return resultats + [etat.bilan() for etat in etats]
+
+
+def scanner_hotes(cibles, ports=PORTS_DEFAUT, timeout=0.5, processus=PROCESSUS_SCAN,
+                  limite_globale=LIMITE_GLOBALE, limite_par_hote=LIMITE_PAR_HOTE,
+                  debit_max=DEBIT_MAX_PAR_HOTE, verbose=False):
+    """Scanne les ports TCP 'ports' (spécification, voir analyser_ports, ou liste d'entiers)
+    de tous les hôtes 'cibles' (IP, réseaux CIDR, noms de machine).
+
+    Les hôtes sont répartis à tour de rôle entre 'processus' processus ; au plus
+    'limite_globale' connexions sont en vol au total et 'limite_par_hote' par hôte,
+    'debit_max' limite les tentatives par seconde et par hôte (0 = illimité).
+    Retourne un rapport {hotes: [{hote, adresses, ouverts, sondes, duree, erreur}]
+    (ordre des cibles), par_port: {port: [hôtes]}, ports, sondes, processus, duree}.
+    Lève ReseauInvalideError / PlagePortsInvalideError si les cibles ou les ports
+    sont invalides ; une erreur imprévue d'une sonde, ou BrokenProcessPool si un
+    processus du pool s'est arrêté brutalement, est journalisée puis propagée."""
+    debut = time.perf_counter()
+    hotes = developper_cibles(cibles)
+    if isinstance(ports, str):
+        liste_ports = analyser_ports(ports)
+    else:
+        liste_ports = sorted(set(ports))
+        if not liste_ports:
+            raise PlagePortsInvalideError("Aucun port à scanner.")
+        _valider_plage(liste_ports[0], liste_ports[-1])
+
+    # Lots répartis à tour de rôle : des hôtes voisins (même sous-réseau) sont scannés
+    # par des processus différents
+    nb_processus = max(1, min(processus, len(hotes)))
+    lots = [hotes[i::nb_processus] for i in range(nb_processus)]
+    limite_lot = max(1, limite_globale // nb_processus)
+    if verbose:
+        print(f"[verbose] {len(hotes)} hôte(s) x {len(liste_ports)} port(s), {nb_processus} processus, "
+              f"{limite_lot} connexion(s) en vol par processus, {limite_par_hote} par hôte")
+
+    arguments = (liste_ports, timeout, limite_lot, limite_par_hote, debit_max)
+    try:
+        if nb_processus == 1:
+            resultats = _scanner_lot(lots[0], *arguments)
+        else:
+            with ProcessPoolExecutor(max_workers=nb_processus) as executor:
+                futures = [executor.submit(_scanner_lot, lot, *arguments) for lot in lots]
+                resultats = [resultat for future in futures for resultat in future.result()]
+    except BrokenProcessPool as e:
+        logger.error(f"SCAN ORCHESTRÉ : un processus du pool s'est arrêté brutalement ({e})")
+        raise
+    except Exception as e:
+        logger.exception(f"SCAN ORCHESTRÉ : échec du scan ({type(e).__name__}: {e})")
+        raise
+
+    # Fusion : ordre des cibles, puis vue par port (hôtes exposant chaque service)
+    ordre = {hote: i for i, hote in enumerate(hotes)}
+    resultats.sort(key=lambda r: ordre[r["hote"]])
+    par_port = {}
+    for resultat in resultats:
+        for port in resultat["ouverts"]:
+            par_port.setdefault(port, []).append(resultat["hote"])
+        if resultat["erreur"]:
+            logger.error(f"SCAN ORCHESTRÉ : {resultat['erreur']}")
+        elif resultat["ouverts"]:
+            logger.info(f"SCAN ORCHESTRÉ : {resultat['hote']} -> {len(resultat['ouverts'])} ouvert(s) "
+                        f"{resultat['ouverts']}")
+
+    rapport = {
+        "hotes": resultats,
+        "par_port": dict(sorted(par_port.items())),
+        "ports": len(liste_ports),
+        "sondes": sum(resultat["sondes"] for resultat in resultats),
+        "processus": nb_processus,
+        "duree": time.perf_counter() - debut,
+    }
+    exposes = sum(1 for resultat in resultats if resultat["ouverts"])
+    if verbose:
+        print(f"[verbose] terminé en {rapport['duree']:.3f}s, {rapport['sondes']} sonde(s), "
+              f"{rapport['sondes'] / rapport['duree']:.0f} sondes/s")
+    logger.info(
+        f"SCAN ORCHESTRÉ : {len(hotes)} hôte(s) x {len(liste_ports)} port(s) -> "
+        f"{sum(len(hotes_port) for hotes_port in par_port.values())} port(s) ouvert(s) sur {exposes} hôte(s) "
+        f"en {rapport['duree']:.3f}s ({nb_processus} processus)"
+    )
+    return rapport
+
+
+# ---------------------------------------------------------------------------
+# Fonction interactive appelée depuis le menu (saisie + affichage)
+# ---------------------------------------------------------------------------
+
+def _avertissement():
+    """Affiche le rappel légal du sujet avant tout scan."""
+    print("\n⚠ Rappel : un scan de ports n'est autorisé que sur des réseaux/machines")
+    print("  dont vous avez la permission explicite (par défaut : 127.0.0.1).")
+
+
+def _afficher_rapport(rapport):
+    """Affiche les ports ouverts par hôte, puis les services exposés sur l'ensemble des hôtes."""
+    print(f"\n{len(rapport['hotes'])} hôte(s) scanné(s) :")
+    print("-" * 70)
+    print(f"{'Hôte':<30} | Ports ouverts")
+    print("-" * 70)
+    for resultat in rapport["hotes"]:
+        if resultat["erreur"]:
+            detail = f"ERREUR : {resultat['erreur']}"
+        else:
+            detail = ", ".join(str(port) for port in resultat["ouverts"]) or "aucun"
+        print(f"{resultat['hote']:<30} | {detail}")
+    print("-" * 70)
+
+    if not rapport["par_port"]:
+        print("\nAucun port ouvert détecté.")
+        return
+    print(f"\n{len(rapport['par_port'])} service(s) exposé(s) :")
+    print("-" * 50)
+    print(f"{'Port':<8} | {'Service':<20} | Hôtes")
+    print("-" * 50)
+    for port, hotes in rapport["par_port"].items():
+        print(f"{port:<8} | {nom_service(port):<20} | {len(hotes)}")
+    print("-" * 50)
+
+
+def action_scan_multi_hotes():
+    """Audit de plusieurs hôtes / réseaux : cibles, ports, puis rapport fusionné."""
+    print("\n--- AUDIT MULTI-HÔTES (TCP) ---")
+    _avertissement()
+    print("Exemples : 127.0.0.1, 192.168.1.0/24, srv-paris-01 (séparés par des virgules)")
+    cibles = input("Hôtes / réseaux à scanner [127.0.0.1] : ").strip() or "127.0.0.1"
+    print("Exemples : 22,80,443 / 1-1024 / top100 / top20,8000-8100")
+    ports = input(f"Ports à scanner [{PORTS_DEFAUT}] : ").strip() or PORTS_DEFAUT
+
+    try:
+        hotes = developper_cibles(cibles.split(","))
+        nb_ports = len(analyser_ports(ports))
+        print(f"\nScan de {len(hotes)} hôte(s) x {nb_ports} port(s) en cours...")
+        rapport = scanner_hotes(hotes, ports, verbose=True)
+    except (ReseauInvalideError, PlagePortsInvalideError) as e:
+        print(f"\nErreur : {e}")
+        return
+    except KeyboardInterrupt:
+        print("\nScan interrompu par l'utilisateur.")
+        return
+    except BrokenProcessPool:
+        # Déjà journalisé par scanner_hotes
+        print("\nErreur : un processus de scan s'est arrêté brutalement, scan abandonné (voir operations.log).")
+        return
+    except Exception as e:
+        # Erreur imprévue d'une sonde, propagée par la boucle d'un processus (déjà journalisée)
+        print(f"\nErreur pendant le scan ({type(e).__name__}: {e}), scan abandonné (voir operations.log).")
+        return
+
+    _afficher_rapport(rapport)
+    print(f"\nTemps d'exécution : {rapport['duree']:.3f} seconde(s).")
@@ -1,10 +1,23 @@
+import os
 import socket
 import time
+import errno
+import asyncio
 import logging
 import ipaddress
+import queue
+import itertools
+import collections
+import threading
 from concurrent.futures import ThreadPoolExecutor
 
-from exceptions_reseau import PlagePortsInvalideError
+try:
+    import resource
+except ImportError:
+    # Windows : pas de limite de descripteurs à consulter
+    resource = None
+
+from exceptions_reseau import PlagePortsInvalideError, HoteIntrouvableError
 
 # Logger du module, rattaché à la configuration définie dans main.py (operations.log)
 logger = logging.getLogger(__name__)
@@ -12,6 +25,35 @@ logger = logging.getLogger(__name__)
 # Cible par défaut : la machine locale (scan autorisé sans risque légal)
 HOTE_DEFAUT = "127.0.0.1"
 
+# Moteur asyncio : nombre maximal de connexions TCP en vol (borné par la limite de descripteurs)
+FENETRE_ASYNC = 1024
+
+# Moteur asyncio : tentatives de connexion par seconde et par hôte (0 = pas de limite)
+DEBIT_MAX_PAR_HOTE = 0
+
+# Bornes du délai d'attente adaptatif (secondes) : le délai demandé (timeout=) sert
+# jusqu'aux premières réponses, puis il suit le temps de réponse mesuré de l'hôte
+TIMEOUT_MIN = 0.05
+TIMEOUT_MAX = 3.0
+
+# Délai minimal en UDP : un service y répond après traitement applicatif, pas dès l'aller-retour réseau
+TIMEOUT_MIN_UDP = 0.25
+
+# Tentatives par port TCP : une sonde restée sans réponse est renvoyée, avec un délai doublé
+TENTATIVES_TCP = 2
+
+# Fenêtre de congestion initiale (sondes en vol), élargie ensuite au fil des réponses
+FENETRE_INITIALE = 64
+
+# Erreurs signalant l'épuisement de ressources locales (descripteurs, tampons, ports éphémères)
+_ERREURS_RESSOURCES = (errno.EMFILE, errno.ENFILE, errno.ENOBUFS, errno.EAGAIN, errno.EADDRNOTAVAIL)
+
+# Période des événements de progression (débit, temps restant) pendant un scan (secondes)
+INTERVALLE_PROGRESSION = 1.0
+
+# Tâches soumises au pool de threads entre deux relevés de résultats
+_LOT_SOUMISSION = 256
+
 # Ports des protocoles bien connus (IANA well-known + services répandus),
 # utilisés pour enrichir l'affichage des résultats de scan.
 SERVICES_CONNUS = {
@@ -122,23 +164,317 @@ def _log_echec_pool(prefixe, workers, exc, verbose):
     logger.error(f"{prefixe} : {msg}")
 
 
-def scanner_un_port(hote, port, timeout=0.5):
+def resoudre_cible(hote, type_sock=socket.SOCK_STREAM):
+    """Résout l'hôte une seule fois pour tout un scan.
+
+    getaddrinfo choisit automatiquement la bonne famille d'adresse (AF_INET
+    pour l'IPv4, AF_INET6 pour l'IPv6), ce qui rend le scan compatible IPv6
+    aussi bien pour une IP littérale (ex : ::1) que pour un nom de machine.
+    Retourne la liste des adresses distinctes [(famille, type, proto, sockaddr)]
+    dans l'ordre de préférence du système ; le port de 'sockaddr' est complété
+    par _adresse_port. Lève HoteIntrouvableError si la résolution échoue."""
+    try:
+        infos = socket.getaddrinfo(hote, 0, type=type_sock)
+    except (socket.gaierror, UnicodeError) as e:
+        raise HoteIntrouvableError(f"Hôte introuvable : '{hote}' ({e}).") from e
+
+    cibles, vues = [], set()
+    for famille, type_cible, proto, _, sockaddr in infos:
+        # Une même adresse peut revenir plusieurs fois (un résultat par protocole)
+        cle = (sockaddr[0], *sockaddr[2:])
+        if cle not in vues:
+            vues.add(cle)
+            cibles.append((famille, type_cible, proto, sockaddr))
+    return cibles
+
+
+def _adresse_port(sockaddr, port):
+    """Adresse de connexion vers 'port' à partir du gabarit résolu (IPv4 : (ip, port),
+    IPv6 : (ip, port, flowinfo, scope_id))."""
+    return (sockaddr[0], port, *sockaddr[2:])
+
+
+def _decrire_cibles(cibles):
+    """Adresses résolues sous forme lisible pour l'affichage et le journal."""
+    return ", ".join(sockaddr[0] for _, _, _, sockaddr in cibles)
+
+
+# ---------------------------------------------------------------------------
+# Temporisation adaptative et contrôle de congestion (tous les moteurs)
+# ---------------------------------------------------------------------------
+
+class EstimateurRTT:
+    """Délai d'attente adaptatif d'une adresse à partir des temps de réponse mesurés
+    (méthode de TCP, RFC 6298) : une connexion acceptée (SYN-ACK) comme refusée (RST),
+    ou une réponse UDP / ICMP, fournit un échantillon. Le délai vaut srtt + 4 x rttvar,
+    borné entre 'minimum' et TIMEOUT_MAX ; le délai demandé au scan n'est utilisé
+    que tant qu'aucun échantillon n'est disponible. Réduit le délai sur un réseau
+    local rapide, l'allonge vers un site distant lent (au lieu de le déclarer fermé)."""
+
+    def __init__(self, timeout_initial, minimum=TIMEOUT_MIN):
+        self.minimum = minimum
+        self.timeout_initial = min(TIMEOUT_MAX, max(minimum, timeout_initial))
+        self.srtt = None
+        self.rttvar = None
+
+    def echantillon(self, rtt):
+        """Intègre un temps de réponse mesuré (secondes)."""
+        if self.srtt is None:
+            self.srtt, self.rttvar = rtt, rtt / 2
+        else:
+            self.rttvar = 0.75 * self.rttvar + 0.25 * abs(self.srtt - rtt)
+            self.srtt = 0.875 * self.srtt + 0.125 * rtt
+
+    def timeout(self):
+        """Délai d'attente à appliquer à la prochaine sonde."""
+        if self.srtt is None:
+            return self.timeout_initial
+        return min(TIMEOUT_MAX, max(self.minimum, self.srtt + 4 * self.rttvar))
+
+
+class FenetreCongestion:
+    """Nombre de sondes autorisées en vol vers un hôte, ajusté comme la fenêtre de
+    congestion de TCP (AIMD) : démarrage lent (+1 par sonde aboutie) jusqu'au seuil, puis
+    croissance additive (+1 par fenêtre de sondes) ; division par deux en cas de perte
+    (sonde restée sans réponse mais dont la retransmission a abouti) ou de ressources
+    système épuisées. Utilisée depuis un seul thread (boucle asyncio ou thread qui
+    collecte les résultats du pool) : aucun verrou nécessaire."""
+
+    def __init__(self, maximum, initiale=FENETRE_INITIALE):
+        self.maximum = maximum
+        self.cwnd = float(min(initiale, maximum))
+        self.seuil = float(maximum)
+        self.derniere_reduction = 0.0
+
+    @property
+    def limite(self):
+        """Nombre entier de sondes autorisées en vol (au moins une)."""
+        return max(1, int(self.cwnd))
+
+    def succes(self):
+        """Une sonde a abouti sans signe de perte."""
+        if self.cwnd < self.seuil:
+            self.cwnd += 1
+        else:
+            self.cwnd += 1 / self.cwnd
+        self.cwnd = min(self.cwnd, self.maximum)
+
+    def perte(self, delai):
+        """Réduction multiplicative, au plus une fois par 'delai' (délai d'attente courant) :
+        les pertes d'une même rafale ne comptent qu'une fois."""
+        maintenant = time.monotonic()
+        if maintenant - self.derniere_reduction < delai:
+            return
+        self.derniere_reduction = maintenant
+        self.seuil = max(1.0, self.cwnd / 2)
+        self.cwnd = self.seuil
+
+
+class LimiteurDebit:
+    """Espace régulièrement les tentatives vers un hôte (au plus 'debit_max' par seconde).
+    Prévu pour une seule boucle asyncio : aucun verrou nécessaire."""
+
+    def __init__(self, debit_max):
+        self.intervalle = 1 / debit_max if debit_max else 0.0
+        self.prochain = 0.0
+
+    async def attendre(self):
+        """Attend le prochain créneau disponible (retour immédiat si pas de limite)."""
+        if not self.intervalle:
+            return
+        maintenant = time.monotonic()
+        attente = self.prochain - maintenant
+        self.prochain = max(self.prochain, maintenant) + self.intervalle
+        if attente > 0:
+            await asyncio.sleep(attente)
+
+
+class _Progression:
+    """Compte les tests effectués et transmet périodiquement à 'rappel' un événement
+    {"type": "progression", testes, total, ouverts, debit (tests/s), eta (s ou None)}."""
+
+    def __init__(self, total, rappel, intervalle=INTERVALLE_PROGRESSION):
+        self.total = total
+        self.rappel = rappel
+        self.intervalle = intervalle
+        self.testes = 0
+        self.ouverts = 0
+        self.debut = time.monotonic()
+        self.prochaine = self.debut + intervalle
+
+    def publier_si_du(self):
+        """Publie un événement si la période est écoulée (appelé après chaque test et
+        régulièrement pendant les attentes)."""
+        maintenant = time.monotonic()
+        if self.rappel and maintenant >= self.prochaine:
+            self.prochaine = maintenant + self.intervalle
+            debit = self.testes / (maintenant - self.debut)
+            self.rappel({
+                "type": "progression",
+                "testes": self.testes,
+                "total": self.total,
+                "ouverts": self.ouverts,
+                "debit": debit,
+                "eta": (self.total - self.testes) / debit if debit else None,
+            })
+
+
+def _signaler_port(rappel, port, statut, progression):
+    """Transmet à 'rappel' un port dès qu'il est confirmé : {"type": "port", port, statut}."""
+    progression.ouverts += 1
+    if rappel:
+        rappel({"type": "port", "port": port, "statut": statut})
+
+
+def _executer_en_flux(executor, fonction, taches, fenetre, progression, arret, relances=None):
+    """Exécute fonction(*tache) pour chaque tâche sur 'executor' avec au plus 'fenetre.limite'
+    tâches soumises à la fois (FenetreCongestion), et produit (tache, resultat) dans l'ordre
+    de fin d'exécution : un port filtré lent ne retarde pas les résultats suivants.
+
+    'relances' (deque) : tâches à soumettre en priorité, que l'appelant peut alimenter
+    pendant l'itération (retransmissions). Les progressions sont publiées même si aucune
+    tâche ne se termine. Dès que 'arret' (threading.Event) est positionné, plus rien
+    n'est soumis et les tâches non démarrées sont annulées ; celles en cours se
+    terminent (au plus un timeout)."""
+    a_soumettre = iter(taches)
+    relances = relances if relances is not None else collections.deque()
+    en_vol = {}
+    termines = queue.SimpleQueue()
+    epuise = False
+    try:
+        while True:
+            if arret is not None and arret.is_set() and not epuise:
+                epuise = True
+                relances.clear()
+                for futur in en_vol:
+                    futur.cancel()
+
+            # Soumission par lots : les résultats déjà disponibles sont traités entre deux lots
+            # (soumettre des dizaines de milliers de tâches d'un coup prend plusieurs secondes)
+            for _ in range(_LOT_SOUMISSION):
+                if len(en_vol) >= fenetre.limite:
+                    break
+                if relances:
+                    tache = relances.popleft()
+                elif epuise or (tache := next(a_soumettre, None)) is None:
+                    epuise = True
+                    break
+                futur = executor.submit(fonction, *tache)
+                en_vol[futur] = tache
+                futur.add_done_callback(termines.put)
+            if not en_vol:
+                if relances:
+                    continue
+                return
+
+            # On ne bloque que si plus rien ne peut être soumis
+            try:
+                if (epuise and not relances) or len(en_vol) >= fenetre.limite:
+                    disponibles = [termines.get(timeout=progression.intervalle)]
+                else:
+                    disponibles = [termines.get_nowait()]
+            except queue.Empty:
+                progression.publier_si_du()
+                continue
+            while True:
+                try:
+                    disponibles.append(termines.get_nowait())
+                except queue.Empty:
+                    break
+
+            for futur in disponibles:
+                tache = en_vol.pop(futur)
+                if not futur.cancelled():
+                    yield tache, futur.result()
+            progression.publier_si_du()
+    finally:
+        # Sortie anticipée (exception, générateur fermé) : on n'attend pas les tâches restantes
+        for futur in en_vol:
+            futur.cancel()
+
+
+def _etat_erreur_sonde(erreur):
+    """État d'une sonde TCP ayant échoué sur une OSError locale : 'ressources' (sonde à
+    refaire) si le système manque de ressources, 'filtré' sinon (erreur propre à la sonde)."""
+    return "ressources" if erreur.errno in _ERREURS_RESSOURCES else "filtré"
+
+
+def _sonder_tcp_bloquant(cible, port, timeout):
+    """Tente une connexion TCP bloquante (moteurs à threads) vers l'adresse résolue 'cible'.
+    Retourne (etat, rtt) : etat 'ouvert', 'fermé' (RST reçu), 'filtré' (pas de réponse
+    dans le délai, hôte injoignable) ou 'ressources' (ressources locales épuisées, la sonde
+    est à refaire) ; rtt vaut None sans réponse."""
+    famille, type_sock, proto, sockaddr = cible
+    try:
+        sock = socket.socket(famille, type_sock, proto)
+    except OSError as e:
+        etat = _etat_erreur_sonde(e)
+        if etat != "ressources":
+            # Ex : famille d'adresses non prise en charge (EAFNOSUPPORT) : seule cette sonde échoue
+            logger.error(f"SCAN PORTS : socket impossible vers {sockaddr[0]}:{port} ({e})")
+        return etat, None
+    with sock:
+        sock.settimeout(timeout)
+        debut = time.monotonic()
+        try:
+            sock.connect(_adresse_port(sockaddr, port))
+        except socket.timeout:
+            return "filtré", None
+        except ConnectionRefusedError:
+            return "fermé", time.monotonic() - debut
+        except OSError as e:
+            return _etat_erreur_sonde(e), None
+        rtt = time.monotonic() - debut
+        # Sur la boucle locale, un port éphémère peut se connecter à lui-même (voir _sonder_tcp)
+        if sock.getsockname() == sock.getpeername():
+            return "fermé", rtt
+        return "ouvert", rtt
+
+
+def _bilan_sonde(tache, etat, rtt, estimateur, fenetre, relances, tentatives=TENTATIVES_TCP):
+    """Met à jour délai et fenêtre d'après le résultat d'une sonde (cible, port, delai, tentative).
+    Retourne True si le résultat est définitif, False si la sonde a été remise dans
+    'relances' (ressources épuisées, ou pas de réponse et tentatives restantes)."""
+    cible, port, delai, tentative = tache
+    if etat == "ressources":
+        fenetre.perte(delai)
+        relances.append(tache)
+        return False
+    if rtt is not None:
+        estimateur.echantillon(rtt)
+        if tentative > 1:
+            # La première sonde s'est perdue : le réseau ou l'hôte sature
+            fenetre.perte(delai)
+            return True
+    elif tentative < tentatives:
+        relances.append((cible, port, min(TIMEOUT_MAX, 2 * delai), tentative + 1))
+        return False
+    # Résultat définitif sans signe de perte (un port filtré reste muet à chaque essai) :
+    # la fenêtre s'ouvre, sinon un hôte filtré serait scanné à FENETRE_INITIALE sondes en vol
+    fenetre.succes()
+    return True
+
+
+def _log_temporisation(estimateurs, fenetre):
+    """(verbose) Affiche le délai adaptatif atteint par adresse et la fenêtre de congestion finale."""
+    delais = ", ".join(f"{sockaddr[0]} {1000 * e.timeout():.0f} ms" for sockaddr, e in estimateurs.items())
+    print(f"[verbose] délai(s) final(aux) : {delais} ; fenêtre de congestion : {fenetre.limite}")
+
+
+def scanner_un_port(hote, port, timeout=0.5, cible=None):
     """Teste un port TCP unique. Retourne True si le port est ouvert, False sinon.
 
     On utilise connect_ex() qui renvoie 0 en cas de succès (port ouvert)
     au lieu de lever une exception, ce qui simplifie le scan de masse.
 
-    getaddrinfo choisit automatiquement la bonne famille d'adresse (AF_INET
-    pour l'IPv4, AF_INET6 pour l'IPv6), ce qui rend le scan compatible IPv6
-    aussi bien pour une IP littérale (ex : ::1) que pour un nom de machine."""
+    'cible' : adresse déjà résolue (un élément de resoudre_cible) ; les scans de
+    plage la fournissent pour ne pas interroger le résolveur à chaque port. À
+    défaut, l'hôte est résolu et sa première adresse utilisée."""
     try:
-        # On récupère la famille/protocole adaptés à l'hôte (IPv4 ou IPv6)
-        famille, type_sock, proto, _, adresse = socket.getaddrinfo(
-            hote, port, type=socket.SOCK_STREAM
-        )[0]
+        famille, type_sock, proto, sockaddr = cible or resoudre_cible(hote)[0]
         with socket.socket(famille, type_sock, proto) as sock:
             sock.settimeout(timeout)
-            resultat = sock.connect_ex(adresse)
+            resultat = sock.connect_ex(_adresse_port(sockaddr, port))
             return resultat == 0
     except Exception as e:
         # Erreur de résolution, hôte injoignable, etc. : le port est considéré fermé
@@ -167,93 +503,337 @@ def scanner_plage_sequentiel(hote, port_debut, port_fin, timeout=0.5):
     Lève PlagePortsInvalideError si la plage est invalide."""
     _valider_plage(port_debut, port_fin)
     debut = time.perf_counter()
+    cibles = resoudre_cible(hote)
     ports_ouverts = []
 
     for port in range(port_debut, port_fin + 1):
-        if scanner_un_port(hote, port, timeout):
+        # Ouvert si au moins une des adresses de l'hôte accepte la connexion
+        if any(scanner_un_port(hote, port, timeout, cible) for cible in cibles):
             ports_ouverts.append(port)
 
     duree = time.perf_counter() - debut
     logger.info(
-        f"SCAN PORTS SÉQUENTIEL : {hote} [{port_debut}-{port_fin}] -> "
+        f"SCAN PORTS SÉQUENTIEL : {hote} ({_decrire_cibles(cibles)}) [{port_debut}-{port_fin}] -> "
         f"{len(ports_ouverts)} ouvert(s) {ports_ouverts} en {duree:.3f}s"
     )
     return ports_ouverts, duree
 
 
-def scanner_plage_threads(hote, port_debut, port_fin, timeout=0.5, max_workers=32768, verbose=False):
+def scanner_plage_threads(hote, port_debut, port_fin, timeout=0.5, max_workers=32768, verbose=False,
+                          rappel=None, arret=None):
     """Scanne une plage de ports AVEC threads (ThreadPoolExecutor, bibliothèque standard).
 
     Retourne un tuple (liste_ports_ouverts, duree_en_secondes).
-    Lève PlagePortsInvalideError si la plage est invalide.
-
+    Lève PlagePortsInvalideError si la plage est invalide, HoteIntrouvableError
+    si l'hôte ne peut pas être résolu.
+
+    L'hôte est résolu une seule fois ; s'il a plusieurs adresses (ex : IPv4 et
+    IPv6), chaque port est testé sur chacune et compté ouvert si l'une l'accepte.
+    'timeout' est le délai initial : il s'adapte ensuite au temps de réponse mesuré
+    de chaque adresse (EstimateurRTT), une sonde sans réponse est renvoyée une fois
+    avec un délai doublé et le nombre de sondes en vol suit FenetreCongestion.
+    Les résultats sont traités dans l'ordre où les tests se terminent : 'rappel'
+    reçoit chaque port ouvert dès sa confirmation et des événements de progression
+    (voir _Progression). Positionner 'arret' (threading.Event) interrompt le scan,
+    qui retourne alors les ports déjà trouvés.
     verbose=True affiche le dimensionnement du pool, une progression régulière et
     signale explicitement un échec de création de threads (max_workers trop élevé)."""
     _valider_plage(port_debut, port_fin)
     debut = time.perf_counter()
-    ports = list(range(port_debut, port_fin + 1))
-
-    # Inutile d'allouer plus de threads que de ports à tester
-    workers = min(max_workers, len(ports)) or 1
-    _log_dimension_pool("TCP", len(ports), max_workers, workers, verbose)
-
-    ports_ouverts = []
+    cibles = resoudre_cible(hote)
+    nb_tests = (port_fin - port_debut + 1) * len(cibles)
+    if verbose:
+        print(f"[verbose] {hote} résolu en : {_decrire_cibles(cibles)}")
+
+    # Inutile d'allouer plus de threads que de tests à effectuer
+    workers = min(max_workers, nb_tests) or 1
+    _log_dimension_pool("TCP", nb_tests, max_workers, workers, verbose)
+
+    progression = _Progression(nb_tests, rappel)
+    estimateurs = {cible[3]: EstimateurRTT(timeout) for cible in cibles}
+    # Deux tâches par thread au plus suffisent à les occuper
+    fenetre = FenetreCongestion(2 * workers)
+    relances = collections.deque()
+    ports_ouverts = set()
     try:
         with ThreadPoolExecutor(max_workers=workers) as executor:
             if verbose:
                 print(f"[verbose] pool créé ({workers} workers), scan en cours...")
-            resultats = {port: executor.submit(scanner_un_port, hote, port, timeout)
-                         for port in ports}
-
-            traites = 0
-            for port, futur in resultats.items():
-                traites += 1
-                if futur.result():
-                    ports_ouverts.append(port)
-                if verbose and traites % 5000 == 0:
-                    print(f"[verbose] {traites}/{len(ports)} ports testés, "
+            # Délai calculé à la soumission de chaque sonde : il suit les mesures déjà faites
+            taches = ((cible, port, estimateurs[cible[3]].timeout(), 1)
+                      for port, cible in itertools.product(range(port_debut, port_fin + 1), cibles))
+
+            def sonder(cible, port, delai, tentative):
+                return _sonder_tcp_bloquant(cible, port, delai)
+
+            for tache, (etat, rtt) in _executer_en_flux(executor, sonder, taches, fenetre,
+                                                        progression, arret, relances):
+                cible, port = tache[:2]
+                if not _bilan_sonde(tache, etat, rtt, estimateurs[cible[3]], fenetre, relances):
+                    continue
+                progression.testes += 1
+                if etat == "ouvert" and port not in ports_ouverts:
+                    ports_ouverts.add(port)
+                    _signaler_port(rappel, port, "ouvert", progression)
+                if verbose and progression.testes % 5000 == 0:
+                    print(f"[verbose] {progression.testes}/{nb_tests} tests effectués, "
                           f"{len(ports_ouverts)} ouvert(s)")
     except (RuntimeError, MemoryError, OSError) as e:
         _log_echec_pool("SCAN PORTS", workers, e, verbose)
         raise
 
-    ports_ouverts.sort()
+    ports_ouverts = sorted(ports_ouverts)
+    duree = time.perf_counter() - debut
+    interrompu = " (interrompu)" if arret is not None and arret.is_set() else ""
+    if verbose:
+        print(f"[verbose] terminé{interrompu} en {duree:.3f}s, {len(ports_ouverts)} ouvert(s)")
+        _log_temporisation(estimateurs, fenetre)
+    logger.info(
+        f"SCAN PORTS THREADS{interrompu} : {hote} ({_decrire_cibles(cibles)}) [{port_debut}-{port_fin}] -> "
+        f"{len(ports_ouverts)} ouvert(s) {ports_ouverts} en {duree:.3f}s"
+    )
+    return ports_ouverts, duree
+
+
+# ---------------------------------------------------------------------------
+# Moteur asyncio : un seul thread, connexions non bloquantes
+# ---------------------------------------------------------------------------
+
+def _fenetre_effective(fenetre):
+    """Borne la fenêtre de connexions à la limite de descripteurs du processus (marge de 64)."""
+    if resource is None:
+        return fenetre
+    souple, _ = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if souple == resource.RLIM_INFINITY:
+        return fenetre
+    return max(1, min(fenetre, souple - 64))
+
+
+def _signaler(attente, expiree=False):
+    """Termine l'attente d'une sonde : False quand le descripteur est prêt (rappel du
+    sélecteur, qui peut le signaler plusieurs fois avant la reprise de la sonde), True
+    quand son échéance est dépassée (_surveiller_echeances)."""
+    if not attente.done():
+        attente.set_result(expiree)
+
+
+async def _sonder_tcp(boucle, famille, adresse, echeances, timeout):
+    """Tente une connexion TCP non bloquante. Retourne (etat, rtt) avec etat 'ouvert',
+    'fermé' (RST reçu) ou 'filtré' (pas de réponse) ; rtt vaut None sans réponse.
+    Lève OSError si le système manque de ressources (descripteurs, tampons, ports locaux).
+
+    connect_ex() puis attente de la fin de connexion (descripteur prêt en écriture).
+    L'attente est inscrite dans 'echeances' {future: échéance}, terminée par _surveiller_echeances :
+    pas de tâche ni de minuterie par sonde (asyncio.wait_for en crée une de chaque)."""
+    sock = socket.socket(famille, socket.SOCK_STREAM)
+    try:
+        sock.setblocking(False)
+        debut = time.monotonic()
+        code = sock.connect_ex(adresse)
+        if code in (errno.EINPROGRESS, errno.EWOULDBLOCK):
+            fd = sock.fileno()
+            attente = boucle.create_future()
+            boucle.add_writer(fd, _signaler, attente)
+            echeances[attente] = debut + timeout
+            try:
+                # L'échéance termine l'attente sans l'annuler : une CancelledError ne peut
+                # donc venir que de l'annulation du scan lui-même, et se propage
+                expiree = await attente
+            finally:
+                del echeances[attente]
+                boucle.remove_writer(fd)
+            if expiree:
+                return "filtré", None
+            code = sock.getsockopt(socket.SOL_SOCKET, socket.SO_ERROR)
+        rtt = time.monotonic() - debut
+
+        if code == 0:
+            # Sur la boucle locale, un port éphémère peut se connecter à lui-même (ouverture
+            # simultanée) : ce n'est pas un service à l'écoute
+            if sock.getsockname() == sock.getpeername():
+                return "fermé", rtt
+            return "ouvert", rtt
+        if code == errno.ECONNREFUSED:
+            return "fermé", rtt
+        if code in _ERREURS_RESSOURCES:
+            raise OSError(code, os.strerror(code))
+        # Hôte/réseau injoignable, etc. : le port est considéré filtré
+        return "filtré", None
+    finally:
+        sock.close()
+
+
+async def _surveiller_echeances(echeances, estimateurs, progression):
+    """Termine les connexions en attente dont l'échéance est dépassée (un balayage toutes
+    les quelques dizaines de millisecondes, au quart du plus court délai courant) et publie
+    la progression même quand aucune sonde ne se termine."""
+    while True:
+        await asyncio.sleep(max(TIMEOUT_MIN, min(e.timeout() for e in estimateurs)) / 4)
+        maintenant = time.monotonic()
+        for attente, echeance in list(echeances.items()):
+            if echeance <= maintenant:
+                _signaler(attente, expiree=True)
+        progression.publier_si_du()
+
+
+async def _scanner_ports_async(cibles, ports, estimateurs, congestion, limiteur, progression, rappel, arret):
+    """Scanne 'ports' (itérable) sur chacune des adresses résolues 'cibles' avec au plus
+    'congestion.limite' connexions en vol. Retourne la liste triée des ports ouverts sur au
+    moins une adresse ; 'rappel' et 'arret' comme pour scanner_plage_threads."""
+    boucle = asyncio.get_running_loop()
+    echeances = {}
+    a_sonder = ((cible, port, estimateurs[cible[3]].timeout(), 1)
+                for port, cible in itertools.product(ports, cibles))
+    relances = collections.deque()
+    ouverts = set()
+
+    # Sondeurs élastiques : autant de sondeurs que la fenêtre de congestion autorise de
+    # connexions en vol. Un sondeur en lance d'autres quand la fenêtre s'ouvre et se retire
+    # quand elle se referme (aucune tâche par port, aucune attente de place)
+    actifs = 0
+    sondeurs = set()
+    termine = boucle.create_future()
+
+    def lancer():
+        nonlocal actifs
+        while actifs < congestion.limite:
+            actifs += 1
+            tache_sondeur = boucle.create_task(sondeur())
+            sondeurs.add(tache_sondeur)
+            tache_sondeur.add_done_callback(fin_sondeur)
+
+    def fin_sondeur(tache_sondeur):
+        sondeurs.discard(tache_sondeur)
+        if termine.done():
+            return
+        if not tache_sondeur.cancelled() and tache_sondeur.exception() is not None:
+            termine.set_exception(tache_sondeur.exception())
+        elif actifs == 0:
+            termine.set_result(None)
+
+    async def sondeur():
+        nonlocal actifs
+        try:
+            while actifs <= congestion.limite and not (arret is not None and arret.is_set()):
+                # Retransmissions d'abord ; le sondeur qui en ajoute une repasse toujours ici
+                tache = relances.popleft() if relances else next(a_sonder, None)
+                if tache is None:
+                    return
+                (famille, _, _, sockaddr), port, delai, _ = tache
+                if limiteur.intervalle:
+                    await limiteur.attendre()
+                try:
+                    etat, rtt = await _sonder_tcp(boucle, famille, _adresse_port(sockaddr, port),
+                                                  echeances, delai)
+                except OSError as e:
+                    etat, rtt = _etat_erreur_sonde(e), None
+
+                definitif = _bilan_sonde(tache, etat, rtt, estimateurs[sockaddr], congestion, relances)
+                if actifs < congestion.limite:
+                    lancer()
+                if not definitif:
+                    if etat == "ressources":
+                        # On laisse les connexions en vol se terminer avant de réessayer
+                        await asyncio.sleep(TIMEOUT_MIN)
+                    continue
+                progression.testes += 1
+                if etat == "ouvert" and port not in ouverts:
+                    ouverts.add(port)
+                    _signaler_port(rappel, port, etat, progression)
+                progression.publier_si_du()
+        finally:
+            actifs -= 1
+
+    surveillance = asyncio.ensure_future(_surveiller_echeances(echeances, estimateurs.values(), progression))
+    try:
+        lancer()
+        await termine
+    finally:
+        surveillance.cancel()
+        for tache_sondeur in list(sondeurs):
+            tache_sondeur.cancel()
+    return sorted(ouverts)
+
+
+def scanner_plage_async(hote, port_debut, port_fin, timeout=0.5, fenetre=FENETRE_ASYNC,
+                        debit_max=DEBIT_MAX_PAR_HOTE, verbose=False, rappel=None, arret=None):
+    """Scanne une plage de ports TCP avec le moteur asyncio (un seul thread).
+
+    Retourne un tuple (liste_ports_ouverts, duree_en_secondes).
+    Lève PlagePortsInvalideError si la plage est invalide, HoteIntrouvableError
+    si l'hôte ne peut pas être résolu.
+
+    Au plus 'fenetre' connexions non bloquantes sont en vol à la fois (la fenêtre de
+    congestion s'ouvre jusqu'à cette valeur au fil des réponses), 'debit_max' limite
+    le nombre de tentatives par seconde (0 = illimité). 'timeout' est le délai
+    initial, adapté ensuite au temps de réponse mesuré de chaque adresse ; une sonde
+    sans réponse est renvoyée une fois avec un délai doublé.
+    L'hôte est résolu une seule fois ; chacune de ses adresses est scannée.
+    'rappel' reçoit les ports ouverts dès leur confirmation et la progression ;
+    'arret' (threading.Event) interrompt le scan (voir scanner_plage_threads)."""
+    _valider_plage(port_debut, port_fin)
+    debut = time.perf_counter()
+    cibles = resoudre_cible(hote)
+    nb_tests = (port_fin - port_debut + 1) * len(cibles)
+    fenetre = min(_fenetre_effective(fenetre), nb_tests)
+    if verbose:
+        print(f"[verbose] {hote} résolu en : {_decrire_cibles(cibles)}")
+        print(f"[verbose] {nb_tests} test(s) TCP, moteur asyncio : jusqu'à {fenetre} connexion(s) "
+              f"simultanée(s), débit max {debit_max or 'illimité'}/s")
+
+    # Un délai adaptatif par adresse (IPv4 et IPv6 peuvent suivre des chemins différents) ;
+    # une fenêtre et un limiteur pour l'hôte
+    estimateurs = {cible[3]: EstimateurRTT(timeout) for cible in cibles}
+    congestion = FenetreCongestion(fenetre)
+    progression = _Progression(nb_tests, rappel)
+    ports_ouverts = asyncio.run(
+        _scanner_ports_async(cibles, range(port_debut, port_fin + 1), estimateurs, congestion,
+                             LimiteurDebit(debit_max), progression, rappel, arret)
+    )
+
     duree = time.perf_counter() - debut
+    interrompu = " (interrompu)" if arret is not None and arret.is_set() else ""
     if verbose:
-        print(f"[verbose] terminé en {duree:.3f}s, {len(ports_ouverts)} ouvert(s)")
+        print(f"[verbose] terminé{interrompu} en {duree:.3f}s, {len(ports_ouverts)} ouvert(s)")
+        _log_temporisation(estimateurs, congestion)
     logger.info(
-        f"SCAN PORTS THREADS : {hote} [{port_debut}-{port_fin}] -> "
+        f"SCAN PORTS ASYNC{interrompu} : {hote} ({_decrire_cibles(cibles)}) [{port_debut}-{port_fin}] -> "
         f"{len(ports_ouverts)} ouvert(s) {ports_ouverts} en {duree:.3f}s"
     )
     return ports_ouverts, duree
 
 
-def scanner_tous_les_ports(hote, timeout=0.5, max_workers=32768, verbose=False):
-    """Scanne la totalité des ports (1 à 65535) en parallèle via les threads."""
+def scanner_tous_les_ports(hote, timeout=0.5, fenetre=FENETRE_ASYNC, verbose=False, rappel=None, arret=None):
+    """Scanne la totalité des ports (1 à 65535) avec le moteur asyncio."""
     logger.info(f"SCAN COMPLET DÉMARRÉ : {hote} (1-65535)")
-    return scanner_plage_threads(hote, 1, 65535, timeout, max_workers, verbose)
+    return scanner_plage_async(hote, 1, 65535, timeout, fenetre, verbose=verbose, rappel=rappel, arret=arret)
 
 
 def comparer_performances(hote, port_debut, port_fin, timeout=0.5):
-    """Compare le temps d'exécution séquentiel vs threads sur la même plage.
+    """Compare le temps d'exécution séquentiel vs threads vs asyncio sur la même plage.
 
     Répond à la consigne du sujet : mesurer le temps sans thread et avec threads.
-    Retourne un dictionnaire avec les deux durées et le gain."""
+    Retourne un dictionnaire avec les trois durées et les gains par rapport au séquentiel."""
     ports_seq, duree_seq = scanner_plage_sequentiel(hote, port_debut, port_fin, timeout)
     ports_thr, duree_thr = scanner_plage_threads(hote, port_debut, port_fin, timeout)
+    ports_async, duree_async = scanner_plage_async(hote, port_debut, port_fin, timeout)
 
-    # Calcul du gain (évite la division par zéro sur les scans très rapides)
+    # Calcul des gains (évite la division par zéro sur les scans très rapides)
     gain = (duree_seq / duree_thr) if duree_thr > 0 else 0.0
+    gain_async = (duree_seq / duree_async) if duree_async > 0 else 0.0
 
     logger.info(
         f"COMPARAISON PORTS : {hote} [{port_debut}-{port_fin}] -> "
-        f"séquentiel={duree_seq:.3f}s, threads={duree_thr:.3f}s, gain x{gain:.1f}"
+        f"séquentiel={duree_seq:.3f}s, threads={duree_thr:.3f}s, asyncio={duree_async:.3f}s, "
+        f"gain x{gain:.1f} / x{gain_async:.1f}"
     )
     return {
-        "ports_ouverts": ports_thr,
+        "ports_ouverts": ports_async,
         "duree_sequentiel": duree_seq,
         "duree_threads": duree_thr,
+        "duree_async": duree_async,
         "gain": gain,
+        "gain_async": gain_async,
     }
 
 
@@ -261,79 +841,186 @@ def comparer_performances(hote, port_debut, port_fin, timeout=0.5):
 # Scan UDP (le sujet demande de ne pas se limiter au TCP)
 # ---------------------------------------------------------------------------
 
-def scanner_un_port_udp(hote, port, timeout=1.0):
+# Statut UDP retenu pour un port testé sur plusieurs adresses : le plus informatif
+_PRIORITE_UDP = {"ouvert": 0, "ouvert|filtré": 1, "fermé": 2, "erreur": 3}
+
+
+def scanner_un_port_udp(hote, port, timeout=1.0, cible=None):
     """Teste un port UDP unique. Compatible IPv4 et IPv6 via getaddrinfo.
 
     UDP est un protocole sans connexion : l'interprétation diffère du TCP.
       - une réponse reçue          -> 'ouvert'
       - une erreur ICMP            -> 'fermé' (port unreachable)
       - aucune réponse (timeout)   -> 'ouvert|filtré' (indéterminé, propre à UDP)
-    Retourne l'une de ces chaînes de statut ('erreur' en cas d'échec technique)."""
+    Retourne l'une de ces chaînes de statut ('erreur' en cas d'échec technique).
+    'cible' : adresse déjà résolue (resoudre_cible(hote, socket.SOCK_DGRAM)), comme
+    pour scanner_un_port."""
     try:
-        famille, type_sock, proto, _, adresse = socket.getaddrinfo(
-            hote, port, type=socket.SOCK_DGRAM
-        )[0]
-        with socket.socket(famille, type_sock, proto) as sock:
-            sock.settimeout(timeout)
-            # Datagramme vide : on cherche seulement à provoquer une réaction
-            sock.sendto(b"", adresse)
-            try:
-                sock.recvfrom(1024)
-                return "ouvert"          # le service a répondu
-            except socket.timeout:
-                return "ouvert|filtré"   # silence : impossible de trancher en UDP
-            except OSError:
-                return "fermé"           # ICMP port unreachable reçu
+        statut, _ = _sonder_udp_bloquant(cible or resoudre_cible(hote, socket.SOCK_DGRAM)[0], port, timeout)
     except Exception as e:
         logger.error(f"SCAN UDP : erreur sur {hote}:{port} ({e})")
         return "erreur"
+    return "erreur" if statut == "ressources" else statut
 
 
-def scanner_plage_udp_threads(hote, port_debut, port_fin, timeout=1.0, max_workers=32768, verbose=False):
+def _sonder_udp_bloquant(cible, port, timeout):
+    """Sonde UDP vers l'adresse résolue 'cible' (voir scanner_un_port_udp). Retourne
+    (statut, rtt) ; statut 'ressources' si les ressources locales sont épuisées (sonde
+    à refaire) ; rtt mesuré pour une réponse ou une erreur ICMP, None sinon."""
+    famille, type_sock, proto, sockaddr = cible
+    try:
+        sock = socket.socket(famille, type_sock, proto)
+    except OSError as e:
+        if e.errno in _ERREURS_RESSOURCES:
+            return "ressources", None
+        raise
+    with sock:
+        sock.settimeout(timeout)
+        debut = time.monotonic()
+        try:
+            # Datagramme vide : on cherche seulement à provoquer une réaction
+            sock.sendto(b"", _adresse_port(sockaddr, port))
+        except OSError as e:
+            if e.errno in _ERREURS_RESSOURCES:
+                return "ressources", None
+            raise
+        try:
+            sock.recvfrom(1024)
+            return "ouvert", time.monotonic() - debut          # le service a répondu
+        except socket.timeout:
+            return "ouvert|filtré", None                        # silence : impossible de trancher en UDP
+        except OSError:
+            return "fermé", time.monotonic() - debut            # ICMP port unreachable reçu
+
+
+def scanner_plage_udp_threads(hote, port_debut, port_fin, timeout=1.0, max_workers=32768, verbose=False,
+                              rappel=None, arret=None):
     """Scanne une plage de ports UDP AVEC threads.
 
     Retourne (liste de tuples (port, statut) hors 'fermé'/'erreur', duree).
-    Lève PlagePortsInvalideError si la plage est invalide.
+    Lève PlagePortsInvalideError si la plage est invalide, HoteIntrouvableError
+    si l'hôte ne peut pas être résolu.
+    Résolution unique ; un hôte à plusieurs adresses est testé sur chacune et le
+    statut le plus informatif est retenu pour chaque port.
+    'timeout' est le délai initial, adapté ensuite aux réponses et erreurs ICMP
+    mesurées ; le nombre de sondes en vol suit FenetreCongestion. Le silence étant
+    la réponse normale d'un port UDP, une sonde sans réponse n'est pas renvoyée.
+    'rappel' reçoit chaque port non fermé dès que toutes ses adresses ont répondu,
+    et la progression ; 'arret' interrompt le scan (voir scanner_plage_threads).
     verbose=True : dimensionnement du pool, progression et échec de threads détaillés."""
     _valider_plage(port_debut, port_fin)
     debut = time.perf_counter()
-    ports = list(range(port_debut, port_fin + 1))
+    cibles = resoudre_cible(hote, socket.SOCK_DGRAM)
+    nb_tests = (port_fin - port_debut + 1) * len(cibles)
+    if verbose:
+        print(f"[verbose] {hote} résolu en : {_decrire_cibles(cibles)}")
 
-    workers = min(max_workers, len(ports)) or 1
-    _log_dimension_pool("UDP", len(ports), max_workers, workers, verbose)
+    workers = min(max_workers, nb_tests) or 1
+    _log_dimension_pool("UDP", nb_tests, max_workers, workers, verbose)
 
+    progression = _Progression(nb_tests, rappel)
+    estimateurs = {cible[3]: EstimateurRTT(timeout, TIMEOUT_MIN_UDP) for cible in cibles}
+    fenetre = FenetreCongestion(2 * workers)
+    relances = collections.deque()
     resultats = []
+    # Ports dont toutes les adresses n'ont pas encore été testées : (statut retenu, tests restants)
+    en_cours = {}
     try:
         with ThreadPoolExecutor(max_workers=workers) as executor:
             if verbose:
                 print(f"[verbose] pool créé ({workers} workers), scan UDP en cours...")
-            futurs = {port: executor.submit(scanner_un_port_udp, hote, port, timeout)
-                      for port in ports}
-            traites = 0
-            for port, futur in futurs.items():
-                traites += 1
-                statut = futur.result()
+            taches = ((cible, port, estimateurs[cible[3]].timeout(), 1)
+                      for port, cible in itertools.product(range(port_debut, port_fin + 1), cibles))
+
+            def sonder(cible, port, delai, tentative):
+                try:
+                    return _sonder_udp_bloquant(cible, port, delai)
+                except OSError as e:
+                    logger.error(f"SCAN UDP : erreur sur {hote}:{port} ({e})")
+                    return "erreur", None
+
+            for tache, (statut, rtt) in _executer_en_flux(executor, sonder, taches, fenetre,
+                                                          progression, arret, relances):
+                cible, port = tache[:2]
+                if not _bilan_sonde(tache, statut, rtt, estimateurs[cible[3]], fenetre, relances,
+                                    tentatives=1):
+                    continue
+                progression.testes += 1
+                retenu, restants = en_cours.pop(port, ("erreur", len(cibles)))
+                if _PRIORITE_UDP[statut] < _PRIORITE_UDP[retenu]:
+                    retenu = statut
+                if restants > 1:
+                    en_cours[port] = (retenu, restants - 1)
                 # On ignore les ports clairement fermés et les erreurs techniques
-                if statut not in ("fermé", "erreur"):
-                    resultats.append((port, statut))
-                if verbose and traites % 5000 == 0:
-                    print(f"[verbose] {traites}/{len(ports)} ports testés, "
-                          f"{len(resultats)} non fermé(s)")
+                elif retenu not in ("fermé", "erreur"):
+                    resultats.append((port, retenu))
+                    _signaler_port(rappel, port, retenu, progression)
+                if verbose and progression.testes % 5000 == 0:
+                    print(f"[verbose] {progression.testes}/{nb_tests} tests effectués")
     except (RuntimeError, MemoryError, OSError) as e:
         _log_echec_pool("SCAN UDP", workers, e, verbose)
         raise
 
     resultats.sort()
     duree = time.perf_counter() - debut
+    interrompu = " (interrompu)" if arret is not None and arret.is_set() else ""
     if verbose:
-        print(f"[verbose] terminé en {duree:.3f}s, {len(resultats)} non fermé(s)")
+        print(f"[verbose] terminé{interrompu} en {duree:.3f}s, {len(resultats)} non fermé(s)")
+        _log_temporisation(estimateurs, fenetre)
     logger.info(
-        f"SCAN UDP THREADS : {hote} [{port_debut}-{port_fin}] -> "
+        f"SCAN UDP THREADS{interrompu} : {hote} ({_decrire_cibles(cibles)}) [{port_debut}-{port_fin}] -> "
         f"{len(resultats)} port(s) non fermé(s) en {duree:.3f}s"
     )
     return resultats, duree
 
 
+# ---------------------------------------------------------------------------
+# Résultats en flux : générateur au-dessus des moteurs à rappel
+# ---------------------------------------------------------------------------
+
+def scanner_flux(hote, port_debut, port_fin, protocole="tcp", **options):
+    """Générateur : produit les événements d'un scan au fur et à mesure.
+
+      {"type": "port", port, statut}        port ouvert (UDP : ouvert / ouvert|filtré),
+                                            dans l'ordre de confirmation
+      {"type": "progression", testes, total, ouverts, debit, eta}
+      {"type": "fin", resultats, duree, interrompu}   dernier événement
+
+    Le scan (TCP : moteur asyncio, UDP : threads ; 'options' leur est transmis) tourne
+    dans un thread dédié. Fermer le générateur (break, close()) l'interrompt. Les
+    exceptions du scan (PlagePortsInvalideError, HoteIntrouvableError...) sont levées
+    par le générateur."""
+    evenements = queue.SimpleQueue()
+    arret = threading.Event()
+
+    def executer():
+        try:
+            if protocole == "udp":
+                resultats, duree = scanner_plage_udp_threads(hote, port_debut, port_fin, rappel=evenements.put,
+                                                             arret=arret, **options)
+            else:
+                resultats, duree = scanner_plage_async(hote, port_debut, port_fin, rappel=evenements.put,
+                                                       arret=arret, **options)
+            evenements.put({"type": "fin", "resultats": resultats, "duree": duree,
+                            "interrompu": arret.is_set()})
+        except Exception as e:
+            evenements.put({"type": "erreur", "exception": e})
+
+    scan = threading.Thread(target=executer, daemon=True, name=f"scan-{protocole}-{hote}")
+    scan.start()
+    try:
+        while True:
+            evenement = evenements.get()
+            if evenement["type"] == "erreur":
+                raise evenement["exception"]
+            yield evenement
+            if evenement["type"] == "fin":
+                return
+    finally:
+        arret.set()
+        scan.join()
+
+
 # ---------------------------------------------------------------------------
 # Fonctions interactives appelées depuis le menu (saisie + affichage)
 # ---------------------------------------------------------------------------
@@ -431,6 +1118,20 @@ def _afficher_ports_udp(resultats):
     print("-" * 50)
 
 
+def _afficheur_direct(proto):
+    """Retourne un rappel de scan qui affiche en direct les ports trouvés et la progression."""
+    def afficher(evenement):
+        if evenement["type"] == "port":
+            print(f"[{proto}] + port {evenement['port']} ({nom_service(evenement['port'])}) : "
+                  f"{evenement['statut']}")
+        elif evenement["type"] == "progression":
+            pourcentage = 100 * evenement["testes"] / evenement["total"]
+            reste = f"{evenement['eta']:.0f} s" if evenement["eta"] is not None else "?"
+            print(f"[{proto}] {evenement['testes']}/{evenement['total']} tests ({pourcentage:.0f} %), "
+                  f"{evenement['debit']:.0f} tests/s, {evenement['ouverts']} trouvé(s), fin estimée dans {reste}")
+    return afficher
+
+
 def action_scan_port_unique():
     """Scan d'un seul port : choix du port puis du/des protocole(s)."""
     print("\n--- SCAN D'UN PORT UNIQUE ---")
@@ -439,23 +1140,32 @@ def action_scan_port_unique():
     port = _demander_entier("Numéro du port", 80)
     protocoles = _demander_protocole()
 
-    if "tcp" in protocoles:
-        debut = time.perf_counter()
-        ouvert = scanner_un_port(hote, port)
-        duree = time.perf_counter() - debut
-        etat = "OUVERT" if ouvert else "fermé ou filtré"
-        print(f"\n[TCP] Port {port} ({nom_service(port)}) sur {hote} : {etat}  ({duree:.3f}s)")
+    try:
+        if "tcp" in protocoles:
+            print()
+            # Une ligne par adresse de l'hôte (ex : localhost -> 127.0.0.1 et ::1)
+            for cible in resoudre_cible(hote):
+                debut = time.perf_counter()
+                ouvert = scanner_un_port(hote, port, cible=cible)
+                duree = time.perf_counter() - debut
+                etat = "OUVERT" if ouvert else "fermé ou filtré"
+                print(f"[TCP] Port {port} ({nom_service(port)}) sur {hote} ({cible[3][0]}) : "
+                      f"{etat}  ({duree:.3f}s)")
 
-    if "udp" in protocoles and not _skip_udp_local(hote):
-        print("\nNote UDP : l'absence de réponse est ambiguë (ouvert ou filtré).")
-        debut = time.perf_counter()
-        statut = scanner_un_port_udp(hote, port)
-        duree = time.perf_counter() - debut
-        print(f"[UDP] Port {port} ({nom_service(port)}) sur {hote} : {statut.upper()}  ({duree:.3f}s)")
+        if "udp" in protocoles and not _skip_udp_local(hote):
+            print("\nNote UDP : l'absence de réponse est ambiguë (ouvert ou filtré).")
+            for cible in resoudre_cible(hote, socket.SOCK_DGRAM):
+                debut = time.perf_counter()
+                statut = scanner_un_port_udp(hote, port, cible=cible)
+                duree = time.perf_counter() - debut
+                print(f"[UDP] Port {port} ({nom_service(port)}) sur {hote} ({cible[3][0]}) : "
+                      f"{statut.upper()}  ({duree:.3f}s)")
+    except HoteIntrouvableError as e:
+        print(f"\nErreur : {e}")
 
 
 def action_scan_plage():
-    """Scan d'une plage de ports (threads) : bornes puis protocole(s)."""
+    """Scan d'une plage de ports (TCP : asyncio, UDP : threads) : bornes puis protocole(s)."""
     print("\n--- SCAN D'UNE PLAGE DE PORTS ---")
     _avertissement()
     hote = _demander_hote()
@@ -466,17 +1176,19 @@ def action_scan_plage():
     try:
         if "tcp" in protocoles:
             print(f"\n[TCP] Scan de {hote} [{port_debut}-{port_fin}] en cours...")
-            ports_ouverts, duree = scanner_plage_threads(hote, port_debut, port_fin, verbose=True)
+            ports_ouverts, duree = scanner_plage_async(hote, port_debut, port_fin, verbose=True,
+                                                       rappel=_afficheur_direct("TCP"))
             _afficher_ports_ouverts(ports_ouverts)
             print(f"Temps [TCP] : {duree:.3f} seconde(s).")
 
         if "udp" in protocoles and not _skip_udp_local(hote):
             print(f"\n[UDP] Scan de {hote} [{port_debut}-{port_fin}] en cours...")
             print("(UDP : seuls les ports clairement fermés sont écartés)")
-            resultats, duree = scanner_plage_udp_threads(hote, port_debut, port_fin, verbose=True)
+            resultats, duree = scanner_plage_udp_threads(hote, port_debut, port_fin, verbose=True,
+                                                         rappel=_afficheur_direct("UDP"))
             _afficher_ports_udp(resultats)
             print(f"Temps [UDP] : {duree:.3f} seconde(s).")
-    except PlagePortsInvalideError as e:
+    except (PlagePortsInvalideError, HoteIntrouvableError) as e:
         print(f"\nErreur : {e}")
     except KeyboardInterrupt:
         print("\nScan interrompu par l'utilisateur.")
@@ -497,22 +1209,25 @@ def action_scan_tous():
     try:
         if "tcp" in protocoles:
             print(f"\n[TCP] Scan complet de {hote} en cours...")
-            ports_ouverts, duree = scanner_tous_les_ports(hote, verbose=True)
+            ports_ouverts, duree = scanner_tous_les_ports(hote, verbose=True, rappel=_afficheur_direct("TCP"))
             _afficher_ports_ouverts(ports_ouverts)
             print(f"Temps [TCP] : {duree:.3f} seconde(s).")
 
         if "udp" in protocoles and not _skip_udp_local(hote):
             print(f"\n[UDP] Scan complet de {hote} en cours...")
-            resultats, duree = scanner_plage_udp_threads(hote, 1, 65535, verbose=True)
+            resultats, duree = scanner_plage_udp_threads(hote, 1, 65535, verbose=True,
+                                                         rappel=_afficheur_direct("UDP"))
             _afficher_ports_udp(resultats)
             print(f"Temps [UDP] : {duree:.3f} seconde(s).")
+    except HoteIntrouvableError as e:
+        print(f"\nErreur : {e}")
     except KeyboardInterrupt:
         print("\nScan interrompu par l'utilisateur.")
 
 
 def action_comparer_performances():
-    """Compare les performances séquentiel vs threads sur une plage."""
-    print("\n--- COMPARAISON SÉQUENTIEL vs THREADS ---")
+    """Compare les performances séquentiel vs threads vs asyncio sur une plage."""
+    print("\n--- COMPARAISON SÉQUENTIEL vs THREADS vs ASYNCIO ---")
     _avertissement()
     print("\nAstuce : le scan séquentiel teste les ports un par un, il est donc lent")
     print("sur une grande plage. Une petite plage suffit pour observer le gain des threads.")
@@ -523,9 +1238,10 @@ def action_comparer_performances():
     print(f"\nAnalyse comparative sur {hote} [{port_debut}-{port_fin}]...")
     print("(1) Scan séquentiel (sans thread)...")
     print("(2) Scan parallèle (avec threads)...")
+    print("(3) Scan asynchrone (asyncio, un seul thread)...")
     try:
         resultat = comparer_performances(hote, port_debut, port_fin)
-    except PlagePortsInvalideError as e:
+    except (PlagePortsInvalideError, HoteIntrouvableError) as e:
         print(f"\nErreur : {e}")
         return
     except KeyboardInterrupt:
@@ -536,4 +1252,6 @@ def action_comparer_performances():
     print("\n--- RÉSULTATS ---")
     print(f"Séquentiel (sans thread) : {resultat['duree_sequentiel']:.3f} s")
     print(f"Parallèle  (avec threads) : {resultat['duree_threads']:.3f} s")
-    print(f"Gain de performance       : x{resultat['gain']:.1f} plus rapide")
+    print(f"Asynchrone (asyncio)      : {resultat['duree_async']:.3f} s")
+    print(f"Gain de performance       : x{resultat['gain']:.1f} (threads), "
+          f"x{resultat['gain_async']:.1f} (asyncio) plus rapide")
@@ -0,0 +1,196 @@
+"""Sessions FTP persistantes partagées entre les opérations et les threads.
+
+Un pool par serveur (hôte, port, utilisateur) conserve des sessions déjà
+authentifiées : une opération emprunte une session (acquerir) puis la rend
+(liberer) au lieu de refaire connexion TCP + USER/PASS à chaque fois. Un thread
+de fond envoie des NOOP aux sessions inactives pour que le serveur ne les coupe
+pas ; une session coupée malgré tout est reconnectée de façon transparente au
+moment de l'emprunt, dans le répertoire où elle se trouvait."""
+
+import time
+import logging
+import posixpath
+import threading
+from ftplib import FTP, all_errors
+
+# Logger du module, rattaché à la configuration définie dans main.py (operations.log)
+logger = logging.getLogger(__name__)
+
+# Intervalle (secondes) entre deux NOOP envoyés à une session inactive
+INTERVALLE_KEEPALIVE = 60
+
+# Au-delà de cette inactivité (secondes), une session est vérifiée (NOOP) avant d'être prêtée
+SEUIL_VERIFICATION = 2
+
+# Nombre maximal de sessions inactives conservées par serveur
+TAILLE_MAX_POOL = 8
+
+# Délai d'attente réseau (secondes) des sessions
+TIMEOUT_SESSION = 30
+
+_pools = {}
+_verrou_pools = threading.Lock()
+
+
+class SessionFTP(FTP):
+    """Connexion FTP qui mémorise son répertoire courant (sans aller-retour supplémentaire)
+       afin de pouvoir y revenir après une reconnexion."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.repertoire = "/"
+        self.derniere_activite = time.monotonic()
+
+    def cwd(self, dirname):
+        reponse = super().cwd(dirname)
+        self.repertoire = posixpath.normpath(posixpath.join(self.repertoire, dirname))
+        return reponse
+
+
+class PoolSessionsFTP:
+    """Sessions FTP authentifiées réutilisables vers un même serveur (thread-safe)."""
+
+    def __init__(self, host, port, utilisateur, mot_de_passe, taille_max=TAILLE_MAX_POOL,
+                 intervalle_keepalive=INTERVALLE_KEEPALIVE):
+        self.host = host
+        self.port = port
+        self.utilisateur = utilisateur
+        self.mot_de_passe = mot_de_passe
+        self.taille_max = taille_max
+        self.intervalle_keepalive = intervalle_keepalive
+
+        # Sessions disponibles (les plus récemment rendues à la fin)
+        self._inactives = []
+        self._verrou = threading.Lock()
+
+        self._arret = threading.Event()
+        self._thread_keepalive = None
+
+        self.connexions_ouvertes = 0
+        self.reutilisations = 0
+        self.reconnexions = 0
+
+    def _ouvrir(self):
+        """Ouvre et authentifie une nouvelle session."""
+        ftp = SessionFTP(timeout=TIMEOUT_SESSION)
+        ftp.connect(self.host, self.port)
+        ftp.login(self.utilisateur, self.mot_de_passe)
+        self.connexions_ouvertes += 1
+        return ftp
+
+    def _reconnecter(self, ancienne):
+        """Remplace une session coupée par une nouvelle, replacée dans le même répertoire."""
+        _fermer(ancienne)
+        ftp = self._ouvrir()
+        if ancienne.repertoire != "/":
+            try:
+                ftp.cwd(ancienne.repertoire)
+            except all_errors as e:
+                logger.warning(f"SESSION FTP : répertoire '{ancienne.repertoire}' non restauré ({e})")
+        self.reconnexions += 1
+        logger.info(f"SESSION FTP : reconnexion à {self.host}:{self.port} ({ftp.repertoire})")
+        return ftp
+
+    def acquerir(self):
+        """Emprunte une session prête à l'emploi (réutilisée si possible, sinon ouverte).
+           Lève une erreur ftplib/OSError si le serveur est injoignable."""
+        self._demarrer_keepalive()
+        with self._verrou:
+            ftp = self._inactives.pop() if self._inactives else None
+
+        if ftp is None:
+            return self._ouvrir()
+
+        self.reutilisations += 1
+        if time.monotonic() - ftp.derniere_activite > SEUIL_VERIFICATION:
+            try:
+                ftp.voidcmd("NOOP")
+            except all_errors:
+                ftp = self._reconnecter(ftp)
+        return ftp
+
+    def liberer(self, ftp, saine=True):
+        """Rend une session au pool. Une session en erreur ('saine' faux), coupée ou
+           excédentaire est fermée."""
+        if ftp is None:
+            return
+        if not saine or ftp.sock is None or self._arret.is_set():
+            _fermer(ftp)
+            return
+
+        ftp.derniere_activite = time.monotonic()
+        with self._verrou:
+            if len(self._inactives) < self.taille_max:
+                self._inactives.append(ftp)
+                return
+        _fermer(ftp)
+
+    def _demarrer_keepalive(self):
+        """Lance le thread de keepalive au premier emprunt."""
+        if self._thread_keepalive is None:
+            with self._verrou:
+                if self._thread_keepalive is None:
+                    self._thread_keepalive = threading.Thread(target=self._boucle_keepalive, daemon=True,
+                                                              name=f"keepalive-ftp-{self.host}:{self.port}")
+                    self._thread_keepalive.start()
+
+    def _boucle_keepalive(self):
+        """Envoie périodiquement un NOOP aux sessions inactives ; retire celles qui ne répondent plus."""
+        while not self._arret.wait(self.intervalle_keepalive):
+            maintenant = time.monotonic()
+            with self._verrou:
+                a_verifier = [f for f in self._inactives
+                              if maintenant - f.derniere_activite >= self.intervalle_keepalive]
+                self._inactives = [f for f in self._inactives if f not in a_verifier]
+
+            for ftp in a_verifier:
+                try:
+                    ftp.voidcmd("NOOP")
+                    self.liberer(ftp)
+                except all_errors as e:
+                    logger.info(f"SESSION FTP : session inactive perdue ({e}), retirée du pool")
+                    _fermer(ftp)
+
+    def fermer(self):
+        """Ferme toutes les sessions inactives et arrête le keepalive."""
+        self._arret.set()
+        with self._verrou:
+            sessions, self._inactives = self._inactives, []
+        for ftp in sessions:
+            _fermer(ftp)
+
+    def statistiques(self):
+        """Retourne un dict {inactives, connexions_ouvertes, reutilisations, reconnexions}."""
+        with self._verrou:
+            inactives = len(self._inactives)
+        return {"inactives": inactives, "connexions_ouvertes": self.connexions_ouvertes,
+                "reutilisations": self.reutilisations, "reconnexions": self.reconnexions}
+
+
+def _fermer(ftp):
+    """Ferme une session sans propager d'erreur."""
+    try:
+        ftp.quit()
+    except all_errors:
+        ftp.close()
+
+
+def obtenir_pool(host, port, utilisateur, mot_de_passe):
+    """Retourne le pool de sessions partagé pour ce serveur et cet utilisateur (créé au besoin)."""
+    cle = (host, port, utilisateur)
+    with _verrou_pools:
+        pool = _pools.get(cle)
+        if pool is None or pool.mot_de_passe != mot_de_passe:
+            if pool is not None:
+                pool.fermer()
+            pool = _pools[cle] = PoolSessionsFTP(host, port, utilisateur, mot_de_passe)
+        return pool
+
+
+def fermer_pools():
+    """Ferme toutes les sessions persistantes (appelé à la fermeture de l'application)."""
+    with _verrou_pools:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.fermer()
@@ -0,0 +1,382 @@
+"""Moteur de transfert FTP parallèle.
+
+Un pool de N sessions FTP authentifiées (une par thread) consomme une file de
+tâches partagée. Chaque tâche est exécutée avec des chemins FTP absolus (aucun
+CWD), et retentée avec un délai croissant en cas d'erreur transitoire, après
+reconnexion de la session si nécessaire. Les dossiers distants sont créés une
+seule fois, avant le lancement des transferts."""
+
+import os
+import json
+import zlib
+import time
+import hashlib
+import queue
+import logging
+import threading
+from ftplib import FTP, all_errors, error_perm, error_reply
+
+# Logger du module, rattaché à la configuration définie dans main.py (operations.log)
+logger = logging.getLogger(__name__)
+
+# Nombre de sessions FTP ouvertes en parallèle (surchargeable par variable d'environnement)
+NB_SESSIONS_FTP = int(os.getenv("FTP_SESSIONS", "4"))
+
+# Nombre d'essais par fichier et délai avant le 2e essai (doublé à chaque nouvel échec)
+TENTATIVES_TRANSFERT = 3
+DELAI_NOUVEL_ESSAI = 0.5
+
+# Délai d'attente réseau (secondes) des sessions du pool
+TIMEOUT_SESSION = 30
+
+# Taille des blocs lus/écrits pendant un transfert (surchargeable par variable d'environnement)
+TAILLE_BLOC = int(os.getenv("FTP_TAILLE_BLOC", str(64 * 1024)))
+
+# Suffixe du fichier temporaire d'un téléchargement en cours (renommé une fois complet)
+SUFFIXE_PARTIEL = ".part"
+
+# Suffixe du fichier qui accompagne un '.part' : version distante (taille, date) téléchargée
+SUFFIXE_VERSION = ".version"
+
+
+class MoteurTransfertFTP:
+    """Exécute des transferts FTP en parallèle sur un pool de sessions."""
+
+    def __init__(self, host, port, utilisateur, mot_de_passe, nb_sessions=NB_SESSIONS_FTP,
+                 tentatives=TENTATIVES_TRANSFERT, delai_nouvel_essai=DELAI_NOUVEL_ESSAI, pool=None):
+        self.host = host
+        self.port = port
+        self.utilisateur = utilisateur
+        self.mot_de_passe = mot_de_passe
+        self.nb_sessions = max(1, nb_sessions)
+        self.tentatives = max(1, tentatives)
+        self.delai_nouvel_essai = delai_nouvel_essai
+
+        # Pool de sessions persistantes (session_ftp) : sessions empruntées puis rendues
+        self.pool = pool
+
+    def ouvrir_session(self):
+        """Ouvre et authentifie une nouvelle session FTP (ou en emprunte une au pool)."""
+        if self.pool is not None:
+            return self.pool.acquerir()
+        ftp = FTP(timeout=TIMEOUT_SESSION)
+        ftp.connect(self.host, self.port)
+        ftp.login(self.utilisateur, self.mot_de_passe)
+        return ftp
+
+    def fermer_session(self, ftp, saine=True):
+        """Rend la session au pool, ou la ferme sans propager d'erreur (session déjà coupée, etc.).
+           Une session qui a levé une erreur ('saine' faux) n'est jamais remise dans le pool."""
+        if self.pool is not None:
+            self.pool.liberer(ftp, saine)
+            return
+        try:
+            ftp.quit()
+        except all_errors:
+            ftp.close()
+
+    @staticmethod
+    def creer_dossiers(ftp, chemins):
+        """Crée les dossiers FTP absolus 'chemins' (parents avant enfants), sans CWD.
+           Un dossier déjà existant (réponse 550) est ignoré."""
+        for chemin in sorted(set(chemins), key=lambda c: c.count("/")):
+            try:
+                ftp.mkd(chemin)
+            except error_perm:
+                pass
+
+    def _ouvrir_pool(self, nb):
+        """Ouvre jusqu'à 'nb' sessions. Retourne la liste des sessions ouvertes."""
+        sessions = []
+        for _ in range(nb):
+            try:
+                sessions.append(self.ouvrir_session())
+            except all_errors as e:
+                logger.warning(f"TRANSFERT FTP : session supplémentaire refusée ({e})")
+                break
+        return sessions
+
+    def executer_tache(self, ftp, tache, action, rapport, verrou):
+        """Exécute action(ftp, tache) avec nouveaux essais et reconnexion, et inscrit le résultat
+           dans 'rapport' (réussite ou échec, jamais d'exception). 'ftp' peut être None (session
+           ouverte au besoin). Retourne la session à utiliser pour la tâche suivante (None si
+           elle a été fermée)."""
+        delai = self.delai_nouvel_essai
+        for essai in range(1, self.tentatives + 1):
+            try:
+                if ftp is None:
+                    ftp = self.ouvrir_session()
+                octets = action(ftp, tache)
+                with verrou:
+                    rapport["reussis"] += 1
+                    rapport["octets"] += octets
+                break
+
+            except (error_perm, FileNotFoundError) as e:
+                # Erreur définitive (5xx : permission, fichier absent...) : pas de nouvel essai
+                with verrou:
+                    rapport["echecs"].append((tache, str(e)))
+                logger.error(f"TRANSFERT FTP : échec définitif {tache} ({e})")
+                break
+
+            except all_errors as e:
+                # Erreur transitoire ou session coupée : reconnexion au prochain essai
+                if ftp is not None:
+                    self.fermer_session(ftp, saine=False)
+                    ftp = None
+                if essai == self.tentatives:
+                    with verrou:
+                        rapport["echecs"].append((tache, str(e)))
+                    logger.error(f"TRANSFERT FTP : abandon après {essai} essais {tache} ({e})")
+                else:
+                    logger.warning(f"TRANSFERT FTP : essai {essai} échoué {tache} ({e}), "
+                                   f"nouvel essai dans {delai:.1f}s")
+                    time.sleep(delai)
+                    delai *= 2
+
+            except Exception as e:
+                # Erreur inattendue de l'action : la tâche est comptée en échec (le rapport ne doit
+                # pas paraître réussi) et la session, dans un état inconnu, n'est pas réutilisée
+                if ftp is not None:
+                    self.fermer_session(ftp, saine=False)
+                    ftp = None
+                with verrou:
+                    rapport["echecs"].append((tache, f"{type(e).__name__}: {e}"))
+                logger.exception(f"TRANSFERT FTP : erreur inattendue {tache} ({e})")
+                break
+        return ftp
+
+    def _travailleur(self, ftp, file_taches, action, rapport, verrou):
+        """Boucle d'un thread : exécute les tâches de la file jusqu'à épuisement."""
+        while True:
+            try:
+                tache = file_taches.get_nowait()
+            except queue.Empty:
+                break
+            ftp = self.executer_tache(ftp, tache, action, rapport, verrou)
+
+        if ftp is not None:
+            self.fermer_session(ftp)
+
+    def executer(self, taches, action, sessions=None):
+        """Exécute action(ftp, tache) pour chaque tâche, en parallèle sur le pool.
+           'action' retourne le nombre d'octets transférés. 'sessions' permet de
+           fournir des sessions déjà ouvertes (elles seront fermées à la fin).
+           Retourne un dict {reussis, echecs: [(tache, erreur)], octets, duree, debit}."""
+        debut = time.perf_counter()
+        rapport = {"reussis": 0, "echecs": [], "octets": 0, "duree": 0.0, "debit": 0.0}
+        if not taches:
+            for ftp in sessions or []:
+                self.fermer_session(ftp)
+            return rapport
+
+        file_taches = queue.Queue()
+        for tache in taches:
+            file_taches.put(tache)
+
+        # Inutile d'ouvrir plus de sessions qu'il n'y a de tâches
+        nb = min(self.nb_sessions, len(taches))
+        sessions = list(sessions or [])
+        sessions += self._ouvrir_pool(nb - len(sessions))
+        if not sessions:
+            raise ConnectionError(f"aucune session FTP n'a pu être ouverte sur {self.host}:{self.port}")
+
+        verrou = threading.Lock()
+        threads = [
+            threading.Thread(target=self._travailleur, args=(ftp, file_taches, action, rapport, verrou),
+                             daemon=True)
+            for ftp in sessions
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        rapport["duree"] = time.perf_counter() - debut
+        if rapport["duree"] > 0:
+            rapport["debit"] = rapport["octets"] / rapport["duree"]
+        return rapport
+
+    def envoyer_fichiers(self, taches, dossiers=(), session=None, action=None):
+        """Envoie des fichiers locaux : taches = [(chemin_local, chemin_ftp_absolu)].
+           Les 'dossiers' FTP absolus sont d'abord créés, une seule fois, par 'session'
+           (ouverte si absente), qui rejoint ensuite le pool et est fermée à la fin.
+           'action' remplace envoyer_fichier (ex : EnvoiAvecEmpreintes)."""
+        if session is None:
+            session = self.ouvrir_session()
+        try:
+            self.creer_dossiers(session, dossiers)
+        except BaseException:
+            self.fermer_session(session, saine=False)
+            raise
+        return self.executer(taches, action or envoyer_fichier, [session])
+
+
+def envoyer_fichier(ftp, tache):
+    """Action d'envoi d'un fichier (STOR sur chemin absolu). Retourne sa taille."""
+    chemin_local, chemin_ftp = tache
+    with open(chemin_local, "rb") as f:
+        ftp.storbinary(f"STOR {chemin_ftp}", f, blocksize=TAILLE_BLOC)
+    return os.path.getsize(chemin_local)
+
+
+class EnvoiAvecEmpreintes:
+    """Action d'envoi (comme envoyer_fichier) qui calcule au passage, bloc par bloc, la taille,
+       le sha256, le md5 et le crc32 des données réellement envoyées (aucune relecture).
+       Les empreintes sont accumulées dans 'empreintes' : {chemin_ftp: {taille, sha256, md5, crc32}}."""
+
+    def __init__(self):
+        self.empreintes = {}
+        self._verrou = threading.Lock()
+
+    def __call__(self, ftp, tache):
+        chemin_local, chemin_ftp = tache
+        sha256, md5 = hashlib.sha256(), hashlib.md5(usedforsecurity=False)
+        crc32 = taille = 0
+
+        def empreinter(bloc):
+            nonlocal crc32, taille
+            sha256.update(bloc)
+            md5.update(bloc)
+            crc32 = zlib.crc32(bloc, crc32)
+            taille += len(bloc)
+
+        with open(chemin_local, "rb") as f:
+            ftp.storbinary(f"STOR {chemin_ftp}", f, blocksize=TAILLE_BLOC, callback=empreinter)
+
+        with self._verrou:
+            self.empreintes[chemin_ftp] = {"taille": taille, "sha256": sha256.hexdigest(),
+                                           "md5": md5.hexdigest(), "crc32": f"{crc32:08x}"}
+        return taille
+
+
+def version_distante(ftp, chemin_ftp):
+    """Retourne {'taille': int ou None, 'modifie': str ou None} pour un fichier distant,
+       d'après MLST (faits size/modify), ou à défaut SIZE et MDTM. Les faits que le
+       serveur ne fournit pas valent None."""
+    try:
+        reponse = ftp.sendcmd(f"MLST {chemin_ftp}")
+        for ligne in reponse.splitlines()[1:]:
+            faits, _, _ = ligne.strip().partition(" ")
+            if "=" not in faits:
+                continue
+            valeurs = dict(f.split("=", 1) for f in faits.split(";") if "=" in f)
+            valeurs = {cle.lower(): valeur for cle, valeur in valeurs.items()}
+            taille = valeurs.get("size")
+            return {"taille": int(taille) if taille and taille.isdigit() else None,
+                    "modifie": valeurs.get("modify")}
+    except (error_reply, error_perm):
+        pass
+
+    # Serveur sans MLST : SIZE (en mode binaire) et MDTM, chacun facultatif
+    version = {"taille": None, "modifie": None}
+    try:
+        ftp.voidcmd("TYPE I")
+        version["taille"] = ftp.size(chemin_ftp)
+    except (error_reply, error_perm):
+        pass
+    try:
+        version["modifie"] = ftp.sendcmd(f"MDTM {chemin_ftp}").split()[-1]
+    except (error_reply, error_perm):
+        pass
+    return version
+
+
+def _lire_version_partielle(chemin_version):
+    """Version distante enregistrée à côté d'un '.part', ou None (absente ou illisible)."""
+    try:
+        with open(chemin_version, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _supprimer_partiel(partiel):
+    """Supprime un '.part' et le fichier de version qui l'accompagne (s'ils existent)."""
+    for chemin in (partiel, partiel + SUFFIXE_VERSION):
+        try:
+            os.remove(chemin)
+        except FileNotFoundError:
+            pass
+
+
+def telecharger_vers_fichier(ftp, chemin_ftp, chemin_local, taille_bloc=None, reprendre=True,
+                             taille_attendue=None):
+    """Télécharge 'chemin_ftp' vers 'chemin_local' en flux continu, bloc par bloc.
+
+       Les données sont écrites dans '<chemin_local>.part' (même dossier), renommé
+       atomiquement une fois le transfert terminé : le fichier final n'existe jamais
+       à moitié écrit et la mémoire utilisée ne dépend pas de la taille du fichier.
+       La version distante (taille et date, voir version_distante) est enregistrée
+       dans '<chemin_local>.part.version'. Si un '.part' subsiste d'un transfert
+       interrompu et que 'reprendre' est vrai, le téléchargement reprend à sa
+       taille (commande REST), à condition que le fichier distant n'ait pas changé
+       depuis : sinon le '.part' est supprimé et le téléchargement recommence.
+       La taille finale est toujours contrôlée, par rapport à 'taille_attendue' si
+       elle est renseignée, sinon à la taille distante : un fichier reçu d'une autre
+       taille est supprimé et une OSError est levée (erreur transitoire : nouvel
+       essai possible).
+       Retourne le nombre d'octets reçus pendant cet appel."""
+    taille_bloc = taille_bloc or TAILLE_BLOC
+    partiel = chemin_local + SUFFIXE_PARTIEL
+    chemin_version = partiel + SUFFIXE_VERSION
+
+    version = version_distante(ftp, chemin_ftp)
+    verifiable = version["taille"] is not None or version["modifie"] is not None
+
+    deja_recus = os.path.getsize(partiel) if reprendre and os.path.exists(partiel) else 0
+    if deja_recus and (not verifiable or _lire_version_partielle(chemin_version) != version
+                       or (version["taille"] is not None and deja_recus > version["taille"])):
+        # Fichier distant modifié (ou version invérifiable) : le début déjà reçu n'est plus fiable
+        logger.warning(f"TRANSFERT FTP : {chemin_ftp} modifié depuis le transfert interrompu "
+                       f"(ou version inconnue), téléchargement complet")
+        deja_recus = 0
+    if not deja_recus:
+        _supprimer_partiel(partiel)
+        with open(chemin_version, "w", encoding="utf-8") as f:
+            json.dump(version, f)
+
+    recus = 0
+
+    def ecrire(bloc):
+        nonlocal recus
+        f.write(bloc)
+        recus += len(bloc)
+
+    try:
+        try:
+            with open(partiel, "ab" if deja_recus else "wb") as f:
+                ftp.retrbinary(f"RETR {chemin_ftp}", ecrire, blocksize=taille_bloc, rest=deja_recus or None)
+        except (error_reply, error_perm):
+            if not deja_recus:
+                raise
+            # Reprise refusée (serveur sans REST : 502/504) : nouveau téléchargement complet
+            logger.warning(f"TRANSFERT FTP : reprise refusée pour {chemin_ftp}, téléchargement complet")
+            return telecharger_vers_fichier(ftp, chemin_ftp, chemin_local, taille_bloc, reprendre=False,
+                                            taille_attendue=taille_attendue)
+    except BaseException:
+        # Un '.part' vide (ex : fichier distant absent) n'a rien à reprendre : on le supprime
+        if not os.path.exists(partiel) or os.path.getsize(partiel) == 0:
+            _supprimer_partiel(partiel)
+        raise
+
+    if taille_attendue is None:
+        taille_attendue = version["taille"]
+    if taille_attendue is not None and deja_recus + recus != taille_attendue:
+        _supprimer_partiel(partiel)
+        raise OSError(f"taille reçue {deja_recus + recus} au lieu de {taille_attendue} octets ({chemin_ftp})")
+
+    if deja_recus:
+        logger.info(f"TRANSFERT FTP : {chemin_ftp} repris à l'octet {deja_recus}")
+    os.replace(partiel, chemin_local)
+    _supprimer_partiel(partiel)
+    return recus
+
+
+def formater_debit(octets_par_seconde):
+    """Retourne un débit lisible (ex : '12.3 Mo/s')."""
+    for unite in ("o/s", "Ko/s", "Mo/s"):
+        if octets_par_seconde < 1024:
+            return f"{octets_par_seconde:.1f} {unite}"
+        octets_par_seconde /= 1024
+    return f"{octets_par_seconde:.1f} Go/s"
@@ -0,0 +1,224 @@
+"""Vérification de l'intégrité des sauvegardes FTP, sans les retélécharger.
+
+Chaque sauvegarde dispose d'une liste d'empreintes attendues :
+  - copie complète : manifeste '.integrite.json' écrit à sa racine, empreintes
+    (taille, sha256, md5, crc32) calculées pendant l'envoi (EnvoiAvecEmpreintes) ;
+  - instantané incrémental : son index (le nom de chaque objet est son sha256) ;
+  - archive : son manifeste (empreintes de chaque partie).
+
+La vérification demande au serveur de hacher lui-même ses fichiers (HASH, ou les
+extensions XSHA256 / XMD5 / XCRC) lorsqu'il l'annonce dans FEAT : seule
+l'empreinte transite. À défaut, la taille et la date de modification sont
+contrôlées à partir des listages MLSD (un par dossier). Un échantillon de
+fichiers peut en plus être réellement téléchargé (en mémoire, sans écriture
+disque) et haché, pour prouver que la sauvegarde se relit."""
+
+import io
+import os
+import re
+import json
+import time
+import random
+import hashlib
+import logging
+import posixpath
+from datetime import datetime, timedelta, timezone
+from ftplib import all_errors
+
+from transfert_ftp import TAILLE_BLOC
+from sauvegarde_incrementale import DOSSIER_INSTANTANES, chemin_objet, lire_instantane
+from sauvegarde_archive import DOSSIER_ARCHIVES, lire_manifeste_archive
+
+# Logger du module, rattaché à la configuration définie dans main.py (operations.log)
+logger = logging.getLogger(__name__)
+
+# Manifeste d'intégrité écrit à la racine d'une copie complète
+NOM_MANIFESTE_INTEGRITE = ".integrite.json"
+
+# Une date MLSD postérieure à la sauvegarde de plus de cette marge signale un fichier réécrit
+MARGE_DATE = timedelta(minutes=5)
+
+# Fichiers relus après chaque sauvegarde automatique (surchargeable par variable d'environnement)
+ECHANTILLON_VERIFICATION = int(os.getenv("VERIFICATION_ECHANTILLON", "5"))
+
+# Algorithmes vérifiables par le serveur, du plus sûr au moins sûr : (clé, nom HASH, commande X*)
+_ALGORITHMES = (("sha256", "SHA-256", "XSHA256"), ("md5", "MD5", "XMD5"), ("crc32", "CRC32", "XCRC"))
+
+_MOTIF_HEXA = re.compile(r"[0-9a-fA-F]{1,128}")
+
+
+def enregistrer_manifeste_integrite(ftp, racine_ftp, empreintes):
+    """Écrit le manifeste d'intégrité d'une copie complète à sa racine.
+       'empreintes' : {chemin_ftp_absolu: {taille, sha256, md5, crc32}} (voir EnvoiAvecEmpreintes)."""
+    manifeste = {
+        "date": datetime.now().isoformat(timespec="seconds"),
+        "fichiers": {posixpath.relpath(chemin, racine_ftp): infos for chemin, infos in empreintes.items()},
+    }
+    donnees = json.dumps(manifeste, ensure_ascii=False, indent=1).encode("utf-8")
+    ftp.storbinary(f"STOR {racine_ftp}/{NOM_MANIFESTE_INTEGRITE}", io.BytesIO(donnees))
+
+
+def charger_attendus(ftp_manager, ville, nom_sauvegarde):
+    """Retourne (date de la sauvegarde, {chemin_ftp: empreintes attendues}) pour une sauvegarde
+       désignée comme le fait sauvegarder_vers_ftp : 'instantanes/<nom>.json', 'archives/<nom>'
+       ou '<nom>' (copie complète)."""
+    nom_ville = ville.lower()
+
+    if nom_sauvegarde.startswith(f"{DOSSIER_INSTANTANES}/"):
+        nom = nom_sauvegarde[len(DOSSIER_INSTANTANES) + 1:].removesuffix(".json")
+        index = lire_instantane(ftp_manager, ville, nom)
+        attendus = {chemin_objet(ville, infos["sha256"]): {"taille": infos["taille"], "sha256": infos["sha256"]}
+                    for infos in index["fichiers"].values()}
+        return index["date"], attendus
+
+    if nom_sauvegarde.startswith(f"{DOSSIER_ARCHIVES}/"):
+        nom = nom_sauvegarde[len(DOSSIER_ARCHIVES) + 1:]
+        manifeste = lire_manifeste_archive(ftp_manager, ville, nom)
+        attendus = {f"/{nom_ville}/{DOSSIER_ARCHIVES}/{nom}/{partie['nom']}":
+                    {cle: partie[cle] for cle in ("taille", "sha256", "md5", "crc32") if cle in partie}
+                    for partie in manifeste["parties"]}
+        return manifeste["date"], attendus
+
+    racine_ftp = f"/{nom_ville}/{nom_sauvegarde}"
+    tampon = io.BytesIO()
+    ftp_manager.ftp.retrbinary(f"RETR {racine_ftp}/{NOM_MANIFESTE_INTEGRITE}", tampon.write)
+    manifeste = json.loads(tampon.getvalue().decode("utf-8"))
+    return manifeste["date"], {f"{racine_ftp}/{relatif}": infos for relatif, infos in manifeste["fichiers"].items()}
+
+
+def algorithmes_serveur(ftp):
+    """Retourne {clé d'algorithme: (commande, paramètre HASH ou None)} d'après la réponse FEAT."""
+    try:
+        lignes = ftp.sendcmd("FEAT").splitlines()[1:-1]
+    except all_errors:
+        return {}
+    fonctions = {}
+    for ligne in lignes:
+        nom, _, parametres = ligne.strip().upper().partition(" ")
+        fonctions[nom] = parametres
+
+    algorithmes = {}
+    hash_annonces = [a.rstrip("*") for a in fonctions.get("HASH", "").split(";") if a]
+    for cle, nom_hash, commande in _ALGORITHMES:
+        if nom_hash in hash_annonces:
+            algorithmes[cle] = ("HASH", nom_hash)
+        elif commande in fonctions:
+            algorithmes[cle] = (commande, None)
+    return algorithmes
+
+
+def _empreinte_serveur(ftp, commande, parametre, chemin):
+    """Demande au serveur l'empreinte d'un fichier. Retourne la valeur hexadécimale (minuscules),
+       ou None si la réponse ne contient pas d'empreinte reconnaissable."""
+    if commande == "HASH" and getattr(ftp, "algorithme_hash", None) != parametre:
+        # Algorithme choisi une fois par session
+        ftp.sendcmd(f"OPTS HASH {parametre}")
+        ftp.algorithme_hash = parametre
+    reponse = ftp.sendcmd(f"{commande} {chemin}")
+
+    # HASH : '213 SHA-256 0-1234 <empreinte> <nom>' ; X* : '250 <empreinte>'
+    for mot in reponse.split()[1:]:
+        if _MOTIF_HEXA.fullmatch(mot):
+            return mot.lower()
+    return None
+
+
+def _conformes(cle, attendu, obtenu):
+    """Compare deux empreintes (le crc32 peut être renvoyé sans zéros de tête)."""
+    if cle == "crc32":
+        return int(attendu, 16) == int(obtenu, 16)
+    return attendu.lower() == obtenu
+
+
+def _verifier_par_listage(ftp_manager, attendus, date_sauvegarde):
+    """Contrôle taille et date MLSD (un listage par dossier). Retourne [(chemin, raison)]."""
+    limite = date_sauvegarde + MARGE_DATE
+    differents = []
+    par_dossier = {}
+    for chemin in attendus:
+        par_dossier.setdefault(posixpath.dirname(chemin), []).append(chemin)
+
+    for dossier, chemins in par_dossier.items():
+        try:
+            entrees = {e["nom"]: e for e in ftp_manager._lister_repertoire(dossier)}
+        except FileNotFoundError:
+            differents += [(chemin, "absent") for chemin in chemins]
+            continue
+        for chemin in chemins:
+            entree = entrees.get(posixpath.basename(chemin))
+            if entree is None or entree["dossier"]:
+                differents.append((chemin, "absent"))
+            elif entree["taille"] is not None and entree["taille"] != attendus[chemin]["taille"]:
+                differents.append((chemin, f"taille {entree['taille']} au lieu de {attendus[chemin]['taille']}"))
+            elif entree["modifie"] and entree["modifie"] > limite:
+                differents.append((chemin, "modifié après la sauvegarde"))
+    return differents
+
+
+def verifier_sauvegarde(ftp_manager, ville, nom_sauvegarde, echantillon=0):
+    """Vérifie une sauvegarde ('ftp_manager' connecté) sans la retélécharger ; 'echantillon'
+       fichiers tirés au hasard sont en plus téléchargés en mémoire et hachés (sha256).
+       Retourne un dict {sauvegarde, methode, fichiers, conformes, differents: [(chemin, raison)],
+       echantillon, duree}."""
+    debut = time.perf_counter()
+    date, attendus = charger_attendus(ftp_manager, ville, nom_sauvegarde)
+    date_sauvegarde = datetime.fromisoformat(date).astimezone(timezone.utc)
+
+    # Algorithme le plus sûr à la fois proposé par le serveur et présent dans toutes les empreintes
+    algorithmes = algorithmes_serveur(ftp_manager.ftp)
+    choix = next((cle for cle, _, _ in _ALGORITHMES
+                  if cle in algorithmes and all(cle in infos for infos in attendus.values())), None)
+
+    moteur = ftp_manager._moteur_transfert()
+    differents = []
+    if choix:
+        commande, parametre = algorithmes[choix]
+
+        def verifier(ftp, chemin):
+            obtenu = _empreinte_serveur(ftp, commande, parametre, chemin)
+            if obtenu is None:
+                differents.append((chemin, f"réponse {commande} illisible"))
+            elif not _conformes(choix, attendus[chemin][choix], obtenu):
+                differents.append((chemin, f"{choix} {obtenu} au lieu de {attendus[chemin][choix]}"))
+            return 0
+
+        rapport = moteur.executer(list(attendus), verifier)
+        differents += rapport["echecs"]
+        methode = f"{commande} {parametre}" if parametre else commande
+    else:
+        differents = _verifier_par_listage(ftp_manager, attendus, date_sauvegarde)
+        methode = "taille+date (MLSD)"
+
+    # Relecture effective d'un échantillon : seul le sha256 est conservé en mémoire
+    tires = random.sample(sorted(attendus), min(echantillon, len(attendus)))
+
+    def relire(ftp, chemin):
+        empreinte = hashlib.sha256()
+        taille = 0
+
+        def absorber(bloc):
+            nonlocal taille
+            empreinte.update(bloc)
+            taille += len(bloc)
+
+        ftp.retrbinary(f"RETR {chemin}", absorber, blocksize=TAILLE_BLOC)
+        if empreinte.hexdigest() != attendus[chemin]["sha256"] or taille != attendus[chemin]["taille"]:
+            differents.append((chemin, "contenu relu différent"))
+        return taille
+
+    if tires:
+        differents += moteur.executer(tires, relire)["echecs"]
+
+    resultat = {
+        "sauvegarde": nom_sauvegarde,
+        "methode": methode,
+        "fichiers": len(attendus),
+        "conformes": len(attendus) - len({chemin for chemin, _ in differents}),
+        "differents": differents,
+        "echantillon": len(tires),
+        "duree": time.perf_counter() - debut,
+    }
+    niveau = logging.ERROR if differents else logging.INFO
+    logger.log(niveau, f"VÉRIFICATION : {ville}/{nom_sauvegarde} ({methode}) -> {resultat['conformes']}/"
+                       f"{resultat['fichiers']} conforme(s), {len(tires)} relu(s), {len(differents)} anomalie(s)")
+    return resultat